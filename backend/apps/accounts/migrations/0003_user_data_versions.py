@@ -0,0 +1,28 @@
+# Generated by Django 5.2.9 on 2026-10-18 19:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_user_avatar'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='catalog_version',
+            field=models.PositiveBigIntegerField(default=0, verbose_name='versão do catálogo'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='lists_version',
+            field=models.PositiveBigIntegerField(default=0, verbose_name='versão das listas'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='payments_version',
+            field=models.PositiveBigIntegerField(default=0, verbose_name='versão dos pagamentos'),
+        ),
+    ]
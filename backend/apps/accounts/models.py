@@ -5,6 +5,7 @@ Custom User model with additional fields for the app
 
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models import F
 
 
 class User(AbstractUser):
@@ -42,6 +43,14 @@ class User(AbstractUser):
         help_text='Porcentagem do orçamento para disparar alerta (50-100)',
     )
     
+    # Per-user data versions, bumped on every write to the matching
+    # collection; cheap validators (ETags) for the read endpoints
+    lists_version = models.PositiveBigIntegerField('versão das listas', default=0)
+    catalog_version = models.PositiveBigIntegerField('versão do catálogo', default=0)
+    payments_version = models.PositiveBigIntegerField('versão dos pagamentos', default=0)
+    
+    VERSION_FIELDS = ('lists_version', 'catalog_version', 'payments_version')
+    
     # Timestamps
     created_at = models.DateTimeField('criado em', auto_now_add=True)
     updated_at = models.DateTimeField('atualizado em', auto_now=True)
@@ -62,4 +71,15 @@ class User(AbstractUser):
         # Generate username from email if not provided
         if not self.username:
             self.username = self.email.split('@')[0]
+        # Versions only move through bump_version(); never write back a stale copy
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.VERSION_FIELDS
+            ]
         super().save(*args, **kwargs)
+    
+    @classmethod
+    def bump_version(cls, field, **filters):
+        """Atomically increment a data version of the matching users"""
+        cls.objects.filter(**filters).update(**{field: F(field) + 1})
@@ -9,6 +9,16 @@ import calendar
 
 from apps.shopping.models import ShoppingList
 from apps.payments.models import PaymentMethod
+from config.conditional import conditional_view, versioned_etag
+
+
+def _summary_etag(request, *args, **kwargs):
+    # Month buckets move with the calendar, so the date is part of the tag
+    user = request.user
+    return versioned_etag(
+        request, user.lists_version, user.payments_version, timezone.localdate()
+    )
+
 
 class DashboardViewSet(viewsets.ViewSet):
     """
@@ -17,6 +27,7 @@ class DashboardViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
 
     @action(detail=False, methods=['get'])
+    @conditional_view(_summary_etag)
     def summary(self, request):
         """
         GET /api/analytics/dashboard/summary/
@@ -0,0 +1,40 @@
+"""
+SmartCart Notifications Admin
+"""
+
+from django.contrib import admin
+from .models import Notification, PushDevice
+
+
+@admin.register(PushDevice)
+class PushDeviceAdmin(admin.ModelAdmin):
+    """Admin for PushDevice model"""
+    
+    list_display = [
+        'user',
+        'platform',
+        'updated_at',
+    ]
+    list_filter = ['platform']
+    search_fields = ['user__email', 'token']
+    ordering = ['-updated_at']
+    
+    readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    """Admin for Notification model"""
+    
+    list_display = [
+        'kind',
+        'user',
+        'created_at',
+        'sent_at',
+        'attempts',
+    ]
+    list_filter = ['kind', 'created_at']
+    search_fields = ['user__email', 'title']
+    ordering = ['-created_at']
+    
+    readonly_fields = ['created_at', 'sent_at', 'attempts', 'error']
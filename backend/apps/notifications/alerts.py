@@ -0,0 +1,67 @@
+"""
+SmartCart Budget Alerts
+Server-side evaluation of budget thresholds on every list total change
+
+Levels: 0 (fine), WARNING (budget_percentage >= User.alert_percentage) and
+OVER_BUDGET (total_spent > planned_budget). Each level notifies once when
+it is crossed upwards; dropping back below re-arms it.
+"""
+
+from .sender import notify
+
+
+WARNING = 1
+OVER_BUDGET = 2
+
+
+def budget_alert_level(shopping_list, alert_percentage):
+    if shopping_list.status != 'active' or shopping_list.planned_budget <= 0:
+        return 0
+    if shopping_list.total_spent > shopping_list.planned_budget:
+        return OVER_BUDGET
+    if shopping_list.budget_percentage >= alert_percentage:
+        return WARNING
+    return 0
+
+
+def evaluate_budget_alert(shopping_list, alert_percentage):
+    """
+    Compare the list (as just written) with its stored alert level.
+    Costs nothing while the level holds; a crossing costs one conditional
+    UPDATE, which also makes concurrent writers notify only once.
+    """
+    from apps.shopping.models import ShoppingList
+
+    level = budget_alert_level(shopping_list, alert_percentage)
+    if level == shopping_list.alert_level:
+        return
+    lists = ShoppingList.objects.filter(pk=shopping_list.pk)
+    if level < shopping_list.alert_level:
+        lists.filter(alert_level__gt=level).update(alert_level=level)
+        shopping_list.alert_level = level
+        return
+    if not lists.filter(alert_level__lt=level).update(alert_level=level):
+        return
+    shopping_list.alert_level = level
+
+    name = shopping_list.name or 'sua lista'
+    if level == OVER_BUDGET:
+        exceeded = shopping_list.total_spent - shopping_list.planned_budget
+        notify(
+            shopping_list.user_id,
+            'over_budget',
+            '🚫 Orçamento Ultrapassado!',
+            f'Você ultrapassou R$ {exceeded:.2f} em {name}. '
+            'Adicione crédito ou revise os itens.',
+            {'list_id': shopping_list.pk, 'amount': str(exceeded)},
+        )
+    else:
+        percentage = shopping_list.budget_percentage
+        notify(
+            shopping_list.user_id,
+            'budget_warning',
+            '⚠️ Alerta de Orçamento',
+            f'Você atingiu {percentage:.0f}% do orçamento de {name}! '
+            f'Limite configurado: {alert_percentage}%',
+            {'list_id': shopping_list.pk, 'percentage': float(percentage)},
+        )
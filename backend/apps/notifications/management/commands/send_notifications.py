@@ -0,0 +1,34 @@
+"""
+Management command to deliver queued notifications and drop old ones.
+Catches up on what the background sender did not deliver
+(NOTIFICATIONS DELIVERY_MODE=deferred, a crashed worker, transport errors).
+Run: python manage.py send_notifications [--purge-days 30]
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.notifications.models import Notification
+from apps.notifications.sender import send_pending
+
+
+class Command(BaseCommand):
+    help = 'Send pending push notifications and purge old delivered ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--purge-days',
+            type=int,
+            default=30,
+            help='Delete delivered notifications older than N days (default: 30)'
+        )
+
+    def handle(self, *args, **options):
+        sent = send_pending()
+        cutoff = timezone.now() - timedelta(days=options['purge_days'])
+        purged, _ = Notification.objects.filter(sent_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'Sent {sent} notifications, purged {purged}.'
+        ))
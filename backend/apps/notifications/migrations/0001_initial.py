@@ -0,0 +1,54 @@
+# Generated by Django 5.2.9 on 2026-10-18 20:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PushDevice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=255, unique=True, verbose_name='Token de push')),
+                ('platform', models.CharField(blank=True, choices=[('ios', 'iOS'), ('android', 'Android'), ('web', 'Web')], max_length=10, verbose_name='Plataforma')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='push_devices', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Dispositivo',
+                'verbose_name_plural': 'Dispositivos',
+                'ordering': ['-updated_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('budget_warning', 'Alerta de orçamento'), ('over_budget', 'Orçamento ultrapassado')], max_length=30, verbose_name='Tipo')),
+                ('title', models.CharField(max_length=100, verbose_name='Título')),
+                ('body', models.CharField(max_length=255, verbose_name='Mensagem')),
+                ('data', models.JSONField(blank=True, default=dict, verbose_name='Dados')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Tentativas')),
+                ('error', models.CharField(blank=True, max_length=255, verbose_name='Último erro')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criada em')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Enviada em')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Notificação',
+                'verbose_name_plural': 'Notificações',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['sent_at', 'id'], name='notification_pending')],
+            },
+        ),
+    ]
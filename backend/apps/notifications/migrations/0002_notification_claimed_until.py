@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-18 20:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='claimed_until',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Em envio até'),
+        ),
+    ]
@@ -0,0 +1,104 @@
+"""
+SmartCart Notifications Models
+Push devices and the outbox of server-side notifications
+"""
+
+from django.db import models
+from django.conf import settings
+
+
+class PushDevice(models.Model):
+    """
+    Device registered to receive push notifications (Expo push token)
+    """
+    
+    PLATFORM_CHOICES = [
+        ('ios', 'iOS'),
+        ('android', 'Android'),
+        ('web', 'Web'),
+    ]
+    
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='push_devices',
+        verbose_name='Usuário',
+    )
+    
+    token = models.CharField(
+        'Token de push',
+        max_length=255,
+        unique=True,
+    )
+    
+    platform = models.CharField(
+        'Plataforma',
+        max_length=10,
+        choices=PLATFORM_CHOICES,
+        blank=True,
+    )
+    
+    created_at = models.DateTimeField('Criado em', auto_now_add=True)
+    updated_at = models.DateTimeField('Atualizado em', auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Dispositivo'
+        verbose_name_plural = 'Dispositivos'
+        ordering = ['-updated_at']
+    
+    def __str__(self):
+        return f"{self.user} ({self.get_platform_display() or 'dispositivo'})"
+
+
+class Notification(models.Model):
+    """
+    Notification waiting for (or done with) delivery
+    Rows are written in the transaction that triggered them, so a rolled
+    back change never notifies; the sender delivers them in batches.
+    """
+    
+    KIND_CHOICES = [
+        ('budget_warning', 'Alerta de orçamento'),
+        ('over_budget', 'Orçamento ultrapassado'),
+    ]
+    
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='notifications',
+        verbose_name='Usuário',
+    )
+    
+    kind = models.CharField(
+        'Tipo',
+        max_length=30,
+        choices=KIND_CHOICES,
+    )
+    
+    title = models.CharField('Título', max_length=100)
+    
+    body = models.CharField('Mensagem', max_length=255)
+    
+    data = models.JSONField('Dados', default=dict, blank=True)
+    
+    attempts = models.PositiveSmallIntegerField('Tentativas', default=0)
+    
+    error = models.CharField('Último erro', max_length=255, blank=True)
+    
+    created_at = models.DateTimeField('Criada em', auto_now_add=True)
+    sent_at = models.DateTimeField('Enviada em', null=True, blank=True)
+    
+    # Lease of the sender delivering it; an expired lease is claimed again
+    claimed_until = models.DateTimeField('Em envio até', null=True, blank=True)
+    
+    class Meta:
+        verbose_name = 'Notificação'
+        verbose_name_plural = 'Notificações'
+        ordering = ['-created_at']
+        indexes = [
+            # Pending queue scan: WHERE sent_at IS NULL ORDER BY id
+            models.Index(fields=['sent_at', 'id'], name='notification_pending'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} para {self.user}"
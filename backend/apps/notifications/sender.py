@@ -0,0 +1,186 @@
+"""
+SmartCart Notification Sender
+Queues notifications and delivers them in throttled batches
+
+notify() only writes an outbox row inside the caller's transaction; once it
+commits, delivery runs according to settings.NOTIFICATIONS['DELIVERY_MODE']:
+- 'thread': in a background thread, so the request returns right away
+- 'sync': inline, right after commit
+- 'deferred': left to the send_notifications command (cron)
+"""
+
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Notification, PushDevice
+from .transports import DEVICE_NOT_REGISTERED, get_transport
+
+
+logger = logging.getLogger(__name__)
+
+# Serializes in-process deliveries; across processes the claims do
+_delivery_lock = threading.Lock()
+
+
+def _config(name, default):
+    return getattr(settings, 'NOTIFICATIONS', {}).get(name, default)
+
+
+def notify(user_id, kind, title, body, data=None):
+    """Queue a notification; it is delivered after the transaction commits"""
+    notification = Notification.objects.create(
+        user_id=user_id,
+        kind=kind,
+        title=title,
+        body=body,
+        data=data or {},
+    )
+    mode = _config('DELIVERY_MODE', 'thread')
+    if mode == 'sync':
+        transaction.on_commit(send_pending)
+    elif mode == 'thread':
+        transaction.on_commit(_start_thread)
+    return notification
+
+
+class RateLimiter:
+    """Token bucket: at most `rate` messages per second, bursts up to `rate`"""
+
+    def __init__(self, rate, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = rate
+        self.updated = clock()
+
+    def acquire(self, count):
+        while True:
+            now = self.clock()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= count:
+                self.tokens -= count
+                return
+            self.sleep((count - self.tokens) / self.rate)
+
+
+def send_pending(limiter=None):
+    """
+    Deliver every pending notification. Each batch of up to BATCH_SIZE
+    notifications is claimed (leased for CLAIM_TIMEOUT seconds) in a short
+    transaction, fanned out to the users' devices and handed to the
+    transport in chunks of BATCH_SIZE messages, throttled to RATE_LIMIT
+    messages per second, with no transaction or row lock held. The
+    results are then written in a second short transaction.
+    Failed notifications are retried up to MAX_ATTEMPTS times; a batch
+    whose sender died is claimed again once its lease expires.
+    Returns the number of notifications delivered.
+    """
+    batch_size = _config('BATCH_SIZE', 100)
+    max_attempts = _config('MAX_ATTEMPTS', 5)
+    limiter = limiter or RateLimiter(_config('RATE_LIMIT', 100))
+
+    delivered = 0
+    failed = set()
+    with _delivery_lock:
+        while True:
+            batch = _claim(batch_size, max_attempts, failed)
+            if not batch:
+                return delivered
+            delivered += _deliver(batch, batch_size, limiter, failed)
+
+
+def _claim(batch_size, max_attempts, excluded):
+    """Lease the next pending batch; committed before anything is sent"""
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            Notification.objects.select_for_update(skip_locked=True)
+            .filter(sent_at__isnull=True, attempts__lt=max_attempts)
+            .filter(Q(claimed_until__isnull=True) | Q(claimed_until__lt=now))
+            .exclude(pk__in=excluded)
+            .order_by('id')[:batch_size]
+        )
+        Notification.objects.filter(pk__in=[notification.pk for notification in batch]).update(
+            claimed_until=now + timedelta(seconds=_config('CLAIM_TIMEOUT', 300)),
+        )
+    return batch
+
+
+def _deliver(batch, batch_size, limiter, failed):
+    devices = {}
+    for user_id, token in PushDevice.objects.filter(
+        user_id__in={notification.user_id for notification in batch}
+    ).order_by('id').values_list('user_id', 'token'):
+        devices.setdefault(user_id, []).append(token)
+
+    messages = [
+        (notification, {
+            'to': token,
+            'title': notification.title,
+            'body': notification.body,
+            'data': {'type': notification.kind, **notification.data},
+        })
+        for notification in batch
+        for token in devices.get(notification.user_id, ())
+    ]
+    errors = {}
+    stale_tokens = set()
+    transport = get_transport()
+    for start in range(0, len(messages), batch_size):
+        chunk = messages[start:start + batch_size]
+        limiter.acquire(len(chunk))
+        try:
+            results = transport.send([message for _, message in chunk])
+        except Exception as exc:
+            logger.exception('Push transport failed')
+            results = [str(exc)] * len(chunk)
+        if len(results) != len(chunk):
+            # Results can't be matched to messages: retry the whole chunk
+            logger.error('Push transport returned %d results for %d messages', len(results), len(chunk))
+            results = [f'{len(results)} results for {len(chunk)} messages'] * len(chunk)
+        for (notification, message), error in zip(chunk, results):
+            if error == DEVICE_NOT_REGISTERED:
+                stale_tokens.add(message['to'])
+            elif error:
+                errors[notification.pk] = error
+
+    # Users without devices have nothing to deliver: done as well
+    sent = [notification.pk for notification in batch if notification.pk not in errors]
+    with transaction.atomic():
+        Notification.objects.filter(pk__in=sent).update(sent_at=timezone.now(), claimed_until=None)
+        for pk, error in errors.items():
+            Notification.objects.filter(pk=pk).update(
+                attempts=F('attempts') + 1,
+                error=str(error)[:255],
+                claimed_until=None,
+            )
+        if stale_tokens:
+            PushDevice.objects.filter(token__in=stale_tokens).delete()
+    failed.update(errors)
+    return len(sent)
+
+
+def _start_thread():
+    threading.Thread(
+        target=_send_in_thread,
+        name='notification-sender',
+        daemon=True,
+    ).start()
+
+
+def _send_in_thread():
+    try:
+        send_pending()
+    except Exception:
+        # Pending rows stay queued; send_notifications picks them up
+        logger.exception('Failed to send notifications')
+    finally:
+        connections.close_all()
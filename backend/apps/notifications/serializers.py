@@ -0,0 +1,17 @@
+"""
+SmartCart Notifications Serializers
+"""
+
+from rest_framework import serializers
+from .models import PushDevice
+
+
+class PushDeviceSerializer(serializers.ModelSerializer):
+    """Serializer for PushDevice model"""
+    
+    class Meta:
+        model = PushDevice
+        fields = ['token', 'platform', 'created_at', 'updated_at']
+        read_only_fields = ['created_at', 'updated_at']
+        # Re-registering a token is an upsert, not a validation error
+        extra_kwargs = {'token': {'validators': []}}
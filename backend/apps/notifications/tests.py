@@ -0,0 +1,273 @@
+"""
+SmartCart Notifications Tests
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from apps.shopping.models import ShoppingList, ShoppingItem
+from .models import Notification, PushDevice
+from .sender import RateLimiter, notify, send_pending
+from .transports import DEVICE_NOT_REGISTERED, LocMemTransport
+
+User = get_user_model()
+
+
+class RecordingTransport:
+    """
+    Fake transport: records each batch and the transaction depth it was
+    sent at, fails configured tokens, optionally drops the last result
+    """
+    
+    batches = []
+    depths = []
+    errors = {}
+    truncate = False
+    
+    def __init__(self, **options):
+        pass
+    
+    def send(self, messages):
+        RecordingTransport.batches.append([message['to'] for message in messages])
+        RecordingTransport.depths.append(len(connection.atomic_blocks))
+        results = [self.errors.get(message['to']) for message in messages]
+        return results[:-1] if self.truncate else results
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+    
+    def __call__(self):
+        return self.now
+    
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@override_settings(NOTIFICATIONS={
+    'TRANSPORT': 'apps.notifications.transports.LocMemTransport',
+    'DELIVERY_MODE': 'sync',
+})
+class BudgetAlertTests(APITestCase):
+    """Tests for server-side budget alerts"""
+    
+    def setUp(self):
+        LocMemTransport.outbox.clear()
+        self.user = User.objects.create_user(
+            username='alerts',
+            email='alerts@example.com',
+            password='testpass123',
+            alert_percentage=80,
+        )
+        PushDevice.objects.create(user=self.user, token='ExponentPushToken[a]', platform='android')
+        self.client.force_authenticate(user=self.user)
+        self.shopping_list = ShoppingList.objects.create(
+            user=self.user,
+            name='Mercado',
+            planned_budget=Decimal('100.00'),
+        )
+        self.items_url = f'/api/shopping/{self.shopping_list.id}/items/'
+    
+    def add_item(self, price):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.items_url, {'name': 'Item', 'unit_price': price})
+        return response.data['id']
+    
+    def sent_kinds(self):
+        return [message['data']['type'] for message in LocMemTransport.outbox]
+    
+    def test_each_level_notifies_once(self):
+        """Test crossing the alert threshold and the budget notify once each"""
+        self.add_item('50.00')
+        self.assertEqual(self.sent_kinds(), [])
+        
+        self.add_item('35.00')
+        self.add_item('5.00')
+        self.assertEqual(self.sent_kinds(), ['budget_warning'])
+        
+        self.add_item('20.00')
+        self.add_item('1.00')
+        self.assertEqual(self.sent_kinds(), ['budget_warning', 'over_budget'])
+        message = LocMemTransport.outbox[-1]
+        self.assertEqual(message['to'], 'ExponentPushToken[a]')
+        self.assertEqual(message['data']['list_id'], self.shopping_list.id)
+        self.assertFalse(Notification.objects.filter(sent_at__isnull=True).exists())
+    
+    def test_dropping_below_rearms_alert(self):
+        """Test going back under the threshold lets the alert fire again"""
+        item_id = self.add_item('90.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'{self.items_url}{item_id}/')
+        self.shopping_list.refresh_from_db()
+        self.assertEqual(self.shopping_list.alert_level, 0)
+        
+        self.add_item('85.00')
+        self.assertEqual(self.sent_kinds(), ['budget_warning', 'budget_warning'])
+    
+    def test_budget_edit_is_evaluated(self):
+        """Test lowering the planned budget can trigger the alert"""
+        self.add_item('60.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/shopping/{self.shopping_list.id}/', {'planned_budget': '50.00'})
+        self.assertEqual(self.sent_kinds(), ['over_budget'])
+    
+    def test_rolled_back_write_does_not_notify(self):
+        """Test notifications are queued in the writing transaction"""
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                f'{self.items_url}bulk/',
+                {'create': [{'name': 'Carne', 'unit_price': '95.00'}], 'delete': [999]},
+                format='json',
+            )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(self.sent_kinds(), [])
+    
+    def test_inactive_lists_do_not_alert(self):
+        """Test completed lists are not evaluated"""
+        self.shopping_list.complete()
+        ShoppingItem.objects.create(
+            shopping_list=self.shopping_list, name='Extra', unit_price=Decimal('150.00'),
+        )
+        self.assertFalse(Notification.objects.exists())
+
+
+@override_settings(NOTIFICATIONS={
+    'TRANSPORT': 'apps.notifications.tests.RecordingTransport',
+    'DELIVERY_MODE': 'deferred',
+    'BATCH_SIZE': 2,
+    'MAX_ATTEMPTS': 2,
+})
+class NotificationSenderTests(TestCase):
+    """Tests for the batched, rate-limited sender"""
+    
+    def setUp(self):
+        RecordingTransport.batches = []
+        RecordingTransport.depths = []
+        RecordingTransport.errors = {}
+        RecordingTransport.truncate = False
+        self.user = User.objects.create_user(
+            username='sender',
+            email='sender@example.com',
+            password='testpass123',
+        )
+        for token in ('t1', 't2', 't3'):
+            PushDevice.objects.create(user=self.user, token=token)
+    
+    def test_batches_and_retries(self):
+        """Test messages go out in transport-sized batches; failures retry"""
+        RecordingTransport.errors = {'t2': 'MessageRateExceeded', 't3': DEVICE_NOT_REGISTERED}
+        first = notify(self.user.id, 'budget_warning', 'Alerta', 'Corpo')
+        
+        self.assertEqual(send_pending(limiter=RateLimiter(1000)), 0)
+        # One notification, three devices, batches of two
+        self.assertEqual(RecordingTransport.batches, [['t1', 't2'], ['t3']])
+        self.assertFalse(PushDevice.objects.filter(token='t3').exists())
+        
+        # Retried on the next run, up to MAX_ATTEMPTS
+        send_pending(limiter=RateLimiter(1000))
+        send_pending(limiter=RateLimiter(1000))
+        self.assertEqual(RecordingTransport.batches, [['t1', 't2'], ['t3'], ['t1', 't2']])
+        first.refresh_from_db()
+        self.assertIsNone(first.sent_at)
+        self.assertEqual(first.attempts, 2)
+        self.assertEqual(first.error, 'MessageRateExceeded')
+        
+        RecordingTransport.errors = {}
+        notify(self.user.id, 'over_budget', 'Alerta', 'Corpo')
+        self.assertEqual(send_pending(limiter=RateLimiter(1000)), 1)
+    
+    def test_sends_outside_transactions(self):
+        """Test the transport is called with no transaction (or lock) open"""
+        notify(self.user.id, 'budget_warning', 'Alerta', 'Corpo')
+        outer = len(connection.atomic_blocks)
+        self.assertEqual(send_pending(limiter=RateLimiter(1000)), 1)
+        self.assertEqual(RecordingTransport.depths, [outer, outer])
+        self.assertIsNone(Notification.objects.get().claimed_until)
+    
+    def test_unmatched_results_stay_pending(self):
+        """Test fewer results than messages never marks the chunk sent"""
+        RecordingTransport.truncate = True
+        notification = notify(self.user.id, 'budget_warning', 'Alerta', 'Corpo')
+        
+        self.assertEqual(send_pending(limiter=RateLimiter(1000)), 0)
+        notification.refresh_from_db()
+        self.assertIsNone(notification.sent_at)
+        self.assertIsNone(notification.claimed_until)
+        self.assertEqual(notification.attempts, 1)
+        self.assertTrue(PushDevice.objects.filter(token='t3').exists())
+    
+    def test_claimed_notifications_wait_for_their_lease(self):
+        """Test a batch leased to another sender is only retaken once expired"""
+        notification = notify(self.user.id, 'budget_warning', 'Alerta', 'Corpo')
+        Notification.objects.update(claimed_until=timezone.now() + timedelta(minutes=5))
+        self.assertEqual(send_pending(limiter=RateLimiter(1000)), 0)
+        self.assertEqual(RecordingTransport.batches, [])
+        
+        Notification.objects.update(claimed_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(send_pending(limiter=RateLimiter(1000)), 1)
+        notification.refresh_from_db()
+        self.assertIsNotNone(notification.sent_at)
+    
+    def test_users_without_devices_are_skipped(self):
+        """Test notifications for users without devices are closed unsent"""
+        PushDevice.objects.all().delete()
+        notify(self.user.id, 'budget_warning', 'Alerta', 'Corpo')
+        self.assertEqual(send_pending(), 1)
+        self.assertEqual(RecordingTransport.batches, [])
+    
+    def test_rate_limiter_throttles(self):
+        """Test the token bucket waits once the burst is spent"""
+        clock = FakeClock()
+        limiter = RateLimiter(10, clock=clock, sleep=clock.sleep)
+        limiter.acquire(10)
+        self.assertEqual(clock.slept, [])
+        limiter.acquire(5)
+        self.assertEqual(clock.slept, [0.5])
+
+
+class PushDeviceAPITests(APITestCase):
+    """Tests for push device registration"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='devices',
+            email='devices@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = '/api/notifications/devices/'
+    
+    def test_register_is_an_upsert(self):
+        """Test registering a known token moves it to the current user"""
+        other = User.objects.create_user(
+            username='other', email='other@example.com', password='testpass123'
+        )
+        PushDevice.objects.create(user=other, token='ExponentPushToken[x]')
+        
+        response = self.client.post(self.url, {'token': 'ExponentPushToken[x]', 'platform': 'ios'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        device = PushDevice.objects.get(token='ExponentPushToken[x]')
+        self.assertEqual(device.user, self.user)
+        self.assertEqual(device.platform, 'ios')
+        
+        response = self.client.post(self.url, {'token': 'ExponentPushToken[y]'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+    
+    def test_unregister(self):
+        """Test deleting a token removes the device"""
+        PushDevice.objects.create(user=self.user, token='ExponentPushToken[x]')
+        response = self.client.delete(self.url, {'token': 'ExponentPushToken[x]'})
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(PushDevice.objects.exists())
@@ -0,0 +1,82 @@
+"""
+SmartCart Push Transports
+Deliver batches of push messages
+
+A transport has send(messages) -> list of errors, one per message (None
+when accepted). Messages are dicts: {"to", "title", "body", "data"}.
+The transport is chosen by settings.NOTIFICATIONS['TRANSPORT']:
+- ExpoTransport: Expo push service (the mobile app uses expo-notifications)
+- LocMemTransport: keeps messages in memory (tests, local development)
+"""
+
+import json
+import urllib.request
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+
+# Error returned for tokens the push service no longer knows
+DEVICE_NOT_REGISTERED = 'DeviceNotRegistered'
+
+
+class ExpoTransport:
+    """Posts batches to the Expo push API (up to 100 messages per call)"""
+
+    def __init__(self, url='https://exp.host/--/api/v2/push/send', access_token='', timeout=10, **options):
+        self.url = url
+        self.access_token = access_token
+        self.timeout = timeout
+
+    def send(self, messages):
+        payload = [
+            {**message, 'sound': 'default', 'channelId': 'budget-alerts'}
+            for message in messages
+        ]
+        headers = {'Content-Type': 'application/json', 'Accept': 'application/json'}
+        if self.access_token:
+            headers['Authorization'] = f'Bearer {self.access_token}'
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps(payload).encode(),
+            headers=headers,
+            method='POST',
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            tickets = json.load(response).get('data', [])
+        return [
+            None if ticket.get('status') == 'ok'
+            else ticket.get('details', {}).get('error') or ticket.get('message', 'error')
+            for ticket in tickets
+        ]
+
+
+class LocMemTransport:
+    """Keeps every sent message in LocMemTransport.outbox"""
+
+    outbox = []
+
+    def __init__(self, **options):
+        pass
+
+    def send(self, messages):
+        LocMemTransport.outbox.extend(messages)
+        return [None] * len(messages)
+
+
+@lru_cache(maxsize=None)
+def get_transport():
+    config = getattr(settings, 'NOTIFICATIONS', {})
+    transport_class = import_string(
+        config.get('TRANSPORT', 'apps.notifications.transports.LocMemTransport')
+    )
+    return transport_class(**config.get('OPTIONS', {}))
+
+
+@receiver(setting_changed)
+def _reset_transport(setting, **kwargs):
+    if setting == 'NOTIFICATIONS':
+        get_transport.cache_clear()
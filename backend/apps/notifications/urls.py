@@ -0,0 +1,12 @@
+"""
+SmartCart Notifications URLs
+"""
+
+from django.urls import path
+from .views import PushDeviceView
+
+app_name = 'notifications'
+
+urlpatterns = [
+    path('devices/', PushDeviceView.as_view(), name='devices'),
+]
@@ -0,0 +1,44 @@
+"""
+SmartCart Notifications Views
+"""
+
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .models import PushDevice
+from .serializers import PushDeviceSerializer
+
+
+class PushDeviceView(APIView):
+    """
+    POST /api/notifications/devices/    register this device's push token
+    DELETE /api/notifications/devices/  unregister it (logout)
+    Body: {"token": "ExponentPushToken[...]", "platform": "android"}
+    """
+    
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request):
+        serializer = PushDeviceSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        # A token moves to whoever logged in on the device last
+        device, created = PushDevice.objects.update_or_create(
+            token=serializer.validated_data['token'],
+            defaults={
+                'user': request.user,
+                'platform': serializer.validated_data.get('platform', ''),
+            },
+        )
+        return Response(
+            PushDeviceSerializer(device).data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
+    
+    def delete(self, request):
+        PushDevice.objects.filter(
+            user=request.user,
+            token=request.data.get('token', ''),
+        ).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-18 19:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_alter_paymentmethod_payment_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paymentmethod',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0, help_text='Incrementada a cada alteração (If-Match)', verbose_name='Versão'),
+        ),
+    ]
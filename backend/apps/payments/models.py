@@ -4,7 +4,9 @@ Payment methods management
 """
 
 from django.db import models
+from django.db.models import F
 from django.conf import settings
+from django.utils import timezone
 
 
 class PaymentMethod(models.Model):
@@ -54,6 +56,12 @@ class PaymentMethod(models.Model):
         default=True,
     )
     
+    version = models.PositiveBigIntegerField(
+        'Versão',
+        default=0,
+        help_text='Incrementada a cada alteração (If-Match)',
+    )
+    
     created_at = models.DateTimeField('Criado em', auto_now_add=True)
     updated_at = models.DateTimeField('Atualizado em', auto_now=True)
     
@@ -65,8 +73,71 @@ class PaymentMethod(models.Model):
     def __str__(self):
         return f"{self.get_payment_type_display()} - R$ {self.available_amount}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._committed_amount = instance.__dict__.get('available_amount')
+        return instance
+    
     def save(self, *args, **kwargs):
         # Auto-generate name if not provided
         if not self.name:
             self.name = self.get_payment_type_display()
-        super().save(*args, **kwargs)
+        
+        if self._state.adding:
+            super().save(*args, **kwargs)
+        else:
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None:
+                # The balance moves through atomic deltas; a stale copy only
+                # writes it back when it was edited explicitly
+                update_fields = [
+                    field.name for field in self._meta.concrete_fields
+                    if not field.primary_key
+                    and field.name != 'version'
+                    and (
+                        field.name != 'available_amount'
+                        or self.available_amount != getattr(self, '_committed_amount', None)
+                    )
+                ]
+            kwargs['update_fields'] = {*update_fields, 'version'}
+            self.version = F('version') + 1
+            super().save(*args, **kwargs)
+            self.refresh_from_db(fields=['available_amount', 'version'])
+        self._committed_amount = self.available_amount
+        self._bump_user_version(self.user_id)
+    
+    def add_funds(self, amount):
+        """Credit a positive amount to the available balance"""
+        self._shift_balance(amount)
+    
+    def deduct(self, amount):
+        """
+        Debit amount if the balance covers it.
+        Returns False (and changes nothing) when it does not.
+        """
+        return self._shift_balance(-amount, available_amount__gte=amount)
+    
+    def _shift_balance(self, delta, **conditions):
+        """Single UPDATE ... SET available_amount = available_amount + delta"""
+        updated = PaymentMethod.objects.filter(pk=self.pk, **conditions).update(
+            available_amount=F('available_amount') + delta,
+            version=F('version') + 1,
+            updated_at=timezone.now(),
+        )
+        self.refresh_from_db(fields=['available_amount', 'version', 'updated_at'])
+        self._committed_amount = self.available_amount
+        if updated:
+            self._bump_user_version(self.user_id)
+        return bool(updated)
+    
+    def delete(self, *args, **kwargs):
+        user_id = self.user_id
+        result = super().delete(*args, **kwargs)
+        self._bump_user_version(user_id)
+        return result
+    
+    @staticmethod
+    def _bump_user_version(user_id):
+        from apps.accounts.models import User
+        User.bump_version('payments_version', pk=user_id)
@@ -3,10 +3,12 @@ SmartCart Payments Serializers
 """
 
 from rest_framework import serializers
+
+from config.fieldsets import SparseFieldsetMixin
 from .models import PaymentMethod
 
 
-class PaymentMethodSerializer(serializers.ModelSerializer):
+class PaymentMethodSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for PaymentMethod model"""
     
     payment_type_display = serializers.CharField(
@@ -23,10 +25,11 @@ class PaymentMethodSerializer(serializers.ModelSerializer):
             'name',
             'available_amount',
             'is_active',
+            'version',
             'created_at',
             'updated_at',
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'version', 'created_at', 'updated_at']
     
     def validate_available_amount(self, value):
         if value < 0:
@@ -76,3 +76,84 @@ class PaymentMethodAPITests(APITestCase):
         response = self.client.get('/api/payments/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data['results']), 1)
+
+
+class PaymentMethodConditionalGetTests(APITestCase):
+    """Tests for ETag support on the payment methods list"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='etag',
+            email='etag@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.pm = PaymentMethod.objects.create(
+            user=self.user,
+            payment_type='cash',
+            available_amount=100.00,
+        )
+        self.user.refresh_from_db()
+    
+    def test_list_not_modified_until_write(self):
+        """Test 304 on an unchanged list and 200 after a write"""
+        etag = self.client.get('/api/payments/')['ETag']
+        response = self.client.get('/api/payments/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        
+        self.client.post(f'/api/payments/{self.pm.id}/add_funds/', {'amount': '10.00'})
+        self.user.refresh_from_db()
+        response = self.client.get('/api/payments/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class PaymentMethodConcurrencyTests(APITestCase):
+    """Tests for atomic balance updates and If-Match preconditions"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='concurrency',
+            email='concurrency@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.pm = PaymentMethod.objects.create(
+            user=self.user,
+            payment_type='debit',
+            available_amount=Decimal('100.00'),
+        )
+        self.url = f'/api/payments/{self.pm.id}/'
+    
+    def test_stale_copy_keeps_concurrent_credit(self):
+        """Test a stale in-memory save does not undo another credit"""
+        stale = PaymentMethod.objects.get(pk=self.pm.pk)
+        self.pm.add_funds(Decimal('50.00'))
+        
+        stale.name = 'Cartão Nubank'
+        stale.save()
+        self.assertEqual(stale.available_amount, Decimal('150.00'))
+        self.pm.refresh_from_db()
+        self.assertEqual(self.pm.available_amount, Decimal('150.00'))
+    
+    def test_deduct_only_when_covered(self):
+        """Test a debit larger than the balance changes nothing"""
+        self.assertFalse(self.pm.deduct(Decimal('100.01')))
+        self.assertTrue(self.pm.deduct(Decimal('40.00')))
+        self.assertEqual(self.pm.available_amount, Decimal('60.00'))
+    
+    def test_if_match_conflict(self):
+        """Test a write based on an old version gets 412"""
+        version = self.client.get(self.url).data['version']
+        self.client.post(f'{self.url}add_funds/', {'amount': '10.00'})
+        
+        response = self.client.patch(
+            self.url, {'name': 'Conta'}, HTTP_IF_MATCH=f'"{version}"'
+        )
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertEqual(response.data['version'], version + 1)
+        
+        response = self.client.patch(
+            self.url, {'name': 'Conta'}, HTTP_IF_MATCH=f'"{version + 1}"'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['version'], version + 2)
@@ -8,11 +8,21 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 
+from config.conditional import (
+    OptimisticConcurrencyMixin,
+    conditional_view,
+    versioned_etag,
+)
+from apps.sync.idempotency import IdempotencyMixin
 from .models import PaymentMethod
 from .serializers import PaymentMethodSerializer
 
 
-class PaymentMethodViewSet(viewsets.ModelViewSet):
+def _payments_etag(request, *args, **kwargs):
+    return versioned_etag(request, request.user.payments_version)
+
+
+class PaymentMethodViewSet(IdempotencyMixin, OptimisticConcurrencyMixin, viewsets.ModelViewSet):
     """
     ViewSet for PaymentMethod CRUD operations
     
@@ -22,10 +32,16 @@ class PaymentMethodViewSet(viewsets.ModelViewSet):
     update: PUT /api/payments/{id}/
     partial_update: PATCH /api/payments/{id}/
     destroy: DELETE /api/payments/{id}/
+    
+    Writes accept If-Match: "<version>" (412 when it is stale);
+    add_funds accepts Idempotency-Key
     """
     
     serializer_class = PaymentMethodSerializer
     permission_classes = [IsAuthenticated]
+    version_field = 'version'
+    precondition_actions = {'update', 'partial_update', 'destroy', 'add_funds'}
+    idempotent_actions = {'add_funds'}
     
     def get_queryset(self):
         """Return only user's payment methods"""
@@ -34,6 +50,10 @@ class PaymentMethodViewSet(viewsets.ModelViewSet):
             is_active=True,
         )
     
+    @conditional_view(_payments_etag)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
     def perform_destroy(self, instance):
         """Soft delete - just deactivate"""
         instance.is_active = False
@@ -76,7 +96,6 @@ class PaymentMethodViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        payment_method.available_amount += amount
-        payment_method.save()
+        payment_method.add_funds(amount)
         
         return Response(PaymentMethodSerializer(payment_method).data)
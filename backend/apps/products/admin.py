@@ -3,7 +3,7 @@ SmartCart Products Admin
 """
 
 from django.contrib import admin
-from .models import Product, PriceHistory
+from .models import Product, PriceHistory, ProductPriceStats
 
 
 class PriceHistoryInline(admin.TabularInline):
@@ -47,3 +47,22 @@ class PriceHistoryAdmin(admin.ModelAdmin):
     list_filter = ['recorded_at', 'store_name']
     search_fields = ['product__name']
     ordering = ['-recorded_at']
+
+
+@admin.register(ProductPriceStats)
+class ProductPriceStatsAdmin(admin.ModelAdmin):
+    """Admin for ProductPriceStats model"""
+    
+    list_display = [
+        'product',
+        'count',
+        'min_price',
+        'max_price',
+        'median_90d',
+        'last_price',
+        'last_recorded_at',
+    ]
+    search_fields = ['product__name', 'product__user__email']
+    ordering = ['-last_recorded_at']
+    
+    readonly_fields = [field.name for field in ProductPriceStats._meta.fields]
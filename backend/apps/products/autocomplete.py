@@ -0,0 +1,147 @@
+"""
+SmartCart Product Autocomplete
+Typeahead over the catalog, backed by ProductSearchToken
+
+- every typed word must prefix a word of the name, in any order
+  ("arr tio" finds "Arroz Tio João"); accents and case are ignored
+- names starting with the whole query rank first, then by times_purchased
+  and recency
+- when nothing matches, words of 4+ letters are retried with one typo
+  (two from 8 letters): a substitution, insertion, deletion or swap.
+  Near words come from ProductTypoKey: the start of every indexed word is
+  stored with each spelling left after dropping up to two letters (the
+  first letter is kept; typos rarely hit it), so a typed word finds them
+  through the keys of its own start and only those few are compared
+"""
+
+from itertools import combinations
+
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from apps.shopping.utils import name_tokens, normalize_name
+
+from .models import Product, ProductSearchToken, ProductTypoKey
+
+
+MIN_TYPO_LENGTH = 4
+TYPO_KEY_LENGTH = 5  # letters of a word's start covered by the typo keys
+MAX_TYPOS = 2
+
+
+def filter_by_name(queryset, user, query):
+    """Narrow a Product queryset to names matching every word of `query`"""
+    terms = name_tokens(query)
+    if not terms:
+        return queryset
+    return _match_terms(queryset, user, [Q(token__startswith=term) for term in terms])
+
+
+def suggest(user, query, limit=10):
+    """
+    Best `limit` products for a typeahead `query`.
+    One query when the words match as typed; on a miss, up to one more per
+    word to collect near spellings and one to retry.
+    """
+    terms = name_tokens(query)
+    if not terms:
+        return []
+    products = Product.objects.filter(user=user).select_related('price_stats')
+
+    results = list(_ranked(
+        _match_terms(products, user, [Q(token__startswith=term) for term in terms]),
+        query,
+    )[:limit])
+    if results:
+        return results
+
+    conditions = []
+    for term in terms:
+        condition = Q(token__startswith=term)
+        if len(term) >= MIN_TYPO_LENGTH:
+            near = _near_tokens(user, term)
+            if near:
+                condition |= Q(token__in=near)
+        conditions.append(condition)
+    return list(_ranked(_match_terms(products, user, conditions), query)[:limit])
+
+
+def _match_terms(queryset, user, conditions):
+    for condition in conditions:
+        queryset = queryset.filter(pk__in=ProductSearchToken.objects.filter(
+            condition,
+            user=user,
+        ).values('product_id'))
+    return queryset
+
+
+def _ranked(queryset, query):
+    return queryset.annotate(
+        starts_with_query=Case(
+            When(normalized_name__startswith=normalize_name(query), then=Value(1)),
+            default=Value(0),
+            output_field=IntegerField(),
+        ),
+    ).order_by('-starts_with_query', '-times_purchased', '-updated_at', '-id')
+
+
+def typo_keys(token):
+    """
+    Keys of an indexed word: its first letter plus what is left of the next
+    ones after dropping up to MAX_TYPOS letters, 3 to TYPO_KEY_LENGTH long
+    """
+    keys = set()
+    for length in range(MIN_TYPO_LENGTH - 1, TYPO_KEY_LENGTH + 1):
+        window = token[1:length + MAX_TYPOS]
+        keys.update(token[0] + ''.join(rest) for rest in combinations(window, length - 1))
+    return keys
+
+
+def _query_keys(term, budget):
+    """Keys a word within `budget` typos of the start of `term` is stored under"""
+    start = term[:TYPO_KEY_LENGTH]
+    return {
+        start[0] + ''.join(rest)
+        for dropped in range(budget + 1)
+        for rest in combinations(start[1:], len(start) - 1 - dropped)
+    }
+
+
+def _near_tokens(user, term):
+    """Indexed words whose start is within the typo budget of `term`"""
+    budget = 1 if len(term) < 8 else 2
+    # Two words within `budget` typos keep a common spelling after each
+    # drops up to `budget` letters: one indexed lookup finds the candidates
+    candidates = ProductTypoKey.objects.filter(
+        user=user,
+        key__in=_query_keys(term, budget),
+    ).values_list('token', flat=True).distinct()
+    return [
+        token for token in candidates
+        if _prefix_distance(term, token, budget) <= budget
+    ]
+
+
+def _prefix_distance(term, token, budget):
+    """Edit distance from `term` to the closest prefix of `token`"""
+    return min(
+        _distance(term, token[:length], budget)
+        for length in range(max(1, len(term) - budget), len(term) + budget + 1)
+    )
+
+
+def _distance(a, b, budget):
+    """Optimal string alignment distance, capped at budget + 1"""
+    if abs(len(a) - len(b)) > budget:
+        return budget + 1
+    previous, current = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        before, previous = previous, current
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > budget:
+            return budget + 1
+    return current[-1]
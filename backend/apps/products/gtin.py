@@ -0,0 +1,198 @@
+"""
+SmartCart GTIN Catalog
+Barcode lookup: the user's own products first, then a shared reference
+catalog of GTINs (EAN-8/13, UPC-A, GTIN-14)
+
+The reference catalog is a read-only binary file written by the
+import_gtin_catalog command and memory-mapped by every process, so all
+workers share one copy through the OS page cache:
+
+    header   magic (8 bytes), record count (uint32), reserved (uint32)
+    records  sorted by GTIN: gtin (uint64), text offset (uint32),
+             text length (uint16), padding (uint16)
+    text     UTF-8 "name\\tbrand\\tcategory" of each record
+
+A lookup is a binary search over the records (~24 probes for 10M GTINs).
+The import replaces the file atomically; processes pick the new one up
+on their next lookup and unmap the old one once its last reader is done.
+"""
+
+import mmap
+import os
+import re
+import struct
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+
+MAGIC = b'SCGTIN1\x00'
+HEADER = struct.Struct('<8sII')
+RECORD = struct.Struct('<QIHH')
+GTIN_LENGTHS = (8, 12, 13, 14)
+MAX_TEXT = 200  # characters per field, so a record's text fits its uint16 length
+
+
+def normalize_gtin(code):
+    """
+    Scanned or typed barcode as a 14-digit GTIN string, or None when it
+    is not a valid GTIN (length or check digit)
+    """
+    digits = re.sub(r'[\s-]', '', str(code or ''))
+    if not digits.isdigit() or len(digits) not in GTIN_LENGTHS:
+        return None
+    body, check = digits[:-1], int(digits[-1])
+    total = sum(int(digit) * (3 if position % 2 == 0 else 1)
+                for position, digit in enumerate(reversed(body)))
+    if (10 - total % 10) % 10 != check:
+        return None
+    return digits.zfill(14)
+
+
+def barcode_variants(gtin):
+    """Spellings a 14-digit GTIN may be stored under (EAN-13, UPC-A...)"""
+    significant = gtin.lstrip('0')
+    return sorted({
+        gtin[-length:] for length in GTIN_LENGTHS
+        if length >= len(significant)
+    })
+
+
+class GtinCatalog:
+    """Memory-mapped reference catalog file"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as catalog_file:
+            stat = os.fstat(catalog_file.fileno())
+            self.identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            self._map = mmap.mmap(catalog_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, _ = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self._map.close()
+            raise ValueError(f'{path} is not a GTIN catalog file')
+        self._text_start = HEADER.size + self.count * RECORD.size
+        # Lookups in progress; a replaced catalog is unmapped when none is
+        self.readers = 0
+        self.replaced = False
+
+    def __len__(self):
+        return self.count
+
+    def get(self, gtin):
+        """{'name', 'brand', 'category'} of a 14-digit GTIN, or None"""
+        key = int(gtin)
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            value, offset, length, _ = RECORD.unpack_from(
+                self._map, HEADER.size + middle * RECORD.size,
+            )
+            if value < key:
+                low = middle + 1
+            elif value > key:
+                high = middle
+            else:
+                start = self._text_start + offset
+                name, brand, category = self._map[start:start + length].decode().split('\t')
+                return {'name': name, 'brand': brand, 'category': category}
+        return None
+
+    def close(self):
+        self._map.close()
+
+
+def write_catalog(path, entries):
+    """
+    Write {gtin: (name, brand, category)} as a catalog file at `path`,
+    atomically: readers see the old file or the new one, never a mix.
+    Returns the number of records.
+    """
+    text = bytearray()
+    records = []
+    for gtin in sorted(entries, key=int):
+        encoded = '\t'.join(
+            value.replace('\t', ' ').strip()[:MAX_TEXT] for value in entries[gtin]
+        ).encode()
+        records.append(RECORD.pack(int(gtin), len(text), len(encoded), 0))
+        text += encoded
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temporary = f'{path}.tmp'
+    with open(temporary, 'wb') as catalog_file:
+        catalog_file.write(HEADER.pack(MAGIC, len(records), 0))
+        catalog_file.writelines(records)
+        catalog_file.write(text)
+    os.replace(temporary, path)
+    return len(records)
+
+
+_lock = threading.Lock()
+_catalog = None
+
+
+@contextmanager
+def reference_catalog():
+    """
+    This process's mapping of settings.GTIN_CATALOG_PATH (None if absent),
+    kept open for the block. When the file has been replaced, the new one
+    is mapped and the old mapping and its file descriptor are released as
+    soon as no block uses them any more.
+    """
+    global _catalog
+    path = settings.GTIN_CATALOG_PATH
+    try:
+        stat = os.stat(path)
+    except OSError:
+        yield None
+        return
+    identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        if _catalog is None or _catalog[0] != path or _catalog[1].identity != identity:
+            replaced, _catalog = _catalog, (path, GtinCatalog(path))
+            if replaced is not None:
+                replaced[1].replaced = True
+                if not replaced[1].readers:
+                    replaced[1].close()
+        catalog = _catalog[1]
+        catalog.readers += 1
+    try:
+        yield catalog
+    finally:
+        with _lock:
+            catalog.readers -= 1
+            if catalog.replaced and not catalog.readers:
+                catalog.close()
+
+
+def lookup_barcode(user, code):
+    """
+    What a scanned barcode is: the user's product with that barcode (one
+    indexed query), else the reference catalog entry, else None.
+    Raises ValueError when `code` is not a valid GTIN.
+    """
+    from .models import Product
+
+    gtin = normalize_gtin(code)
+    if gtin is None:
+        raise ValueError(code)
+
+    product = Product.objects.filter(
+        user=user,
+        barcode__in=barcode_variants(gtin),
+    ).select_related('price_stats').order_by('-times_purchased', '-updated_at').first()
+    if product is not None:
+        return {
+            'gtin': gtin,
+            'source': 'products',
+            'name': product.name,
+            'brand': '',
+            'category': product.category,
+            'product': product,
+        }
+
+    with reference_catalog() as catalog:
+        entry = catalog.get(gtin) if catalog is not None else None
+    if entry is None:
+        return None
+    return {'gtin': gtin, 'source': 'catalog', **entry, 'product': None}
@@ -0,0 +1,56 @@
+"""
+SmartCart Price Lookup
+Price hints for a whole shopping list in one query
+"""
+
+from django.db.models import Q
+
+from apps.shopping.utils import normalize_name
+
+from .models import Product
+
+
+def lookup_prices(user, names=(), ids=()):
+    """
+    Last price, date and price rating for each of `names` (item names,
+    matched ignoring accents, case and spacing) and `ids` (product ids).
+
+    One query whatever the number of keys: the products, with their price
+    statistics, by normalized name or id.
+    Returns one entry per key, names first, in request order.
+    """
+    keys = {name: normalize_name(name) for name in names}
+    products = list(
+        Product.objects.filter(user=user)
+        .filter(Q(pk__in=ids) | Q(normalized_name__in=set(keys.values())))
+        .select_related('price_stats')
+        .order_by('-times_purchased', '-updated_at')
+    )
+    by_id = {product.pk: product for product in products}
+    by_key = {}
+    for product in products:
+        # Most purchased spelling wins when several normalize alike
+        by_key.setdefault(product.normalized_name, product)
+
+    results = [{'name': name, **_price_hint(by_key.get(key))} for name, key in keys.items()]
+    results += [{'id': product_id, **_price_hint(by_id.get(product_id))} for product_id in ids]
+    return results
+
+
+def _price_hint(product):
+    if product is None:
+        return {
+            'product': None,
+            'last_price': None,
+            'last_date': None,
+            'rating': None,
+            'price_stats': None,
+        }
+    stats = getattr(product, 'price_stats', None)
+    return {
+        'product': {'id': product.pk, 'name': product.name},
+        'last_price': stats.last_price if stats else product.last_price,
+        'last_date': stats.last_recorded_at if stats else None,
+        'rating': stats.rate(stats.last_price)['rating'] if stats else None,
+        'price_stats': stats,
+    }
@@ -0,0 +1,62 @@
+"""
+Management command to (re)build the shared GTIN reference catalog from a
+bulk CSV export (columns gtin, name and optionally brand and category).
+Rows with an invalid GTIN are skipped; a repeated GTIN keeps its last row.
+The catalog file is replaced atomically and running workers switch to it
+on their next barcode lookup.
+Run: python manage.py import_gtin_catalog gtins.csv [--output /path/gtin_catalog.bin]
+"""
+
+import csv
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.products.gtin import normalize_gtin, write_catalog
+
+
+class Command(BaseCommand):
+    help = 'Build the GTIN reference catalog used by barcode lookups'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'source',
+            type=str,
+            help='CSV file with a header row: gtin,name[,brand][,category]'
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            help='Catalog file to write (default: settings.GTIN_CATALOG_PATH)'
+        )
+        parser.add_argument(
+            '--delimiter',
+            type=str,
+            default=',',
+            help='CSV delimiter (default: ,)'
+        )
+
+    def handle(self, *args, **options):
+        entries = {}
+        skipped = 0
+        try:
+            with open(options['source'], newline='', encoding='utf-8-sig') as source:
+                reader = csv.DictReader(source, delimiter=options['delimiter'])
+                if not {'gtin', 'name'} <= set(reader.fieldnames or ()):
+                    raise CommandError('The CSV header must have gtin and name columns.')
+                for row in reader:
+                    gtin = normalize_gtin(row['gtin'])
+                    name = (row['name'] or '').strip()
+                    if gtin is None or not name:
+                        skipped += 1
+                        continue
+                    entries[gtin] = (name, row.get('brand') or '', row.get('category') or '')
+        except OSError as error:
+            raise CommandError(f'Cannot read {options["source"]}: {error}')
+
+        output = options['output'] or settings.GTIN_CATALOG_PATH
+        count = write_catalog(output, entries)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {count} GTINs into {output} ({skipped} rows skipped).'
+        ))
@@ -0,0 +1,40 @@
+"""
+Management command to recompute the precomputed price statistics from the
+full price history (backfill for products priced before they existed).
+Run: python manage.py rebuild_price_stats [--email user@example.com]
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.products.models import Product, ProductPriceStats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the price statistics of every product'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--email',
+            type=str,
+            help='Only rebuild the products of this user'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Products per transaction (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        queryset = Product.objects.filter(price_history__isnull=False).distinct()
+        if options['email']:
+            queryset = queryset.filter(user__email=options['email'])
+        product_ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+
+        chunk_size = options['chunk_size']
+        for start in range(0, len(product_ids), chunk_size):
+            ProductPriceStats.rebuild(product_ids[start:start + chunk_size])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt price statistics of {len(product_ids)} products.'
+        ))
@@ -0,0 +1,40 @@
+"""
+Management command to feed completed shopping lists into the product
+catalog. Catches up on lists the background pipeline did not record
+(CATALOG_PIPELINE_MODE=deferred, a crashed worker, lists completed
+before the pipeline existed).
+Run: python manage.py record_completed_lists [--email user@example.com]
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.products.purchases import record_completed_list
+from apps.shopping.models import ShoppingList
+
+
+class Command(BaseCommand):
+    help = 'Record unrecorded completed lists into products and price history'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--email',
+            type=str,
+            help='Only record lists of this user'
+        )
+
+    def handle(self, *args, **options):
+        queryset = ShoppingList.objects.filter(
+            status='completed',
+            catalog_recorded_at__isnull=True,
+        ).order_by('completed_at', 'pk')
+        if options['email']:
+            queryset = queryset.filter(user__email=options['email'])
+
+        lists = products = 0
+        for list_id in queryset.values_list('pk', flat=True).iterator():
+            lists += 1
+            products += record_completed_list(list_id)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Recorded {lists} lists ({products} products).')
+        )
@@ -0,0 +1,111 @@
+"""
+SmartCart Product Matching
+Links free-text shopping items to catalog products
+
+Names are compared as sets of character trigrams of their words (padded,
+so word order does not matter), after folding accents and case and
+gluing quantities to their units ("Arroz 5 kg" -> "arroz 5kg"). Two
+names are the same product when the Jaccard similarity of their trigram
+sets reaches PRODUCT_MATCH_THRESHOLD and they carry the same numbers
+(sizes tell "Arroz 1kg" and "Arroz 5kg" apart).
+
+Comparing an item with the whole catalog would be a scan, so products
+are indexed by MinHash LSH: a 32-hash MinHash signature cut into 16 bands
+of 2, each band hashed into a ProductMatchKey row. Names sharing a band
+are the candidates (names at the 0.6 threshold share one with ~99.9%
+probability), then the exact similarity decides.
+"""
+
+import re
+from hashlib import blake2b
+from random import Random
+from zlib import crc32
+
+from django.conf import settings
+
+from apps.shopping.utils import normalize_name
+
+
+BANDS = 16
+ROWS = 2
+_PRIME = (1 << 61) - 1
+_rng = Random(20240601)
+_HASHES = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(BANDS * ROWS)]
+
+
+def canonical_name(name):
+    """Folded name with quantities glued to their units"""
+    return re.sub(r'(\d)\s+(?=[a-z])', r'\1', normalize_name(name))
+
+
+def shingles(name):
+    """Character trigrams of each word of the canonical name"""
+    return {
+        f' {word} '[start:start + 3]
+        for word in re.findall(r'[a-z0-9]+', canonical_name(name))
+        for start in range(len(word))
+    }
+
+
+def numbers(name):
+    return sorted(re.findall(r'\d+', canonical_name(name)))
+
+
+def similarity(name, other):
+    """Trigram Jaccard similarity; 0 when the numbers differ"""
+    if numbers(name) != numbers(other):
+        return 0.0
+    a, b = shingles(name), shingles(other)
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def band_keys(name):
+    """LSH bucket keys of a name (signed 64-bit, one per band)"""
+    hashed = [crc32(shingle.encode()) for shingle in shingles(name)]
+    if not hashed:
+        return []
+    signature = [min((a * value + b) % _PRIME for value in hashed) for a, b in _HASHES]
+    keys = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS:(band + 1) * ROWS]
+        digest = blake2b(repr((band, rows)).encode(), digest_size=8).digest()
+        keys.append(int.from_bytes(digest, 'big', signed=True))
+    return keys
+
+
+def resolve(user_id, names):
+    """
+    {name: (product_id, product_name)} for the names that match one of
+    the user's products; the best match wins, then the most purchased.
+    One query for all the names.
+    """
+    from .models import ProductMatchKey
+
+    keys_by_name = {name: band_keys(name) for name in set(names)}
+    all_keys = {key for keys in keys_by_name.values() for key in keys}
+    if not all_keys:
+        return {}
+
+    candidates_by_key = {}
+    for key, product_id, product_name, times_purchased in ProductMatchKey.objects.filter(
+        user_id=user_id,
+        key__in=all_keys,
+    ).values_list('key', 'product_id', 'product__name', 'product__times_purchased'):
+        candidates_by_key.setdefault(key, {})[product_id] = (product_name, times_purchased)
+
+    threshold = settings.PRODUCT_MATCH_THRESHOLD
+    matches = {}
+    for name, keys in keys_by_name.items():
+        candidates = {}
+        for key in keys:
+            candidates.update(candidates_by_key.get(key, {}))
+        scored = [
+            (similarity(name, product_name), times_purchased, product_id, product_name)
+            for product_id, (product_name, times_purchased) in candidates.items()
+        ]
+        best = max(scored, default=None)
+        if best is not None and best[0] >= threshold:
+            matches[name] = best[2:]
+    return matches
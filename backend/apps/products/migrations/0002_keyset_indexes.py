@@ -0,0 +1,19 @@
+# Generated by Django 5.2.9 on 2026-10-18 19:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['user', '-times_purchased', '-updated_at', '-id'], name='product_user_ranking'),
+        ),
+    ]
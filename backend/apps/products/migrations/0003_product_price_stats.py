@@ -0,0 +1,34 @@
+# Generated by Django 5.2.9 on 2026-10-18 20:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductPriceStats',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='price_stats', serialize=False, to='products.product', verbose_name='Produto')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Registros')),
+                ('sum_price', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Soma')),
+                ('min_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Menor preço')),
+                ('max_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Maior preço')),
+                ('ewma', models.DecimalField(decimal_places=4, help_text='Peso PRICE_EWMA_ALPHA para o preço mais recente', max_digits=12, verbose_name='Média móvel exponencial')),
+                ('median_90d', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Mediana (90 dias)')),
+                ('last_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Último preço')),
+                ('last_recorded_at', models.DateTimeField(verbose_name='Último registro')),
+                ('recent_prices', models.JSONField(default=list, verbose_name='Preços recentes')),
+                ('store_prices', models.JSONField(default=dict, verbose_name='Último preço por loja')),
+            ],
+            options={
+                'verbose_name': 'Estatística de Preço',
+                'verbose_name_plural': 'Estatísticas de Preço',
+            },
+        ),
+    ]
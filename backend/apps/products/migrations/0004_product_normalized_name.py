@@ -0,0 +1,32 @@
+from django.db import migrations, models
+
+
+def fill_normalized_names(apps, schema_editor):
+    from apps.shopping.utils import normalize_name
+
+    Product = apps.get_model('products', 'Product')
+    products = list(Product.objects.only('id', 'name'))
+    for product in products:
+        product.normalized_name = normalize_name(product.name)
+    Product.objects.bulk_update(products, ['normalized_name'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_product_price_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='normalized_name',
+            field=models.CharField(default='', editable=False, max_length=200, verbose_name='Nome normalizado'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_normalized_names, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['user', 'normalized_name'], name='product_normalized_name'),
+        ),
+    ]
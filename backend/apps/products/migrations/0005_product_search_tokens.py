@@ -0,0 +1,48 @@
+# Generated by Django 5.2.9 on 2026-10-18 20:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def index_products(apps, schema_editor):
+    from apps.shopping.utils import name_tokens
+
+    Product = apps.get_model('products', 'Product')
+    ProductSearchToken = apps.get_model('products', 'ProductSearchToken')
+    ProductSearchToken.objects.bulk_create(
+        (
+            ProductSearchToken(user_id=user_id, product_id=product_id, token=token[:50])
+            for product_id, user_id, name in Product.objects.values_list('id', 'user_id', 'name').iterator()
+            for token in name_tokens(name)
+        ),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_product_normalized_name'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=50, verbose_name='Palavra')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='products.product', verbose_name='Produto')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Palavra de Busca',
+                'verbose_name_plural': 'Palavras de Busca',
+                'indexes': [models.Index(fields=['user', 'token'], name='product_token_prefix', opclasses=['', 'varchar_pattern_ops'])],
+                'unique_together': {('product', 'token')},
+            },
+        ),
+        migrations.RunPython(index_products, migrations.RunPython.noop),
+    ]
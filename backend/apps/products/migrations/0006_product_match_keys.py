@@ -0,0 +1,48 @@
+# Generated by Django 5.2.9 on 2026-10-18 20:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def index_products(apps, schema_editor):
+    from apps.products.matching import band_keys
+
+    Product = apps.get_model('products', 'Product')
+    ProductMatchKey = apps.get_model('products', 'ProductMatchKey')
+    ProductMatchKey.objects.bulk_create(
+        (
+            ProductMatchKey(user_id=user_id, product_id=product_id, key=key)
+            for product_id, user_id, name in Product.objects.values_list('id', 'user_id', 'name').iterator()
+            for key in set(band_keys(name))
+        ),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_product_search_tokens'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductMatchKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.BigIntegerField(verbose_name='Chave LSH')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='match_keys', to='products.product', verbose_name='Produto')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Chave de Correspondência',
+                'verbose_name_plural': 'Chaves de Correspondência',
+                'indexes': [models.Index(fields=['user', 'key'], name='product_match_key')],
+                'unique_together': {('product', 'key')},
+            },
+        ),
+        migrations.RunPython(index_products, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.9 on 2026-10-18 20:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_product_match_keys'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['user', 'barcode'], name='product_barcode'),
+        ),
+    ]
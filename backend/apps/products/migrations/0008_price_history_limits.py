@@ -0,0 +1,41 @@
+# Generated by Django 5.2.9 on 2026-10-18 20:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def build_sparklines(apps, schema_editor):
+    from apps.products.models import fold_sparkline
+
+    PriceHistory = apps.get_model('products', 'PriceHistory')
+    ProductPriceStats = apps.get_model('products', 'ProductPriceStats')
+    stats = ProductPriceStats.objects.in_bulk()
+    for product_id, price, recorded_at in PriceHistory.objects.filter(
+        product_id__in=list(stats),
+    ).order_by('product_id', 'recorded_at', 'id').values_list('product_id', 'price', 'recorded_at').iterator():
+        fold_sparkline(stats[product_id].sparkline, recorded_at, price, settings.PRICE_SPARKLINE_POINTS)
+    ProductPriceStats.objects.bulk_update(stats.values(), ['sparkline'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_product_barcode_index'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='pricehistory',
+            options={'ordering': ['-recorded_at', '-id'], 'verbose_name': 'Histórico de Preço', 'verbose_name_plural': 'Históricos de Preços'},
+        ),
+        migrations.AddField(
+            model_name='productpricestats',
+            name='sparkline',
+            field=models.JSONField(default=list, verbose_name='Série resumida'),
+        ),
+        migrations.AddIndex(
+            model_name='pricehistory',
+            index=models.Index(fields=['product', '-recorded_at', '-id'], name='price_history_recent'),
+        ),
+        migrations.RunPython(build_sparklines, migrations.RunPython.noop),
+    ]
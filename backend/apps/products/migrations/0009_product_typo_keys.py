@@ -0,0 +1,51 @@
+# Generated by Django 5.2.9 on 2026-10-18 21:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def index_products(apps, schema_editor):
+    from apps.products.autocomplete import typo_keys
+    from apps.shopping.utils import name_tokens
+
+    Product = apps.get_model('products', 'Product')
+    ProductTypoKey = apps.get_model('products', 'ProductTypoKey')
+    ProductTypoKey.objects.bulk_create(
+        (
+            ProductTypoKey(user_id=user_id, product_id=product_id, token=token[:50], key=key)
+            for product_id, user_id, name in Product.objects.values_list('id', 'user_id', 'name').iterator()
+            for token in name_tokens(name)
+            for key in typo_keys(token[:50])
+        ),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_price_history_limits'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductTypoKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=50, verbose_name='Palavra')),
+                ('key', models.CharField(max_length=10, verbose_name='Chave')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='typo_keys', to='products.product', verbose_name='Produto')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Chave de Digitação',
+                'verbose_name_plural': 'Chaves de Digitação',
+                'indexes': [models.Index(fields=['user', 'key'], name='product_typo_key')],
+                'unique_together': {('product', 'token', 'key')},
+            },
+        ),
+        migrations.RunPython(index_products, migrations.RunPython.noop),
+    ]
@@ -3,8 +3,41 @@ SmartCart Products Models
 Product catalog and history
 """
 
-from django.db import models
+from datetime import datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from statistics import median
+
+from django.db import models, transaction
 from django.conf import settings
+from django.utils import timezone
+
+from apps.shopping.utils import name_tokens, normalize_name
+
+
+CENTS = Decimal('0.01')
+
+
+def fold_sparkline(points, recorded_at, price, size):
+    """
+    Add a price to a downsampled series of at most `size` points, in place.
+    points: oldest first, [[iso date of the newest price, "sum", count]].
+    Past `size`, the adjacent pair holding the fewest prices (the oldest
+    on ties) merges, so the points keep covering similar numbers of
+    prices over the whole history.
+    """
+    date = recorded_at.isoformat()
+    position = len(points)
+    while position and points[position - 1][0] > date:
+        position -= 1
+    points.insert(position, [date, str(price), 1])
+    while len(points) > size:
+        merge = min(range(len(points) - 1), key=lambda i: points[i][2] + points[i + 1][2])
+        older, newer = points[merge], points.pop(merge + 1)
+        points[merge] = [
+            newer[0],
+            str(Decimal(older[1]) + Decimal(newer[1])),
+            older[2] + newer[2],
+        ]
 
 
 class Product(models.Model):
@@ -25,6 +58,13 @@ class Product(models.Model):
         max_length=200,
     )
     
+    # normalize_name(name): matches item names ignoring accents and case
+    normalized_name = models.CharField(
+        'Nome normalizado',
+        max_length=200,
+        editable=False,
+    )
+    
     barcode = models.CharField(
         'Código de barras',
         max_length=50,
@@ -71,9 +111,57 @@ class Product(models.Model):
         verbose_name_plural = 'Produtos'
         ordering = ['-times_purchased', '-updated_at']
         unique_together = ['user', 'name']
+        indexes = [
+            # Keyset pagination of the catalog
+            models.Index(
+                fields=['user', '-times_purchased', '-updated_at', '-id'],
+                name='product_user_ranking',
+            ),
+            models.Index(
+                fields=['user', 'normalized_name'],
+                name='product_normalized_name',
+            ),
+            # Barcode scanner lookup (apps.products.gtin)
+            models.Index(
+                fields=['user', 'barcode'],
+                name='product_barcode',
+            ),
+        ]
     
     def __str__(self):
         return self.name
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._indexed_name = instance.__dict__.get('normalized_name')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        self.normalized_name = normalize_name(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'normalized_name'}
+        reindex = self._state.adding or self.normalized_name != getattr(self, '_indexed_name', None)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if reindex:
+                ProductSearchToken.reindex(self.user_id, [(self.pk, self.name)])
+                ProductMatchKey.reindex(self.user_id, [(self.pk, self.name)])
+                ProductTypoKey.reindex(self.user_id, [(self.pk, self.name)])
+        self._indexed_name = self.normalized_name
+        self._bump_user_version(self.user_id)
+    
+    def delete(self, *args, **kwargs):
+        user_id = self.user_id
+        result = super().delete(*args, **kwargs)
+        self._bump_user_version(user_id)
+        return result
+    
+    @staticmethod
+    def _bump_user_version(user_id):
+        from apps.accounts.models import User
+        User.bump_version('catalog_version', pk=user_id)
 
 
 class PriceHistory(models.Model):
@@ -105,7 +193,371 @@ class PriceHistory(models.Model):
     class Meta:
         verbose_name = 'Histórico de Preço'
         verbose_name_plural = 'Históricos de Preços'
-        ordering = ['-recorded_at']
+        ordering = ['-recorded_at', '-id']
+        indexes = [
+            # Newest prices of a product (nested history, keyset pages)
+            models.Index(
+                fields=['product', '-recorded_at', '-id'],
+                name='price_history_recent',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.product.name} - R$ {self.price} em {self.recorded_at.strftime('%d/%m/%Y')}"
+    
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                ProductPriceStats.record_many({
+                    self.product_id: [(self.price, self.store_name, self.recorded_at)],
+                })
+
+
+class ProductPriceStats(models.Model):
+    """
+    Running price statistics of a product
+    Updated incrementally on every PriceHistory insert, so rating a price
+    is O(1) instead of a scan of the history. The 90-day median is
+    recomputed at write time from a bounded window of recent prices.
+    """
+    
+    product = models.OneToOneField(
+        Product,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='price_stats',
+        verbose_name='Produto',
+    )
+    
+    count = models.PositiveIntegerField('Registros', default=0)
+    
+    sum_price = models.DecimalField('Soma', max_digits=14, decimal_places=2, default=0)
+    
+    min_price = models.DecimalField('Menor preço', max_digits=10, decimal_places=2)
+    
+    max_price = models.DecimalField('Maior preço', max_digits=10, decimal_places=2)
+    
+    ewma = models.DecimalField(
+        'Média móvel exponencial',
+        max_digits=12,
+        decimal_places=4,
+        help_text='Peso PRICE_EWMA_ALPHA para o preço mais recente',
+    )
+    
+    median_90d = models.DecimalField('Mediana (90 dias)', max_digits=10, decimal_places=2)
+    
+    last_price = models.DecimalField('Último preço', max_digits=10, decimal_places=2)
+    
+    last_recorded_at = models.DateTimeField('Último registro')
+    
+    # Newest first: [[iso date, "price"], ...] within PRICE_STATS_WINDOW_DAYS
+    recent_prices = models.JSONField('Preços recentes', default=list)
+    
+    # {"store": {"price": "9.90", "date": iso date}}
+    store_prices = models.JSONField('Último preço por loja', default=dict)
+    
+    # Whole history downsampled to PRICE_SPARKLINE_POINTS, oldest first:
+    # [[iso date, "sum", count], ...] (see fold_sparkline)
+    sparkline = models.JSONField('Série resumida', default=list)
+    
+    class Meta:
+        verbose_name = 'Estatística de Preço'
+        verbose_name_plural = 'Estatísticas de Preço'
+    
+    def __str__(self):
+        return f"Estatísticas de {self.product_id} ({self.count} preços)"
+    
+    @property
+    def mean_price(self):
+        return (self.sum_price / self.count).quantize(CENTS, ROUND_HALF_UP) if self.count else None
+    
+    @property
+    def sparkline_points(self):
+        """The sparkline as {'date', 'price'} points, price being the mean"""
+        return [
+            {
+                'date': datetime.fromisoformat(date),
+                'price': (Decimal(total) / count).quantize(CENTS, ROUND_HALF_UP),
+            }
+            for date, total, count in self.sparkline
+        ]
+    
+    @classmethod
+    def record_many(cls, prices_by_product):
+        """
+        Fold new prices into the statistics of several products.
+        prices_by_product: {product_id: [(price, store_name, recorded_at)]}.
+        Three queries at most, whatever the number of products; the rows
+        are locked so concurrent inserts do not lose updates.
+        """
+        if not prices_by_product:
+            return
+        # No savepoint: callers already run inside their own transaction
+        with transaction.atomic(savepoint=False):
+            existing = cls.objects.select_for_update().in_bulk(list(prices_by_product))
+            created, updated = [], []
+            for product_id, prices in prices_by_product.items():
+                stats = existing.get(product_id)
+                if stats is None:
+                    stats = cls(product_id=product_id)
+                    created.append(stats)
+                else:
+                    updated.append(stats)
+                for price, store_name, recorded_at in sorted(prices, key=lambda row: row[2]):
+                    stats._add(Decimal(str(price)).quantize(CENTS), store_name, recorded_at)
+                stats._refresh_median()
+            cls.objects.bulk_create(created)
+            cls.objects.bulk_update(updated, [
+                field.name for field in cls._meta.concrete_fields if not field.primary_key
+            ])
+    
+    @classmethod
+    def rebuild(cls, product_ids):
+        """Recompute the statistics of these products from their full history"""
+        history = {}
+        for product_id, price, store_name, recorded_at in PriceHistory.objects.filter(
+            product_id__in=product_ids,
+        ).values_list('product_id', 'price', 'store_name', 'recorded_at'):
+            history.setdefault(product_id, []).append((price, store_name, recorded_at))
+        with transaction.atomic():
+            cls.objects.filter(product_id__in=product_ids).delete()
+            cls.record_many(history)
+    
+    def _add(self, price, store_name, recorded_at):
+        alpha = Decimal(str(settings.PRICE_EWMA_ALPHA))
+        if not self.count:
+            self.min_price = self.max_price = self.ewma = price
+        else:
+            self.min_price = min(self.min_price, price)
+            self.max_price = max(self.max_price, price)
+            self.ewma = alpha * price + (1 - alpha) * self.ewma
+        self.ewma = Decimal(self.ewma).quantize(Decimal('0.0001'), ROUND_HALF_UP)
+        self.count += 1
+        self.sum_price = Decimal(self.sum_price) + price
+        if self.last_recorded_at is None or recorded_at >= self.last_recorded_at:
+            self.last_price = price
+            self.last_recorded_at = recorded_at
+        if store_name:
+            current = self.store_prices.get(store_name)
+            if current is None or recorded_at.isoformat() >= current['date']:
+                self.store_prices[store_name] = {
+                    'price': str(price),
+                    'date': recorded_at.isoformat(),
+                }
+        self.recent_prices.append([recorded_at.isoformat(), str(price)])
+        fold_sparkline(self.sparkline, recorded_at, price, settings.PRICE_SPARKLINE_POINTS)
+    
+    def _refresh_median(self):
+        window = timedelta(days=settings.PRICE_STATS_WINDOW_DAYS)
+        cutoff = max(self.last_recorded_at, timezone.now()) - window
+        recent = sorted(
+            (row for row in self.recent_prices if datetime.fromisoformat(row[0]) >= cutoff),
+            reverse=True,
+        )[:settings.PRICE_STATS_WINDOW_SIZE]
+        self.recent_prices = recent
+        prices = [Decimal(price) for _, price in recent] or [self.last_price]
+        self.median_90d = Decimal(median(prices)).quantize(CENTS, ROUND_HALF_UP)
+    
+    def rate(self, price):
+        """
+        Classify a price against the 90-day median:
+        'otimo' (at least PRICE_RATING_MARGIN below, or a new minimum),
+        'caro' (at least PRICE_RATING_MARGIN above) or 'media'
+        """
+        margin = Decimal(str(settings.PRICE_RATING_MARGIN))
+        reference = self.median_90d
+        if price <= reference * (1 - margin) or (self.count > 1 and price < self.min_price):
+            rating = 'otimo'
+        elif price >= reference * (1 + margin):
+            rating = 'caro'
+        else:
+            rating = 'media'
+        return {
+            'rating': rating,
+            'price': price,
+            'reference': reference,
+            'diff_percent': round(float((price - reference) / reference * 100), 1) if reference else 0.0,
+        }
+
+
+class ProductSearchToken(models.Model):
+    """
+    Autocomplete index: one row per word of a product name
+    Words are accent- and case-folded (name_tokens), so typeahead is an
+    indexed prefix range scan per typed word instead of an icontains scan
+    of the catalog. Kept in step with Product writes (see
+    apps.products.autocomplete).
+    """
+    
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Usuário',
+    )
+    
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='search_tokens',
+        verbose_name='Produto',
+    )
+    
+    token = models.CharField('Palavra', max_length=50)
+    
+    class Meta:
+        verbose_name = 'Palavra de Busca'
+        verbose_name_plural = 'Palavras de Busca'
+        unique_together = ['product', 'token']
+        indexes = [
+            # Prefix lookups (LIKE 'abc%'); opclasses only apply on PostgreSQL
+            models.Index(
+                fields=['user', 'token'],
+                name='product_token_prefix',
+                opclasses=['', 'varchar_pattern_ops'],
+            ),
+        ]
+    
+    def __str__(self):
+        return self.token
+    
+    @classmethod
+    def _tokens(cls, user_id, products):
+        return [
+            cls(user_id=user_id, product_id=product_id, token=token[:50])
+            for product_id, name in products
+            for token in name_tokens(name)
+        ]
+    
+    @classmethod
+    def add(cls, user_id, products):
+        """
+        Index products whose names are unchanged or new, one INSERT.
+        products: (product_id, name) pairs; words already indexed are kept.
+        """
+        cls.objects.bulk_create(cls._tokens(user_id, products), ignore_conflicts=True)
+    
+    @classmethod
+    def reindex(cls, user_id, products):
+        """Replace the indexed words of renamed products ((id, name) pairs)"""
+        with transaction.atomic():
+            cls.objects.filter(product_id__in=[product_id for product_id, _ in products]).delete()
+            cls.add(user_id, products)
+
+
+class ProductTypoKey(models.Model):
+    """
+    Typo index of the autocomplete: the deletion neighbourhood of the start
+    of each word of a product name (see apps.products.autocomplete.typo_keys).
+    A misspelt word is looked up by its own keys instead of being compared
+    with every indexed word.
+    """
+    
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Usuário',
+    )
+    
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='typo_keys',
+        verbose_name='Produto',
+    )
+    
+    token = models.CharField('Palavra', max_length=50)
+    
+    key = models.CharField('Chave', max_length=10)
+    
+    class Meta:
+        verbose_name = 'Chave de Digitação'
+        verbose_name_plural = 'Chaves de Digitação'
+        unique_together = ['product', 'token', 'key']
+        indexes = [
+            models.Index(fields=['user', 'key'], name='product_typo_key'),
+        ]
+    
+    def __str__(self):
+        return f"{self.token}:{self.key}"
+    
+    @classmethod
+    def _keys(cls, user_id, products):
+        from .autocomplete import typo_keys
+        return [
+            cls(user_id=user_id, product_id=product_id, token=token[:50], key=key)
+            for product_id, name in products
+            for token in name_tokens(name)
+            for key in typo_keys(token[:50])
+        ]
+    
+    @classmethod
+    def add(cls, user_id, products):
+        """Index new or unchanged products ((id, name) pairs), one INSERT"""
+        cls.objects.bulk_create(cls._keys(user_id, products), ignore_conflicts=True)
+    
+    @classmethod
+    def reindex(cls, user_id, products):
+        """Replace the keys of renamed products ((id, name) pairs)"""
+        with transaction.atomic():
+            cls.objects.filter(product_id__in=[product_id for product_id, _ in products]).delete()
+            cls.add(user_id, products)
+
+
+class ProductMatchKey(models.Model):
+    """
+    Candidate index of the item -> product matching: one row per MinHash
+    LSH band of a product name (see apps.products.matching). Items whose
+    name shares a key with a product are compared with it.
+    """
+    
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Usuário',
+    )
+    
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='match_keys',
+        verbose_name='Produto',
+    )
+    
+    key = models.BigIntegerField('Chave LSH')
+    
+    class Meta:
+        verbose_name = 'Chave de Correspondência'
+        verbose_name_plural = 'Chaves de Correspondência'
+        unique_together = ['product', 'key']
+        indexes = [
+            models.Index(fields=['user', 'key'], name='product_match_key'),
+        ]
+    
+    def __str__(self):
+        return f"{self.product_id}:{self.key}"
+    
+    @classmethod
+    def _keys(cls, user_id, products):
+        from .matching import band_keys
+        return [
+            cls(user_id=user_id, product_id=product_id, key=key)
+            for product_id, name in products
+            for key in set(band_keys(name))
+        ]
+    
+    @classmethod
+    def add(cls, user_id, products):
+        """Index new or unchanged products ((id, name) pairs), one INSERT"""
+        cls.objects.bulk_create(cls._keys(user_id, products), ignore_conflicts=True)
+    
+    @classmethod
+    def reindex(cls, user_id, products):
+        """Replace the keys of renamed products ((id, name) pairs)"""
+        with transaction.atomic():
+            cls.objects.filter(product_id__in=[product_id for product_id, _ in products]).delete()
+            cls.add(user_id, products)
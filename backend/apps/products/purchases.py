@@ -0,0 +1,195 @@
+"""
+SmartCart Purchase Recording
+Feeds completed shopping lists into the product catalog and price history
+"""
+
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.shopping.utils import normalize_name
+
+from .matching import canonical_name, resolve
+from .models import (
+    Product,
+    PriceHistory,
+    ProductMatchKey,
+    ProductTypoKey,
+    ProductPriceStats,
+    ProductSearchToken,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+def record_completed_list(list_id):
+    """
+    Upsert the items of a completed list into the owner's catalog.
+
+    Items linked to a product (ShoppingItem.product) are recorded under
+    it; the others are matched against the catalog (apps.products.matching)
+    and, failing that, become new products, spellings with the same
+    canonical name sharing one. Every recorded item ends up linked.
+
+    Set-based, whatever the size of the list: one UPDATE claims the list,
+    one SELECT reads its items, one more matches the unlinked ones, one
+    INSERT ... ON CONFLICT (user, name) upserts the products, one UPDATE
+    increments times_purchased, one INSERT writes the price history and
+    three more link the items and bump the list's change version; up to
+    three more fold the prices into the
+    price statistics, two index new names for autocomplete and matching
+    and three more merge the last-purchase index.
+    The claim makes the recording run at most once per list, even when the
+    background run and the record_completed_lists command race.
+    Items without a price are not recorded. Returns the number of products.
+    """
+    from apps.shopping.models import LastPurchase, ShoppingList, ShoppingItem
+
+    recorded_at = timezone.now()
+    with transaction.atomic():
+        claimed = ShoppingList.objects.filter(
+            pk=list_id,
+            status='completed',
+            catalog_recorded_at__isnull=True,
+        ).update(catalog_recorded_at=recorded_at)
+        if not claimed:
+            return 0
+
+        items = list(ShoppingItem.objects.filter(
+            shopping_list_id=list_id,
+            unit_price__gt=0,
+        ).order_by('id').values(
+            'id',
+            'name',
+            'product_id',
+            'unit_price',
+            'quantity',
+            product_name=F('product__name'),
+            user_id=F('shopping_list__user_id'),
+            list_name=F('shopping_list__name'),
+            completed_at=F('shopping_list__completed_at'),
+        ))
+        if not items:
+            return 0
+        user_id = items[0]['user_id']
+
+        # Catalog name each item is recorded under
+        unlinked = {item['name'].strip() for item in items if item['product_id'] is None}
+        unlinked.discard('')
+        matches = resolve(user_id, unlinked) if unlinked else {}
+        spellings = {}
+        for item in items:
+            name = item['name'].strip()
+            if item['product_id'] is not None:
+                item['catalog_name'] = item['product_name']
+            elif name in matches:
+                item['catalog_name'] = matches[name][1]
+            elif name:
+                item['catalog_name'] = spellings.setdefault(canonical_name(name), name)
+            else:
+                item['catalog_name'] = ''
+        # Last price per product wins when a list repeats it
+        prices = {item['catalog_name']: item['unit_price'] for item in items}
+        prices.pop('', None)
+        if not prices:
+            return 0
+
+        Product.objects.bulk_create(
+            [
+                Product(
+                    user_id=user_id,
+                    name=name,
+                    normalized_name=normalize_name(name),
+                    last_price=price,
+                )
+                for name, price in prices.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['user', 'name'],
+            update_fields=['last_price', 'updated_at'],
+        )
+        products = Product.objects.filter(user_id=user_id, name__in=prices)
+        products.update(times_purchased=F('times_purchased') + 1)
+        rows = list(products.values_list('id', 'name'))
+        history = PriceHistory.objects.bulk_create([
+            PriceHistory(product_id=product_id, price=prices[name])
+            for product_id, name in rows
+        ])
+        product_ids = {name: product_id for product_id, name in rows}
+        relinked = [
+            ShoppingItem(pk=item['id'], product_id=product_ids[item['catalog_name']])
+            for item in items
+            if item['catalog_name'] and item['product_id'] != product_ids[item['catalog_name']]
+        ]
+        if relinked:
+            # The link is part of the item: bump the versions that delta
+            # sync, ETags and the rendered-list cache key off
+            version = ShoppingList.apply_delta(list_id).change_version
+            now = timezone.now()
+            for item in relinked:
+                item.change_version = version
+                item.updated_at = now
+            ShoppingItem.objects.bulk_update(relinked, ['product', 'change_version', 'updated_at'])
+        ProductPriceStats.record_many({
+            row.product_id: [(row.price, row.store_name, row.recorded_at)]
+            for row in history
+        })
+        # Bulk writes skip Product.save(): index new names for autocomplete
+        # and matching, and invalidate catalog ETags once
+        ProductSearchToken.add(user_id, rows)
+        ProductMatchKey.add(user_id, rows)
+        ProductTypoKey.add(user_id, rows)
+        Product._bump_user_version(user_id)
+        
+        LastPurchase.record(user_id, [
+            {
+                'name': item['name'].strip(),
+                'list_id': list_id,
+                'list_name': item['list_name'],
+                'date': item['completed_at'] or recorded_at,
+                'price': item['unit_price'],
+                'quantity': item['quantity'],
+            }
+            for item in items
+        ])
+
+    return len(prices)
+
+
+def schedule_completed_list(list_id):
+    """
+    Record a completed list once the current transaction commits.
+    settings.CATALOG_PIPELINE_MODE picks how:
+    - 'thread': in a background thread, so the request returns right away
+    - 'sync': inline, right after commit
+    - 'deferred': left to the record_completed_lists command (cron)
+    """
+    mode = getattr(settings, 'CATALOG_PIPELINE_MODE', 'thread')
+    if mode == 'sync':
+        transaction.on_commit(lambda: record_completed_list(list_id))
+    elif mode == 'thread':
+        transaction.on_commit(lambda: _start_thread(list_id))
+
+
+def _start_thread(list_id):
+    threading.Thread(
+        target=_record_in_thread,
+        args=(list_id,),
+        name=f'catalog-pipeline-{list_id}',
+        daemon=True,
+    ).start()
+
+
+def _record_in_thread(list_id):
+    try:
+        record_completed_list(list_id)
+    except Exception:
+        # The list stays unrecorded; record_completed_lists picks it up
+        logger.exception('Failed to record completed list #%s', list_id)
+    finally:
+        connections.close_all()
@@ -2,11 +2,15 @@
 SmartCart Products Serializers
 """
 
+from django.conf import settings
+from django.db import models
 from rest_framework import serializers
-from .models import Product, PriceHistory
 
+from config.fieldsets import SparseFieldsetMixin
+from .models import Product, PriceHistory, ProductPriceStats
 
-class PriceHistorySerializer(serializers.ModelSerializer):
+
+class PriceHistorySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for PriceHistory model"""
     
     class Meta:
@@ -20,10 +24,61 @@ class PriceHistorySerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'recorded_at']
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class LatestPriceHistoryListSerializer(serializers.ListSerializer):
+    """Renders only the newest PRODUCT_PRICE_HISTORY_LIMIT prices"""
+    
+    def to_representation(self, data):
+        if isinstance(data, models.Manager):
+            data = data.order_by('-recorded_at', '-id')[:settings.PRODUCT_PRICE_HISTORY_LIMIT]
+        return super().to_representation(data)
+
+
+class LatestPriceHistorySerializer(PriceHistorySerializer):
+    """Newest prices nested in a product; the rest is paginated apart"""
+    
+    class Meta(PriceHistorySerializer.Meta):
+        list_serializer_class = LatestPriceHistoryListSerializer
+
+
+class PricePointSerializer(serializers.Serializer):
+    """One point of a product's price sparkline"""
+    
+    date = serializers.DateTimeField()
+    price = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+
+class ProductPriceStatsSerializer(serializers.ModelSerializer):
+    """Serializer for ProductPriceStats model"""
+    
+    mean_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    
+    class Meta:
+        model = ProductPriceStats
+        fields = [
+            'count',
+            'min_price',
+            'max_price',
+            'mean_price',
+            'ewma',
+            'median_90d',
+            'last_price',
+            'last_recorded_at',
+            'store_prices',
+        ]
+        read_only_fields = fields
+
+
+class ProductSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for Product model"""
     
-    price_history = PriceHistorySerializer(many=True, read_only=True)
+    price_history = LatestPriceHistorySerializer(many=True, read_only=True)
+    price_stats = ProductPriceStatsSerializer(read_only=True, allow_null=True)
+    price_sparkline = PricePointSerializer(
+        source='price_stats.sparkline_points',
+        many=True,
+        read_only=True,
+        allow_null=True,
+    )
     
     class Meta:
         model = Product
@@ -37,9 +92,12 @@ class ProductSerializer(serializers.ModelSerializer):
             'times_purchased',
             'is_favorite',
             'price_history',
+            'price_stats',
+            'price_sparkline',
             'created_at',
             'updated_at',
         ]
+        expandable_fields = ['price_history']
         read_only_fields = ['id', 'times_purchased', 'created_at', 'updated_at']
     
     def create(self, validated_data):
@@ -47,9 +105,11 @@ class ProductSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class ProductSummarySerializer(serializers.ModelSerializer):
+class ProductSummarySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Simplified serializer for product lists"""
     
+    price_stats = ProductPriceStatsSerializer(read_only=True, allow_null=True)
+    
     class Meta:
         model = Product
         fields = [
@@ -59,4 +119,53 @@ class ProductSummarySerializer(serializers.ModelSerializer):
             'category',
             'times_purchased',
             'is_favorite',
+            'price_stats',
         ]
+
+
+class PriceLookupSerializer(serializers.Serializer):
+    """Names and/or product ids to look prices up for"""
+    
+    MAX_KEYS = 500
+    
+    names = serializers.ListField(
+        child=serializers.CharField(max_length=200),
+        required=False,
+    )
+    ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False,
+    )
+    
+    def validate(self, attrs):
+        total = len(attrs.get('names', [])) + len(attrs.get('ids', []))
+        if total == 0:
+            raise serializers.ValidationError('Informe nomes ou ids de produtos.')
+        if total > self.MAX_KEYS:
+            raise serializers.ValidationError(
+                f'Máximo de {self.MAX_KEYS} produtos por requisição.'
+            )
+        return attrs
+
+
+class PriceHintSerializer(serializers.Serializer):
+    """One entry of a batch price lookup"""
+    
+    name = serializers.CharField(required=False)
+    id = serializers.IntegerField(required=False)
+    product = serializers.DictField(allow_null=True)
+    last_price = serializers.DecimalField(max_digits=10, decimal_places=2, allow_null=True)
+    last_date = serializers.DateTimeField(allow_null=True)
+    rating = serializers.CharField(allow_null=True)
+    price_stats = ProductPriceStatsSerializer(allow_null=True)
+
+
+class BarcodeLookupSerializer(serializers.Serializer):
+    """What a scanned barcode is (apps.products.gtin.lookup_barcode)"""
+    
+    gtin = serializers.CharField()
+    source = serializers.ChoiceField(choices=['products', 'catalog'])
+    name = serializers.CharField()
+    brand = serializers.CharField(allow_blank=True)
+    category = serializers.CharField(allow_blank=True)
+    product = ProductSummarySerializer(allow_null=True)
@@ -2,13 +2,31 @@
 SmartCart Products Tests
 """
 
-from django.test import TestCase
+from django.core.management import call_command
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
-from rest_framework.test import APITestCase
+from django.utils import timezone
+from rest_framework.test import APIClient, APITestCase
 from rest_framework import status
+from datetime import timedelta
 from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
 
-from .models import Product, PriceHistory
+from apps.shopping.archive import archive_lists
+from apps.shopping.models import ShoppingList, ShoppingItem
+from .models import (
+    Product,
+    PriceHistory,
+    ProductMatchKey,
+    ProductPriceStats,
+    ProductSearchToken,
+    ProductTypoKey,
+)
+from .autocomplete import _near_tokens
+from .gtin import reference_catalog
+from .purchases import record_completed_list
 
 User = get_user_model()
 
@@ -73,3 +91,615 @@ class ProductAPITests(APITestCase):
         
         response = self.client.get('/api/products/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class ProductPaginationTests(APITestCase):
+    """Tests for keyset pagination of the catalog"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='catalog',
+            email='catalog@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        for index in range(5):
+            Product.objects.create(
+                user=self.user,
+                name=f'Produto {index}',
+                times_purchased=index % 2,
+            )
+    
+    def test_pages_follow_ranking(self):
+        """Test products are paged by times purchased without duplicates"""
+        seen = []
+        url = '/api/products/?page_size=2'
+        while url:
+            response = self.client.get(url)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        
+        expected = list(
+            Product.objects.filter(user=self.user)
+            .order_by('-times_purchased', '-updated_at', '-id')
+            .values_list('id', flat=True)
+        )
+        self.assertEqual(seen, expected)
+
+
+class ProductFieldsetTests(APITestCase):
+    """Tests for ?fields= and ?expand= on products"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='fieldsets',
+            email='fieldsets@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.product = Product.objects.create(user=self.user, name='Café')
+        PriceHistory.objects.create(product=self.product, price=Decimal('15.00'))
+        self.url = f'/api/products/{self.product.id}/'
+    
+    def test_price_history_only_when_requested(self):
+        """Test leaving price_history out also skips its query"""
+        with self.assertNumQueries(2):
+            full = self.client.get(self.url)
+        self.assertEqual(len(full.data['price_history']), 1)
+        
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'expand': ''})
+        self.assertNotIn('price_history', response.data)
+        self.assertEqual(response.data['name'], 'Café')
+    
+    def test_fields_on_catalog(self):
+        """Test ?fields= trims catalog rows"""
+        response = self.client.get('/api/products/', {'fields': 'id,last_price'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'last_price'})
+
+
+class PurchaseRecordingTests(TestCase):
+    """Tests for the completion pipeline feeding the catalog"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='pipeline',
+            email='pipeline@example.com',
+            password='testpass123'
+        )
+        self.arroz = Product.objects.create(
+            user=self.user,
+            name='Arroz',
+            last_price=Decimal('20.00'),
+            times_purchased=3,
+            barcode='7890000000001',
+        )
+    
+    def make_list(self, *items):
+        return ShoppingList.create_with_items(
+            [{'name': name, 'unit_price': Decimal(price)} for name, price in items],
+            user=self.user,
+            planned_budget=Decimal('100.00'),
+        )
+    
+    @override_settings(CATALOG_PIPELINE_MODE='sync')
+    def test_complete_upserts_products_and_prices(self):
+        """Test completing a list updates the catalog after commit"""
+        shopping_list = self.make_list(
+            ('Arroz', '25.90'), ('Feijão', '8.50'), ('Feijão', '9.00'), ('Sacola', '0'),
+        )
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            shopping_list.complete()
+        
+        self.arroz.refresh_from_db()
+        self.assertEqual(self.arroz.times_purchased, 4)
+        self.assertEqual(self.arroz.last_price, Decimal('25.90'))
+        self.assertEqual(self.arroz.barcode, '7890000000001')
+        feijao = Product.objects.get(user=self.user, name='Feijão')
+        self.assertEqual(feijao.times_purchased, 1)
+        self.assertEqual(feijao.last_price, Decimal('9.00'))
+        self.assertFalse(Product.objects.filter(name='Sacola').exists())
+        self.assertEqual(
+            sorted(PriceHistory.objects.values_list('product__name', 'price')),
+            [('Arroz', Decimal('25.90')), ('Feijão', Decimal('9.00'))],
+        )
+        self.assertEqual(self.arroz.price_stats.last_price, Decimal('25.90'))
+        self.assertEqual(feijao.price_stats.count, 1)
+    
+    def test_recording_is_set_based_and_runs_once(self):
+        """Test the pipeline cost does not grow with the list and never repeats"""
+        shopping_list = self.make_list(*[(f'Produto {i}', '1.00') for i in range(30)])
+        ShoppingList.objects.filter(pk=shopping_list.pk).update(status='completed')
+        
+        # claim, items, match, upsert, increment, ids, price history, list
+        # version bump/read, item links, price stats lock/insert, search
+        # tokens, match keys (two batches on SQLite), typo keys (five),
+        # user version, last-purchase insert/lock/update (plus two
+        # savepoint pairs)
+        with self.assertNumQueries(27):
+            self.assertEqual(record_completed_list(shopping_list.pk), 30)
+        self.assertEqual(record_completed_list(shopping_list.pk), 0)
+        self.assertEqual(PriceHistory.objects.count(), 30)
+    
+    @override_settings(CATALOG_PIPELINE_MODE='deferred')
+    def test_command_records_pending_lists(self):
+        """Test record_completed_lists catches up on deferred lists"""
+        shopping_list = self.make_list(('Arroz', '22.00'))
+        with self.captureOnCommitCallbacks(execute=True):
+            shopping_list.complete()
+        self.assertEqual(PriceHistory.objects.count(), 0)
+        
+        call_command('record_completed_lists', stdout=StringIO())
+        
+        self.arroz.refresh_from_db()
+        self.assertEqual(self.arroz.times_purchased, 4)
+        shopping_list.refresh_from_db()
+        self.assertIsNotNone(shopping_list.catalog_recorded_at)
+
+
+class ProductPriceStatsTests(APITestCase):
+    """Tests for the precomputed price statistics and price rating"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='stats',
+            email='stats@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.product = Product.objects.create(user=self.user, name='Café')
+        self.url = f'/api/products/{self.product.id}/'
+    
+    def add_price(self, price, store_name=''):
+        return self.client.post(
+            f'{self.url}add_price/', {'price': price, 'store_name': store_name}
+        )
+    
+    def test_add_price_updates_stats(self):
+        """Test every insert folds into count, min/max, mean, EWMA and median"""
+        self.add_price('10.00', 'Mercado A')
+        self.add_price('14.00', 'Mercado B')
+        response = self.add_price('12.90', 'Mercado A')
+        
+        stats = response.data['price_stats']
+        self.assertEqual(stats['count'], 3)
+        self.assertEqual(stats['min_price'], '10.00')
+        self.assertEqual(stats['max_price'], '14.00')
+        self.assertEqual(stats['mean_price'], '12.30')
+        self.assertEqual(stats['median_90d'], '12.90')
+        # 0.3 * 12.90 + 0.7 * (0.3 * 14.00 + 0.7 * 10.00)
+        self.assertEqual(stats['ewma'], '11.7100')
+        self.assertEqual(stats['store_prices']['Mercado A']['price'], '12.90')
+        self.assertEqual(stats['store_prices']['Mercado B']['price'], '14.00')
+    
+    def test_rating(self):
+        """Test prices are rated against the 90-day median"""
+        for price in ('10.00', '10.00', '12.00'):
+            self.add_price(price)
+        
+        ratings = {
+            price: self.client.get(f'{self.url}rating/', {'price': price}).data['rating']
+            for price in ('9.00', '10.20', '11.00')
+        }
+        self.assertEqual(ratings, {'9.00': 'otimo', '10.20': 'media', '11.00': 'caro'})
+        
+        response = self.client.get(f'{self.url}rating/', {'price': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_rating_without_history(self):
+        """Test products never priced have no rating"""
+        response = self.client.get(f'{self.url}rating/', {'price': '5.00'})
+        self.assertIsNone(response.data['rating'])
+        self.assertIsNone(self.client.get(self.url).data['price_stats'])
+    
+    def test_rebuild_command(self):
+        """Test rebuild_price_stats recomputes from the full history"""
+        PriceHistory.objects.bulk_create([
+            PriceHistory(product=self.product, price=Decimal(price))
+            for price in ('4.00', '6.00')
+        ])
+        self.assertFalse(ProductPriceStats.objects.exists())
+        
+        call_command('rebuild_price_stats', stdout=StringIO())
+        
+        stats = ProductPriceStats.objects.get(product=self.product)
+        self.assertEqual(stats.count, 2)
+        self.assertEqual(stats.median_90d, Decimal('5.00'))
+
+
+class PriceLookupTests(APITestCase):
+    """Tests for the batch price lookup"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='lookup',
+            email='lookup@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.feijao = Product.objects.create(user=self.user, name='Feijão Preto')
+        for price in ('8.00', '9.00', '8.50'):
+            PriceHistory.objects.create(product=self.feijao, price=Decimal(price))
+        self.cafe = Product.objects.create(user=self.user, name='Café', last_price=Decimal('15.00'))
+        self.url = '/api/products/prices/'
+    
+    def test_lookup_in_fixed_queries(self):
+        """Test names and ids resolve together in one query"""
+        names = ['feijao  preto', 'Desconhecido'] + [f'Item {i}' for i in range(20)]
+        with self.assertNumQueries(1):
+            response = self.client.post(
+                self.url, {'names': names, 'ids': [self.cafe.id]}, format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        results = response.data['results']
+        self.assertEqual(len(results), 23)
+        feijao = results[0]
+        self.assertEqual(feijao['name'], 'feijao  preto')
+        self.assertEqual(feijao['product']['id'], self.feijao.id)
+        self.assertEqual(feijao['last_price'], '8.50')
+        self.assertEqual(feijao['rating'], 'media')
+        self.assertEqual(feijao['price_stats']['median_90d'], '8.50')
+        self.assertIsNone(results[1]['product'])
+        self.assertEqual(results[-1]['id'], self.cafe.id)
+        self.assertEqual(results[-1]['last_price'], '15.00')
+        self.assertIsNone(results[-1]['price_stats'])
+    
+    def test_other_users_products_are_hidden(self):
+        """Test the lookup is scoped to the request user"""
+        other = User.objects.create_user(
+            username='other', email='other@example.com', password='testpass123'
+        )
+        foreign = Product.objects.create(user=other, name='Café')
+        response = self.client.post(self.url, {'ids': [foreign.id]}, format='json')
+        self.assertIsNone(response.data['results'][0]['product'])
+    
+    def test_requires_keys(self):
+        """Test an empty lookup is rejected"""
+        response = self.client.post(self.url, {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AutocompleteTests(APITestCase):
+    """Tests for the product autocomplete index"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='typeahead',
+            email='typeahead@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.feijao = Product.objects.create(user=self.user, name='Feijão Preto', times_purchased=2)
+        self.carioca = Product.objects.create(user=self.user, name='Feijão Carioca', times_purchased=5)
+        self.arroz = Product.objects.create(user=self.user, name='Arroz Tio João', times_purchased=9)
+        self.url = '/api/products/autocomplete/'
+    
+    def names(self, query):
+        return [row['name'] for row in self.client.get(self.url, {'q': query}).data]
+    
+    def test_prefix_and_token_matching(self):
+        """Test accent/case folding, word prefixes in any order and ranking"""
+        self.assertEqual(self.names('FEIJ'), ['Feijão Carioca', 'Feijão Preto'])
+        self.assertEqual(self.names('preto feijao'), ['Feijão Preto'])
+        # Names starting with the query outrank more purchased ones
+        Product.objects.create(user=self.user, name='Joaninha', times_purchased=1)
+        self.assertEqual(self.names('joa'), ['Joaninha', 'Arroz Tio João'])
+        self.assertEqual(self.names('x'), [])
+    
+    def test_typo_tolerance(self):
+        """Test one typo still finds the product when nothing else matches"""
+        self.assertEqual(self.names('fiejao pre'), ['Feijão Preto'])
+        self.assertEqual(self.names('aroz'), ['Arroz Tio João'])
+        self.assertEqual(self.names('abc'), [])
+    
+    def test_typo_lookup_reads_the_key_index(self):
+        """Test a typo is looked up by key, not by scanning words"""
+        for name in ('Açúcar Refinado', 'Amaciante', 'Abacate', 'Aveia'):
+            Product.objects.create(user=self.user, name=name)
+        self.assertEqual(_near_tokens(self.user, 'arrzo'), ['arroz'])
+        with self.assertNumQueries(3):
+            self.assertEqual(self.names('arrzo'), ['Arroz Tio João'])
+        
+        self.arroz.name = 'Azeite'
+        self.arroz.save()
+        self.assertFalse(ProductTypoKey.objects.filter(token='arroz').exists())
+        self.assertEqual(self.names('aziete'), ['Azeite'])
+    
+    def test_single_query_on_hit(self):
+        """Test a typeahead hit costs one query"""
+        with self.assertNumQueries(1):
+            self.client.get(self.url, {'q': 'arr'})
+    
+    def test_index_follows_writes(self):
+        """Test renames and deletes update the index incrementally"""
+        self.feijao.name = 'Lentilha'
+        self.feijao.save()
+        self.assertEqual(self.names('preto'), [])
+        self.assertEqual(self.names('lent'), ['Lentilha'])
+        self.assertEqual(
+            [row['name'] for row in self.client.get('/api/products/', {'search': 'lent'}).data['results']],
+            ['Lentilha'],
+        )
+        
+        self.arroz.delete()
+        self.assertFalse(ProductSearchToken.objects.filter(token='arroz').exists())
+    
+    def test_completed_lists_are_indexed(self):
+        """Test products created by the completion pipeline are searchable"""
+        shopping_list = ShoppingList.create_with_items(
+            [{'name': 'Macarrão Integral', 'unit_price': Decimal('6.00')}],
+            user=self.user,
+        )
+        ShoppingList.objects.filter(pk=shopping_list.pk).update(status='completed')
+        record_completed_list(shopping_list.pk)
+        self.assertEqual(self.names('macarrao'), ['Macarrão Integral'])
+
+
+class ProductMatchingTests(TestCase):
+    """Tests for linking shopping items to catalog products"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='matching',
+            email='matching@example.com',
+            password='testpass123'
+        )
+        self.arroz = Product.objects.create(user=self.user, name='Arroz Tio João 5kg', times_purchased=4)
+        self.shopping_list = ShoppingList.objects.create(user=self.user)
+    
+    def add_item(self, name, price='10.00'):
+        return ShoppingItem.objects.create(
+            shopping_list=self.shopping_list,
+            name=name,
+            unit_price=Decimal(price),
+        )
+    
+    def test_similar_names_link_to_the_same_product(self):
+        """Test spelling variants link on insert but other sizes do not"""
+        self.assertEqual(self.add_item('arroz tio joao 5 kg').product, self.arroz)
+        self.assertEqual(self.add_item('Arroz 5kg Tio João').product, self.arroz)
+        self.assertIsNone(self.add_item('Arroz Tio João 1kg').product)
+        self.assertIsNone(self.add_item('Feijão').product)
+    
+    def test_renamed_products_are_reindexed(self):
+        """Test match keys follow the product name"""
+        self.arroz.name = 'Arroz Integral 1kg'
+        self.arroz.save()
+        self.assertIsNone(self.add_item('Arroz Tio João 5kg').product)
+        self.assertEqual(self.add_item('arroz integral 1 kg').product, self.arroz)
+        self.assertEqual(
+            set(ProductMatchKey.objects.values_list('product_id', flat=True)),
+            {self.arroz.pk},
+        )
+    
+    def test_completion_records_under_linked_products(self):
+        """Test completion reuses matched products and links new ones"""
+        first = self.add_item('arroz tio joao 5 kg', '27.00')
+        second = self.add_item('Leite Integral 1L', '5.00')
+        third = self.add_item('leite integral 1 l', '5.50')
+        ShoppingList.objects.filter(pk=self.shopping_list.pk).update(status='completed')
+        
+        self.assertEqual(record_completed_list(self.shopping_list.pk), 2)
+        
+        self.assertEqual(
+            sorted(Product.objects.values_list('name', flat=True)),
+            ['Arroz Tio João 5kg', 'Leite Integral 1L'],
+        )
+        self.arroz.refresh_from_db()
+        self.assertEqual(self.arroz.times_purchased, 5)
+        self.assertEqual(self.arroz.last_price, Decimal('27.00'))
+        leite = Product.objects.get(name='Leite Integral 1L')
+        self.assertEqual(leite.last_price, Decimal('5.50'))
+        for item, product in ((first, self.arroz), (second, leite), (third, leite)):
+            item.refresh_from_db()
+            self.assertEqual(item.product, product)
+    
+    def test_linking_on_completion_invalidates_reads(self):
+        """Test GET shows the links the pipeline wrote, not a cached copy"""
+        item = self.add_item('Leite Integral 1L', '5.00')
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        url = f'/api/shopping/{self.shopping_list.pk}/'
+        before = client.get(url)
+        self.assertIsNone(before.json()['items'][0]['product'])
+        ShoppingList.objects.filter(pk=self.shopping_list.pk).update(status='completed')
+        
+        record_completed_list(self.shopping_list.pk)
+        
+        item.refresh_from_db()
+        response = client.get(url, HTTP_IF_NONE_MATCH=before['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['items'][0]['product'], item.product_id)
+        self.assertGreater(item.change_version, before.json()['change_version'])
+    
+    def test_link_command_backfills_items(self):
+        """Test link_shopping_items links hot and archived items written before matching"""
+        item = self.add_item('Arroz 5kg Tio Joao')
+        other = self.add_item('Feijão')
+        old_list = ShoppingList.create_with_items(
+            [{'name': 'arroz tio joão 5 kg', 'unit_price': Decimal('26.00')}],
+            user=self.user,
+        )
+        old_list.complete()
+        ShoppingItem.objects.update(product=None)
+        archive_lists(timezone.now() + timedelta(seconds=1))
+        old_version = ShoppingList.objects.get(pk=old_list.pk).change_version
+        
+        out = StringIO()
+        call_command('link_shopping_items', chunk_size=1, workers=1, stdout=out)
+        
+        self.assertIn('Linked 1 items and 1 archived items.', out.getvalue())
+        item.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(item.product, self.arroz)
+        self.assertIsNone(other.product)
+        old_list.refresh_from_db()
+        self.assertIsNotNone(old_list.archived_at)
+        [archived] = old_list.archive.unpack_items()
+        self.assertEqual(archived.product_id, self.arroz.pk)
+        self.assertEqual(archived.change_version, old_list.change_version)
+        self.assertGreater(old_list.change_version, old_version)
+        
+        out = StringIO()
+        call_command('link_shopping_items', workers=1, stdout=out)
+        self.assertIn('Linked 0 items and 0 archived items.', out.getvalue())
+
+
+class BarcodeLookupTests(APITestCase):
+    """Tests for barcode lookup and the GTIN reference catalog"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='scanner',
+            email='scanner@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = '/api/products/barcode/'
+        
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.source = Path(directory.name) / 'gtins.csv'
+        self.catalog = Path(directory.name) / 'gtin_catalog.bin'
+        settings_override = override_settings(GTIN_CATALOG_PATH=str(self.catalog))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.import_catalog(
+            'gtin,name,brand,category\n'
+            '7891000100103,Leite Condensado 395g,Moça,Mercearia\n'
+            '96385074,Chiclete,Trident,Doces\n'
+            '7896024190018,Check digit errado,,\n'
+            '0123456789012,Café Torrado 500g,,Mercearia\n'
+        )
+    
+    def import_catalog(self, rows):
+        self.source.write_text(rows, encoding='utf-8')
+        out = StringIO()
+        call_command('import_gtin_catalog', str(self.source), stdout=out)
+        return out.getvalue()
+    
+    def test_user_products_come_first(self):
+        """Test the user's own product wins over the catalog in one query"""
+        product = Product.objects.create(user=self.user, name='Leite Moça', barcode='7891000100103')
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'code': '07891000100103'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['source'], 'products')
+        self.assertEqual(response.data['product']['id'], product.id)
+        self.assertEqual(response.data['gtin'], '07891000100103')
+    
+    def test_falls_back_to_the_reference_catalog(self):
+        """Test unknown barcodes resolve from the memory-mapped catalog"""
+        Product.objects.create(
+            user=User.objects.create_user(username='other', email='other@example.com', password='x'),
+            name='Leite', barcode='7891000100103',
+        )
+        response = self.client.get(self.url, {'code': '7891000100103'})
+        self.assertEqual(response.data['source'], 'catalog')
+        self.assertEqual(response.data['name'], 'Leite Condensado 395g')
+        self.assertEqual(response.data['brand'], 'Moça')
+        self.assertIsNone(response.data['product'])
+        # EAN-8 and UPC-A (stored as EAN-13 with a leading zero)
+        self.assertEqual(self.client.get(self.url, {'code': '96385074'}).data['name'], 'Chiclete')
+        self.assertEqual(self.client.get(self.url, {'code': '123456789012'}).data['name'], 'Café Torrado 500g')
+    
+    def test_invalid_and_unknown_codes(self):
+        """Test bad check digits are rejected and misses are 404"""
+        response = self.client.get(self.url, {'code': '7896024190018'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(self.url, {'code': '7896024190017'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_import_replaces_the_catalog(self):
+        """Test a re-import is picked up without a restart"""
+        self.assertEqual(self.client.get(self.url, {'code': '7896024190017'}).status_code, 404)
+        out = self.import_catalog('gtin,name\n7896024190017,Biscoito\n')
+        self.assertIn('Imported 1 GTINs', out)
+        self.assertEqual(self.client.get(self.url, {'code': '7896024190017'}).data['name'], 'Biscoito')
+        self.assertEqual(self.client.get(self.url, {'code': '96385074'}).status_code, 404)
+    
+    def test_replaced_catalog_is_unmapped(self):
+        """Test a reload releases the old mapping once its readers are done"""
+        with reference_catalog() as old:
+            self.import_catalog('gtin,name\n7896024190017,Biscoito\n')
+            with reference_catalog() as new:
+                self.assertIsNot(new, old)
+                self.assertEqual(old.get('07891000100103')['name'], 'Leite Condensado 395g')
+            self.assertFalse(old._map.closed)
+        self.assertTrue(old._map.closed)
+        with reference_catalog() as current:
+            self.assertIs(current, new)
+            self.assertFalse(new._map.closed)
+
+
+class PriceHistoryBoundsTests(APITestCase):
+    """Tests for the bounded nested history, its pages and the sparkline"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='history',
+            email='history@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.product = Product.objects.create(user=self.user, name='Café')
+        self.history = [
+            PriceHistory.objects.create(product=self.product, price=Decimal(10 + i))
+            for i in range(15)
+        ]
+        self.url = f'/api/products/{self.product.id}/'
+    
+    def newest_ids(self, count):
+        return [row.id for row in reversed(self.history)][:count]
+    
+    @override_settings(PRODUCT_PRICE_HISTORY_LIMIT=10)
+    def test_nested_history_is_capped(self):
+        """Test retrieve, toggle_favorite and add_price nest the newest prices only"""
+        response = self.client.get(self.url)
+        self.assertEqual([row['id'] for row in response.data['price_history']], self.newest_ids(10))
+        
+        response = self.client.post(f'{self.url}toggle_favorite/')
+        self.assertEqual(len(response.data['price_history']), 10)
+        
+        response = self.client.post(f'{self.url}add_price/', {'price': '30.00'})
+        self.assertEqual(len(response.data['price_history']), 10)
+        self.assertEqual(response.data['price_history'][0]['price'], '30.00')
+    
+    def test_price_history_pages(self):
+        """Test the price_history action walks the whole history by cursor"""
+        ids, url = [], f'{self.url}price_history/?page_size=4'
+        while url:
+            with self.assertNumQueries(2):
+                response = self.client.get(url)
+            self.assertLessEqual(len(response.data['results']), 4)
+            ids += [row['id'] for row in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(ids, self.newest_ids(15))
+    
+    @override_settings(PRICE_SPARKLINE_POINTS=30)
+    def test_sparkline_has_fixed_size(self):
+        """Test the precomputed series stays at 30 points covering every price"""
+        # Older than the 15 prices of setUp: folded in by date, not appended
+        start = timezone.now() - timedelta(days=200)
+        ProductPriceStats.record_many({
+            self.product.id: [
+                (Decimal('5.00') + i % 3, '', start + timedelta(days=i))
+                for i in range(100)
+            ],
+        })
+        stats = ProductPriceStats.objects.get(pk=self.product.pk)
+        self.assertEqual(len(stats.sparkline), 30)
+        self.assertEqual(sum(count for _, _, count in stats.sparkline), stats.count)
+        self.assertEqual(sum(Decimal(total) for _, total, _ in stats.sparkline), stats.sum_price)
+        dates = [date for date, _, _ in stats.sparkline]
+        self.assertEqual(dates, sorted(dates))
+        counts = [count for _, _, count in stats.sparkline[:-1]]
+        self.assertLessEqual(max(counts), 3 * min(counts))
+        
+        response = self.client.get(self.url, {'fields': 'id,price_sparkline'})
+        points = response.data['price_sparkline']
+        self.assertEqual(len(points), 30)
+        self.assertEqual(stats.sparkline_points[-1]['date'], stats.last_recorded_at)
+        self.assertEqual(points[-1]['price'], str(stats.sparkline_points[-1]['price']))
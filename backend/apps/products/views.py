@@ -2,27 +2,51 @@
 SmartCart Products Views
 """
 
+from decimal import Decimal, InvalidOperation
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
 
-from .models import Product, PriceHistory
+from config.conditional import conditional_view, versioned_etag
+from config.pagination import KeysetPagination
+from apps.sync.idempotency import IdempotencyMixin
+from .autocomplete import filter_by_name, suggest
+from .gtin import lookup_barcode
+from .lookup import lookup_prices
+from .models import Product, PriceHistory, ProductPriceStats
 from .serializers import (
+    BarcodeLookupSerializer,
+    PriceHintSerializer,
+    PriceLookupSerializer,
+    ProductPriceStatsSerializer,
     ProductSerializer,
     ProductSummarySerializer,
     PriceHistorySerializer,
 )
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+def _catalog_etag(request, *args, **kwargs):
+    return versioned_etag(request, request.user.catalog_version)
+
+
+class ProductViewSet(IdempotencyMixin, viewsets.ModelViewSet):
     """
     ViewSet for Product CRUD operations
+    add_price accepts Idempotency-Key
     """
     
     permission_classes = [IsAuthenticated]
+    idempotent_actions = {'add_price'}
     parser_classes = [MultiPartParser, FormParser]
+    pagination_class = KeysetPagination
+    
+    def get_keyset_ordering(self):
+        if self.action == 'price_history':
+            return ('-recorded_at', '-id')
+        return ('-times_purchased', '-updated_at', '-id')
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -31,7 +55,7 @@ class ProductViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """Return only user's products"""
-        queryset = Product.objects.filter(user=self.request.user)
+        queryset = Product.objects.filter(user=self.request.user).select_related('price_stats')
         
         # Filter by category if provided
         category = self.request.query_params.get('category')
@@ -43,13 +67,17 @@ class ProductViewSet(viewsets.ModelViewSet):
         if favorites_only == 'true':
             queryset = queryset.filter(is_favorite=True)
         
-        # Search by name
+        # Search by name (word prefixes on the autocomplete index)
         search = self.request.query_params.get('search')
         if search:
-            queryset = queryset.filter(name__icontains=search)
+            queryset = filter_by_name(queryset, self.request.user, search)
         
         return queryset
     
+    @conditional_view(_catalog_etag)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
     @action(detail=False, methods=['get'])
     def favorites(self, request):
         """
@@ -57,7 +85,7 @@ class ProductViewSet(viewsets.ModelViewSet):
         Get favorite products
         """
         favorites = self.get_queryset().filter(is_favorite=True)
-        serializer = ProductSummarySerializer(favorites, many=True)
+        serializer = ProductSummarySerializer(favorites, many=True, context={'request': request})
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
@@ -67,7 +95,7 @@ class ProductViewSet(viewsets.ModelViewSet):
         Get most frequently purchased products
         """
         frequent = self.get_queryset().order_by('-times_purchased')[:10]
-        serializer = ProductSummarySerializer(frequent, many=True)
+        serializer = ProductSummarySerializer(frequent, many=True, context={'request': request})
         return Response(serializer.data)
     
     @action(detail=True, methods=['post'])
@@ -113,9 +141,105 @@ class ProductViewSet(viewsets.ModelViewSet):
         # Update last price
         product.last_price = price
         product.save()
+        # The insert refreshed the statistics loaded with the product
+        product.price_stats = ProductPriceStats.objects.get(pk=product.pk)
         
         return Response(ProductSerializer(product).data)
     
+    @action(detail=True, methods=['get'])
+    def price_history(self, request, pk=None):
+        """
+        GET /api/products/{id}/price_history/?cursor=...&page_size=50
+        Whole price history, newest first (product responses nest only
+        the newest PRODUCT_PRICE_HISTORY_LIMIT prices)
+        """
+        product = self.get_object()
+        page = self.paginate_queryset(product.price_history.all())
+        serializer = PriceHistorySerializer(page, many=True, context={'request': request})
+        return self.get_paginated_response(serializer.data)
+    
+    @action(detail=True, methods=['get'])
+    def rating(self, request, pk=None):
+        """
+        GET /api/products/{id}/rating/?price=12.90
+        Rate a price (default: the last one) against the product's stats
+        """
+        product = self.get_object()
+        
+        price = request.query_params.get('price', product.last_price)
+        try:
+            price = Decimal(str(price))
+            if not price.is_finite() or price <= 0:
+                raise ValueError()
+        except (ValueError, InvalidOperation):
+            return Response(
+                {'error': 'Preço inválido.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        stats = getattr(product, 'price_stats', None)
+        if stats is None:
+            return Response({'rating': None, 'price': price, 'reference': None, 'stats': None})
+        return Response({
+            **stats.rate(price),
+            'stats': ProductPriceStatsSerializer(stats).data,
+        })
+    
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """
+        GET /api/products/autocomplete/?q=feij&limit=10
+        Typeahead suggestions (see apps.products.autocomplete)
+        """
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 25)
+        except ValueError:
+            limit = 10
+        
+        products = suggest(
+            request.user, request.query_params.get('q', ''), limit=limit
+        )
+        serializer = ProductSummarySerializer(products, many=True, context={'request': request})
+        return Response(serializer.data)
+    
+    @action(detail=False, methods=['post'], parser_classes=[JSONParser])
+    def prices(self, request):
+        """
+        POST /api/products/prices/
+        Last price, date and rating of many products at once
+        {"names": ["Arroz", "Feijão"], "ids": [12]}
+        """
+        serializer = PriceLookupSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        hints = lookup_prices(
+            request.user,
+            names=serializer.validated_data.get('names', []),
+            ids=serializer.validated_data.get('ids', []),
+        )
+        return Response({'results': PriceHintSerializer(hints, many=True).data})
+    
+    @action(detail=False, methods=['get'])
+    def barcode(self, request):
+        """
+        GET /api/products/barcode/?code=7891234567895
+        The user's product with this barcode, else the GTIN reference catalog
+        """
+        try:
+            result = lookup_barcode(request.user, request.query_params.get('code', ''))
+        except ValueError:
+            return Response(
+                {'error': 'Código de barras inválido.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if result is None:
+            return Response(
+                {'error': 'Produto não encontrado.'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(BarcodeLookupSerializer(result, context={'request': request}).data)
+    
     @action(detail=False, methods=['get'])
     def categories(self, request):
         """
@@ -3,7 +3,7 @@ SmartCart Shopping Admin
 """
 
 from django.contrib import admin
-from .models import ShoppingList, ShoppingItem
+from .models import LastPurchase, ShoppingList, ShoppingItem, ShoppingListArchive
 
 
 class ShoppingItemInline(admin.TabularInline):
@@ -34,7 +34,16 @@ class ShoppingListAdmin(admin.ModelAdmin):
     search_fields = ['user__email', 'name']
     ordering = ['-created_at']
     
-    readonly_fields = ['total_spent', 'created_at', 'updated_at', 'completed_at']
+    readonly_fields = [
+        'total_spent',
+        'items_count',
+        'checked_count',
+        'created_at',
+        'updated_at',
+        'completed_at',
+        'catalog_recorded_at',
+        'archived_at',
+    ]
     inlines = [ShoppingItemInline]
     
     def budget_percentage(self, obj):
@@ -64,3 +73,31 @@ class ShoppingItemAdmin(admin.ModelAdmin):
     def subtotal_display(self, obj):
         return f"R$ {obj.subtotal:.2f}"
     subtotal_display.short_description = 'Subtotal'
+
+
+@admin.register(ShoppingListArchive)
+class ShoppingListArchiveAdmin(admin.ModelAdmin):
+    """Admin for ShoppingListArchive model"""
+    
+    list_display = [
+        'shopping_list',
+        'items_count',
+        'total_spent',
+        'archived_at',
+    ]
+    search_fields = ['shopping_list__user__email', 'shopping_list__name']
+    ordering = ['-archived_at']
+    
+    exclude = ['items_blob']
+    readonly_fields = ['shopping_list', 'items_count', 'checked_count', 'total_spent', 'archived_at']
+
+
+@admin.register(LastPurchase)
+class LastPurchaseAdmin(admin.ModelAdmin):
+    """Admin for LastPurchase model"""
+    
+    list_display = ['name', 'user', 'last_purchased_at']
+    search_fields = ['user__email', 'normalized_name']
+    ordering = ['-last_purchased_at']
+    
+    readonly_fields = ['user', 'normalized_name', 'name', 'entries', 'last_purchased_at']
@@ -0,0 +1,103 @@
+"""
+SmartCart List Archival
+Moves the items of old finished lists out of the hot tables
+"""
+
+from itertools import groupby
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import (
+    ShoppingList,
+    ShoppingItem,
+    ShoppingItemTombstone,
+    ShoppingListArchive,
+)
+
+
+FINISHED_STATUSES = ('completed', 'cancelled')
+
+
+def archive_lists(before, batch_size=200, user=None):
+    """
+    Archive completed/cancelled lists not touched since `before`.
+
+    The list row stays (it is small and drives history, pagination and
+    ETags); its items and tombstones are deleted and one compressed blob
+    per list goes to ShoppingListArchive. Lists are locked per batch, so an
+    item write racing the archival either commits first (and is archived)
+    or waits and finds the list archived.
+    Returns the number of lists archived.
+    """
+    candidates = ShoppingList.objects.filter(
+        status__in=FINISHED_STATUSES,
+        archived_at__isnull=True,
+        updated_at__lt=before,
+    )
+    if user is not None:
+        candidates = candidates.filter(user=user)
+
+    archived = 0
+    while True:
+        with transaction.atomic():
+            lists = list(
+                candidates.select_for_update().order_by('pk').only(
+                    'id', *ShoppingList.COUNTER_FIELDS
+                )[:batch_size]
+            )
+            if not lists:
+                return archived
+            _archive_batch(lists)
+        archived += len(lists)
+
+
+def _archive_batch(lists):
+    ids = [shopping_list.pk for shopping_list in lists]
+    items = ShoppingItem.objects.filter(shopping_list_id__in=ids)
+    # Rows are kept in the default item ordering (newest first)
+    rows = items.order_by('shopping_list_id', '-created_at', '-id').values_list(
+        'shopping_list_id', *ShoppingListArchive.ITEM_FIELDS
+    )
+    rows_by_list = {
+        list_id: [row[1:] for row in group]
+        for list_id, group in groupby(rows, key=lambda row: row[0])
+    }
+
+    ShoppingListArchive.objects.bulk_create([
+        ShoppingListArchive(
+            shopping_list_id=shopping_list.pk,
+            items_blob=ShoppingListArchive.pack_items(rows_by_list.get(shopping_list.pk, [])),
+            total_spent=shopping_list.total_spent,
+            items_count=shopping_list.items_count,
+            checked_count=shopping_list.checked_count,
+        )
+        for shopping_list in lists
+    ])
+    # Plain queryset deletes: the counters must not move
+    items.delete()
+    ShoppingItemTombstone.objects.filter(shopping_list_id__in=ids).delete()
+    # updated_at and change_version are left alone: what clients see
+    # (and their cached copies) does not change
+    ShoppingList.objects.filter(pk__in=ids).update(archived_at=timezone.now())
+
+
+def purge_cancelled_lists(before, user=None):
+    """
+    Delete cancelled lists not touched since `before` (items, archives
+    and tombstones cascade). Returns the number of lists deleted.
+    """
+    from apps.accounts.models import User
+
+    lists = ShoppingList.objects.filter(status='cancelled', updated_at__lt=before)
+    if user is not None:
+        lists = lists.filter(user=user)
+
+    with transaction.atomic():
+        user_ids = set(lists.values_list('user_id', flat=True))
+        if not user_ids:
+            return 0
+        _, deleted = lists.delete()
+        # Queryset deletes skip ShoppingList.delete(): invalidate ETags here
+        User.bump_version('lists_version', pk__in=user_ids)
+    return deleted.get(ShoppingList._meta.label, 0)
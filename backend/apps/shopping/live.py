@@ -0,0 +1,195 @@
+"""
+SmartCart Live Updates
+Fan-out of shopping list deltas to Server-Sent Events subscribers
+
+Every committed change to a list or its items publishes one message on the
+list's channel, shaped like the /changes/ response:
+{"version", "shopping_list": totals, "upserted": [items], "deleted": [ids]}
+
+The backend is chosen by settings.LIVE_UPDATES:
+- InProcessBackend: subscribers live in this process (tests, single node)
+- RedisBackend: Redis pub/sub, for several workers (needs `redis`)
+"""
+
+import asyncio
+import json
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+def channel_name(list_id):
+    return f'shopping-list:{list_id}'
+
+
+class Subscription(ABC):
+    """Async iterator over the messages of one channel"""
+
+    def __init__(self, backend, channel):
+        self.backend = backend
+        self.channel = channel
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    @abstractmethod
+    async def open(self):
+        """Start receiving the channel"""
+
+    @abstractmethod
+    async def get(self):
+        """Wait for the next message"""
+
+    @abstractmethod
+    async def close(self):
+        """Stop receiving the channel"""
+
+
+class InProcessSubscription(Subscription):
+
+    async def open(self):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+        self.backend._add(self)
+
+    async def get(self):
+        return await self.queue.get()
+
+    async def close(self):
+        self.backend._remove(self)
+
+    def deliver(self, message):
+        # publish() runs in whatever thread committed the transaction
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, message)
+
+
+class InProcessBackend:
+    """Delivers messages to subscribers of the current process only"""
+
+    def __init__(self, **options):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def has_listeners(self, channel):
+        return bool(self._subscribers.get(channel))
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.deliver(message)
+
+    def subscribe(self, channel):
+        return InProcessSubscription(self, channel)
+
+    def _add(self, subscription):
+        with self._lock:
+            self._subscribers[subscription.channel].add(subscription)
+
+    def _remove(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+
+class RedisSubscription(Subscription):
+
+    async def open(self):
+        self.client = self.backend.async_client()
+        self.pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        await self.pubsub.subscribe(self.channel)
+
+    async def get(self):
+        while True:
+            message = await self.pubsub.get_message(timeout=None)
+            if message is not None:
+                data = message['data']
+                return data.decode() if isinstance(data, bytes) else data
+
+    async def close(self):
+        await self.pubsub.unsubscribe(self.channel)
+        await self.pubsub.aclose()
+        await self.client.aclose()
+
+
+class RedisBackend:
+    """Delivers messages through Redis pub/sub to every worker"""
+
+    def __init__(self, url='redis://localhost:6379/0', **options):
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured(
+                'RedisBackend requires the "redis" package (pip install redis).'
+            )
+        self.url = url
+        self.client = redis.Redis.from_url(url)
+
+    def has_listeners(self, channel):
+        # Asking Redis costs as much as publishing; always publish
+        return True
+
+    def publish(self, channel, message):
+        self.client.publish(channel, message)
+
+    def subscribe(self, channel):
+        return RedisSubscription(self, channel)
+
+    def async_client(self):
+        import redis.asyncio
+        return redis.asyncio.Redis.from_url(self.url)
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    config = getattr(settings, 'LIVE_UPDATES', {})
+    backend_class = import_string(
+        config.get('BACKEND', 'apps.shopping.live.InProcessBackend')
+    )
+    return backend_class(**config.get('OPTIONS', {}))
+
+
+def publish_change(list_id, upserted=(), deleted=()):
+    """
+    Publish a list delta once the current transaction commits.
+    Items are serialized now; the totals are read at commit time, and
+    only when somebody may be listening.
+    """
+    from .serializers import ShoppingItemSerializer
+
+    channel = channel_name(list_id)
+    if not get_backend().has_listeners(channel):
+        return
+    upserted = ShoppingItemSerializer(list(upserted), many=True).data
+    deleted = list(deleted)
+    transaction.on_commit(lambda: _send(list_id, channel, upserted, deleted))
+
+
+def _send(list_id, channel, upserted, deleted):
+    from .models import ShoppingList
+    from .serializers import ShoppingListTotalsSerializer
+
+    shopping_list = ShoppingList.objects.filter(pk=list_id).first()
+    if shopping_list is None:
+        return
+    message = json.dumps({
+        'version': shopping_list.change_version,
+        'shopping_list': ShoppingListTotalsSerializer(shopping_list).data,
+        'upserted': upserted,
+        'deleted': deleted,
+    }, cls=DjangoJSONEncoder)
+    get_backend().publish(channel, message)
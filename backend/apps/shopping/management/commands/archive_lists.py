@@ -0,0 +1,66 @@
+"""
+Management command to archive old finished lists and purge old cancelled
+ones. Meant to run as a daily scheduled job (cron / Render Cron Job).
+Run: python manage.py archive_lists [--months 6] [--cancelled-days 365] [--email user@example.com]
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.accounts.models import User
+from apps.shopping.archive import archive_lists, purge_cancelled_lists
+
+
+class Command(BaseCommand):
+    help = 'Move items of old completed/cancelled lists to compressed archives'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months',
+            type=int,
+            default=settings.ARCHIVE_AFTER_MONTHS,
+            help='Archive lists untouched for N months (default: ARCHIVE_AFTER_MONTHS)'
+        )
+        parser.add_argument(
+            '--cancelled-days',
+            type=int,
+            default=settings.CANCELLED_LIST_RETENTION_DAYS,
+            help='Delete cancelled lists untouched for N days '
+                 '(default: CANCELLED_LIST_RETENTION_DAYS)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Lists archived per transaction (default: 200)'
+        )
+        parser.add_argument(
+            '--email',
+            type=str,
+            help='Only process lists of this user'
+        )
+
+    def handle(self, *args, **options):
+        user = None
+        if options['email']:
+            user = User.objects.filter(email=options['email']).first()
+            if user is None:
+                self.stdout.write(self.style.ERROR(f"User {options['email']} not found."))
+                return
+
+        now = timezone.now()
+        purged = purge_cancelled_lists(
+            now - timedelta(days=options['cancelled_days']),
+            user=user,
+        )
+        archived = archive_lists(
+            now - timedelta(days=30 * options['months']),
+            batch_size=options['batch_size'],
+            user=user,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {archived} lists, purged {purged} cancelled lists.'
+        ))
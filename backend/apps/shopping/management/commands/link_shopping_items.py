@@ -0,0 +1,148 @@
+"""
+Management command to link shopping items written before product matching
+existed to their catalog products, in hot lists and in archived ones
+(whose blobs are rewritten). Items are matched in chunks of one user's
+items; each list with newly linked items gets a new change version, so
+caches and delta sync pick the links up. Matching is CPU-bound, so
+chunks run in a pool of worker processes, each given disjoint id ranges.
+Safe to re-run: linked items are skipped and items without a match stay
+unlinked.
+Run: python manage.py link_shopping_items [--email user@example.com] [--workers 4]
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from django.utils import timezone
+
+from apps.shopping.models import ShoppingItem, ShoppingList, ShoppingListArchive
+
+
+def _stamp(items_by_list):
+    """Give linked items their list's new change version"""
+    now = timezone.now()
+    # Lists are locked in id order, so concurrent chunks never deadlock
+    for list_id in sorted(items_by_list):
+        version = ShoppingList.apply_delta(list_id).change_version
+        for item in items_by_list[list_id]:
+            item.change_version = version
+            item.updated_at = now
+
+
+def link_chunk(user_id, first_id, last_id):
+    """
+    Match and link a user's hot items with ids in [first_id, last_id];
+    returns the number linked
+    """
+    with transaction.atomic():
+        items = list(ShoppingItem.objects.filter(
+            shopping_list__user_id=user_id,
+            pk__range=(first_id, last_id),
+            product__isnull=True,
+        ).exclude(name='').only('id', 'shopping_list_id', 'name', 'product_id'))
+        ShoppingItem.link_products(user_id, items)
+        linked = {}
+        for item in items:
+            if item.product_id is not None:
+                linked.setdefault(item.shopping_list_id, []).append(item)
+        _stamp(linked)
+        ShoppingItem.objects.bulk_update(
+            [item for items in linked.values() for item in items],
+            ['product', 'change_version', 'updated_at'],
+        )
+    return sum(map(len, linked.values()))
+
+
+def link_archive(archive_id):
+    """Match and link the items of one archived list; returns the number linked"""
+    with transaction.atomic():
+        archive = ShoppingListArchive.objects.select_for_update().select_related(
+            'shopping_list',
+        ).get(pk=archive_id)
+        items = [item for item in archive.unpack_items() if item.product_id is None]
+        ShoppingItem.link_products(archive.shopping_list.user_id, items)
+        linked = [item for item in items if item.product_id is not None]
+        if linked:
+            _stamp({archive.pk: linked})
+            archive.repack_items()
+            archive.save(update_fields=['items_blob'])
+    return len(linked)
+
+
+def link_archives(archive_ids):
+    """Match and link the items of a batch of archived lists"""
+    return sum(link_archive(archive_id) for archive_id in archive_ids)
+
+
+def _start_worker():
+    # Connections inherited from the parent process must not be shared
+    connections.close_all()
+
+
+def _run(function, chunks, workers):
+    """Total of function(*chunk) over the chunks, in `workers` processes"""
+    if workers <= 1 or len(chunks) <= 1:
+        return sum(function(*chunk) for chunk in chunks)
+    connections.close_all()
+    # Forked workers inherit the configured Django setup
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('fork'),
+        initializer=_start_worker,
+    ) as executor:
+        return sum(executor.map(function, *zip(*chunks)))
+
+
+class Command(BaseCommand):
+    help = 'Link unlinked shopping items to matching catalog products'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--email',
+            type=str,
+            help='Only link items of this user'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Items per batch (default: 500)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Processes matching batches in parallel; 1 runs inline (default: 4)'
+        )
+
+    def handle(self, *args, **options):
+        queryset = ShoppingItem.objects.filter(product__isnull=True).exclude(name='')
+        archives = ShoppingListArchive.objects.all()
+        if options['email']:
+            queryset = queryset.filter(shopping_list__user__email=options['email'])
+            archives = archives.filter(shopping_list__user__email=options['email'])
+
+        items_by_user = {}
+        for item_id, user_id in queryset.order_by('pk').values_list('pk', 'shopping_list__user_id'):
+            items_by_user.setdefault(user_id, []).append(item_id)
+
+        chunk_size = options['chunk_size']
+        chunks = [
+            (user_id, item_ids[start], item_ids[min(start + chunk_size, len(item_ids)) - 1])
+            for user_id, item_ids in items_by_user.items()
+            for start in range(0, len(item_ids), chunk_size)
+        ]
+        archive_ids = list(archives.order_by('pk').values_list('pk', flat=True))
+        archive_chunks = [
+            (archive_ids[start:start + chunk_size],)
+            for start in range(0, len(archive_ids), chunk_size)
+        ]
+
+        linked = _run(link_chunk, chunks, options['workers'])
+        archived = _run(link_archives, archive_chunks, options['workers'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Linked {linked} items and {archived} archived items.'
+        ))
@@ -0,0 +1,51 @@
+"""
+Management command to fill the last-purchase index (product_history) from
+lists completed before it existed. Safe to re-run: lists already indexed
+are skipped per product.
+Run: python manage.py rebuild_last_purchases [--email user@example.com]
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.shopping.models import LastPurchase, ShoppingList
+
+
+class Command(BaseCommand):
+    help = 'Index the priced items of completed lists by normalized name'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--email',
+            type=str,
+            help='Only index lists of this user'
+        )
+
+    def handle(self, *args, **options):
+        queryset = ShoppingList.objects.filter(
+            status='completed',
+            completed_at__isnull=False,
+        ).select_related('archive').prefetch_related('items').order_by('pk')
+        if options['email']:
+            queryset = queryset.filter(user__email=options['email'])
+
+        lists = 0
+        for shopping_list in queryset.iterator(chunk_size=100):
+            if shopping_list.archived_at is not None:
+                items = shopping_list.archive.unpack_items()
+            else:
+                items = shopping_list.items.all()
+            LastPurchase.record(shopping_list.user_id, [
+                {
+                    'name': item.name.strip(),
+                    'list_id': shopping_list.pk,
+                    'list_name': shopping_list.name,
+                    'date': shopping_list.completed_at,
+                    'price': item.unit_price,
+                    'quantity': item.quantity,
+                }
+                for item in items
+                if item.unit_price > 0
+            ])
+            lists += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Indexed {lists} completed lists.'))
@@ -0,0 +1,41 @@
+"""
+Management command to (re)build the purchase search documents, e.g. for
+lists written before the search index existed. Safe to re-run: lists
+already indexed at their current version are skipped.
+Run: python manage.py rebuild_search_index [--email user@example.com]
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.shopping.models import ShoppingList
+from apps.shopping.search import refresh_search_documents
+
+
+class Command(BaseCommand):
+    help = 'Index list and item names and notes for full-text search'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--email',
+            type=str,
+            help='Only index lists of this user'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Lists per batch (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        queryset = ShoppingList.objects.order_by('pk')
+        if options['email']:
+            queryset = queryset.filter(user__email=options['email'])
+        list_ids = list(queryset.values_list('pk', flat=True))
+
+        chunk_size = options['chunk_size']
+        refreshed = 0
+        for start in range(0, len(list_ids), chunk_size):
+            refreshed += refresh_search_documents(list_ids[start:start + chunk_size])
+
+        self.stdout.write(self.style.SUCCESS(f'Indexed {refreshed} lists.'))
@@ -0,0 +1,60 @@
+"""
+Management command to detect (and optionally fix) drift between the
+stored shopping list counters and the items table.
+Run: python manage.py reconcile_list_totals [--fix] [--email user@example.com]
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.shopping.models import ShoppingList
+
+
+class Command(BaseCommand):
+    help = 'Check total_spent/items_count/checked_count against shopping items'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Rewrite drifted counters from the items table'
+        )
+        parser.add_argument(
+            '--email',
+            type=str,
+            help='Only check lists of this user'
+        )
+        parser.add_argument(
+            '--status',
+            type=str,
+            help='Only check lists with this status (active, completed, cancelled)'
+        )
+
+    def handle(self, *args, **options):
+        queryset = ShoppingList.objects.order_by('pk')
+        if options['email']:
+            queryset = queryset.filter(user__email=options['email'])
+        if options['status']:
+            queryset = queryset.filter(status=options['status'])
+
+        checked = drifted = 0
+        for shopping_list in queryset.iterator():
+            checked += 1
+            drift = shopping_list.counters_drift()
+            if not drift:
+                continue
+
+            drifted += 1
+            details = ', '.join(
+                f'{field}: {stored} -> {expected}'
+                for field, (stored, expected) in drift.items()
+            )
+            self.stdout.write(
+                self.style.WARNING(f'List #{shopping_list.pk} drifted ({details})')
+            )
+            if options['fix']:
+                shopping_list.update_total()
+
+        summary = f'Checked {checked} lists, {drifted} with drift.'
+        if drifted and options['fix']:
+            summary += ' Fixed.'
+        self.stdout.write(self.style.SUCCESS(summary))
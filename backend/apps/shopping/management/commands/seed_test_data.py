@@ -73,13 +73,12 @@ class Command(BaseCommand):
             user=user,
             name=name,
             planned_budget=Decimal(str(total)) + Decimal('100.00'),
-            total_spent=Decimal(str(total)),
             status='completed',
             # completed_at and created_at will be overwritten below
         )
         s_list.payment_methods.add(payment_method)
         
-        # Add Items (Dummy items to match total roughly)
+        # Add Items (Dummy items to match total roughly, total_spent follows them)
         ShoppingItem.objects.create(
             shopping_list=s_list,
             name=f"Itens Variados {name}",
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.9 on 2026-10-18 19:25
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import migrations, models
+
+
+def populate_counters(apps, schema_editor):
+    ShoppingList = apps.get_model('shopping', 'ShoppingList')
+    ShoppingItem = apps.get_model('shopping', 'ShoppingItem')
+
+    counters = {}
+    rows = ShoppingItem.objects.values_list(
+        'shopping_list_id', 'unit_price', 'quantity', 'is_checked'
+    ).iterator()
+    for list_id, unit_price, quantity, is_checked in rows:
+        total, items, checked = counters.get(list_id, (Decimal('0'), 0, 0))
+        line_total = (unit_price * quantity).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        counters[list_id] = (total + line_total, items + 1, checked + int(is_checked))
+
+    for list_id, (total, items, checked) in counters.items():
+        ShoppingList.objects.filter(pk=list_id).update(
+            total_spent=total,
+            items_count=items,
+            checked_count=checked,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shopping', '0002_shoppinglist_receipt_pdf'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='checked_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Itens marcados'),
+        ),
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='items_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Quantidade de itens'),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.9 on 2026-10-18 19:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_alter_paymentmethod_payment_type'),
+        ('shopping', '0003_shoppinglist_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='shoppinglist',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='shopping_list_user_created'),
+        ),
+        migrations.AddIndex(
+            model_name='shoppinglist',
+            index=models.Index(fields=['user', 'status', '-completed_at', '-id'], name='shopping_list_user_history'),
+        ),
+    ]
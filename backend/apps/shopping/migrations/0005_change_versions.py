@@ -0,0 +1,50 @@
+# Generated by Django 5.2.9 on 2026-10-18 19:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shopping', '0004_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingItemTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_id', models.BigIntegerField(verbose_name='Item removido')),
+                ('change_version', models.PositiveBigIntegerField(verbose_name='Versão de alterações')),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, verbose_name='Removido em')),
+            ],
+            options={
+                'verbose_name': 'Item removido',
+                'verbose_name_plural': 'Itens removidos',
+            },
+        ),
+        migrations.AddField(
+            model_name='shoppingitem',
+            name='change_version',
+            field=models.PositiveBigIntegerField(default=0, help_text='Versão da lista na última alteração deste item', verbose_name='Versão de alterações'),
+        ),
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='change_version',
+            field=models.PositiveBigIntegerField(default=0, help_text='Incrementada a cada alteração na lista ou em seus itens', verbose_name='Versão de alterações'),
+        ),
+        migrations.AddIndex(
+            model_name='shoppingitem',
+            index=models.Index(fields=['shopping_list', 'change_version'], name='shopping_item_list_version'),
+        ),
+        migrations.AddField(
+            model_name='shoppingitemtombstone',
+            name='shopping_list',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tombstones', to='shopping.shoppinglist', verbose_name='Lista de compras'),
+        ),
+        migrations.AddIndex(
+            model_name='shoppingitemtombstone',
+            index=models.Index(fields=['shopping_list', 'change_version'], name='shopping_tombstone_version'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-18 19:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shopping', '0005_change_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='catalog_recorded_at',
+            field=models.DateTimeField(blank=True, help_text='Quando os itens foram enviados ao catálogo de produtos', null=True, verbose_name='Registrada no catálogo em'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.9 on 2026-10-18 19:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shopping', '0006_shoppinglist_catalog_recorded_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingListArchive',
+            fields=[
+                ('shopping_list', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='archive', serialize=False, to='shopping.shoppinglist', verbose_name='Lista de compras')),
+                ('items_blob', models.BinaryField(verbose_name='Itens (JSON compactado)')),
+                ('total_spent', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Total gasto')),
+                ('items_count', models.PositiveIntegerField(verbose_name='Quantidade de itens')),
+                ('checked_count', models.PositiveIntegerField(verbose_name='Itens marcados')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Arquivada em')),
+            ],
+            options={
+                'verbose_name': 'Lista arquivada',
+                'verbose_name_plural': 'Listas arquivadas',
+            },
+        ),
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, help_text='Itens movidos para ShoppingListArchive', null=True, verbose_name='Arquivada em'),
+        ),
+    ]
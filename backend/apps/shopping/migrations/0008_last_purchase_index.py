@@ -0,0 +1,33 @@
+# Generated by Django 5.2.9 on 2026-10-18 19:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shopping', '0007_list_archive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LastPurchase',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('normalized_name', models.CharField(max_length=200, verbose_name='Nome normalizado')),
+                ('name', models.CharField(max_length=200, verbose_name='Nome')),
+                ('entries', models.JSONField(default=list, verbose_name='Últimas compras')),
+                ('last_purchased_at', models.DateTimeField(verbose_name='Última compra')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='last_purchases', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Última compra',
+                'verbose_name_plural': 'Últimas compras',
+                'indexes': [models.Index(fields=['user', 'normalized_name'], name='last_purchase_name_prefix', opclasses=['', 'varchar_pattern_ops'])],
+                'unique_together': {('user', 'normalized_name')},
+            },
+        ),
+    ]
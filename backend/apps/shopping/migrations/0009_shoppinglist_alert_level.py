@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-18 20:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shopping', '0008_last_purchase_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shoppinglist',
+            name='alert_level',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Maior alerta de orçamento já enviado (0, 1 = aviso, 2 = ultrapassado)', verbose_name='Nível de alerta'),
+        ),
+    ]
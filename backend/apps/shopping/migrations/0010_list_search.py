@@ -0,0 +1,85 @@
+# Generated by Django 5.2.9 on 2026-10-18 20:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+FTS_TABLE = 'shopping_listsearch_fts'
+SOURCE_TABLE = 'shopping_shoppinglistsearch'
+
+
+def create_text_index(apps, schema_editor):
+    """Backend-specific full-text index over ShoppingListSearch.document"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        from django.contrib.postgres.indexes import GinIndex
+        from django.contrib.postgres.search import SearchVector
+
+        model = apps.get_model('shopping', 'ShoppingListSearch')
+        schema_editor.add_index(model, GinIndex(
+            SearchVector('document', config='portuguese'),
+            name='list_search_document_fts',
+        ))
+    elif vendor == 'sqlite':
+        # External content: the text lives once, in the source table
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            f"document, content='{SOURCE_TABLE}', content_rowid='shopping_list_id')"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {SOURCE_TABLE} BEGIN "
+            f"INSERT INTO {FTS_TABLE}(rowid, document) VALUES (new.shopping_list_id, new.document); "
+            f"END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {SOURCE_TABLE} BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, document) "
+            f"VALUES ('delete', old.shopping_list_id, old.document); "
+            f"END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE ON {SOURCE_TABLE} BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, document) "
+            f"VALUES ('delete', old.shopping_list_id, old.document); "
+            f"INSERT INTO {FTS_TABLE}(rowid, document) VALUES (new.shopping_list_id, new.document); "
+            f"END"
+        )
+
+
+def drop_text_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS list_search_document_fts')
+    elif vendor == 'sqlite':
+        for suffix in ('ai', 'ad', 'au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shopping', '0009_shoppinglist_alert_level'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingListSearch',
+            fields=[
+                ('shopping_list', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='shopping.shoppinglist', verbose_name='Lista de compras')),
+                ('status', models.CharField(max_length=20, verbose_name='Status')),
+                ('date', models.DateTimeField(verbose_name='Data')),
+                ('document', models.TextField(verbose_name='Texto indexado')),
+                ('indexed_version', models.PositiveBigIntegerField(verbose_name='Versão indexada')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Índice de busca',
+                'verbose_name_plural': 'Índices de busca',
+                'indexes': [models.Index(fields=['user', '-date'], name='list_search_user_date')],
+            },
+        ),
+        migrations.RunPython(create_text_index, drop_text_index),
+    ]
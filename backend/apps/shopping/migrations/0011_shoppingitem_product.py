@@ -0,0 +1,20 @@
+# Generated by Django 5.2.9 on 2026-10-18 20:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_product_match_keys'),
+        ('shopping', '0010_list_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shoppingitem',
+            name='product',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='shopping_items', to='products.product', verbose_name='Produto'),
+        ),
+    ]
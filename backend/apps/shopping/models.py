@@ -3,9 +3,21 @@ SmartCart Shopping Models
 Shopping lists and cart items
 """
 
-from django.db import models
+import json
+import zlib
+from datetime import datetime
+
+from django.db import models, transaction
+from django.db.models import F
 from django.conf import settings
-from decimal import Decimal
+from django.utils import timezone
+from decimal import Decimal, ROUND_HALF_UP
+
+from .live import publish_change
+from .search import schedule_search_index
+
+
+CENTS = Decimal('0.01')
 
 
 class ShoppingList(models.Model):
@@ -48,6 +60,22 @@ class ShoppingList(models.Model):
         default=0,
     )
     
+    items_count = models.PositiveIntegerField(
+        'Quantidade de itens',
+        default=0,
+    )
+    
+    checked_count = models.PositiveIntegerField(
+        'Itens marcados',
+        default=0,
+    )
+    
+    change_version = models.PositiveBigIntegerField(
+        'Versão de alterações',
+        default=0,
+        help_text='Incrementada a cada alteração na lista ou em seus itens',
+    )
+    
     status = models.CharField(
         'Status',
         max_length=20,
@@ -77,11 +105,36 @@ class ShoppingList(models.Model):
     created_at = models.DateTimeField('Criado em', auto_now_add=True)
     updated_at = models.DateTimeField('Atualizado em', auto_now=True)
     completed_at = models.DateTimeField('Finalizado em', null=True, blank=True)
+    catalog_recorded_at = models.DateTimeField(
+        'Registrada no catálogo em',
+        null=True,
+        blank=True,
+        help_text='Quando os itens foram enviados ao catálogo de produtos',
+    )
+    archived_at = models.DateTimeField(
+        'Arquivada em',
+        null=True,
+        blank=True,
+        help_text='Itens movidos para ShoppingListArchive',
+    )
+    alert_level = models.PositiveSmallIntegerField(
+        'Nível de alerta',
+        default=0,
+        help_text='Maior alerta de orçamento já enviado (0, 1 = aviso, 2 = ultrapassado)',
+    )
     
     class Meta:
         verbose_name = 'Lista de Compras'
         verbose_name_plural = 'Listas de Compras'
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of lists and history
+            models.Index(fields=['user', '-created_at', '-id'], name='shopping_list_user_created'),
+            models.Index(
+                fields=['user', 'status', '-completed_at', '-id'],
+                name='shopping_list_user_history',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.name or 'Lista'} - {self.created_at.strftime('%d/%m/%Y')}"
@@ -98,18 +151,211 @@ class ShoppingList(models.Model):
             return 0
         return round((self.total_spent / self.planned_budget) * 100, 1)
     
-    @property
-    def items_count(self):
-        """Get total items count"""
-        return self.items.count()
+    # Denormalized counters kept up to date by ShoppingItem with atomic
+    # deltas. A regular save() never writes them back, so a stale in-memory
+    # copy can't clobber a concurrent item write.
+    COUNTER_FIELDS = ('total_spent', 'items_count', 'checked_count')
+    # Read back after every counter delta (post-write budget summary)
+    TOTALS_FIELDS = ('id', 'planned_budget', *COUNTER_FIELDS, 'change_version', 'archived_at')
     
-    def update_total(self):
-        """Recalculate total from items"""
-        total = sum(
-            item.subtotal for item in self.items.all()
+    # Written outside save() (catalog pipeline, archival, budget alerts);
+    # same reasoning
+    PIPELINE_FIELDS = ('catalog_recorded_at', 'archived_at', 'alert_level')
+    # Read along with the totals to evaluate budget alerts
+    ALERT_FIELDS = ('name', 'status', 'alert_level', 'user__alert_percentage')
+    # Copied into the search document (apps.shopping.search)
+    SEARCH_FIELDS = ('name', 'notes', 'status', 'completed_at')
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._committed_budget = instance.__dict__.get('planned_budget')
+        instance._committed_search = instance._search_state()
+        return instance
+    
+    def _search_state(self):
+        if not all(name in self.__dict__ for name in self.SEARCH_FIELDS):
+            return None
+        return tuple(self.__dict__[name] for name in self.SEARCH_FIELDS)
+    
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            super().save(*args, **kwargs)
+            self._committed_budget = self.planned_budget
+            self._committed_search = self._search_state()
+            self._bump_user_version(pk=self.user_id)
+            schedule_search_index(self.pk)
+            return
+        
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COUNTER_FIELDS
+                and field.name not in self.PIPELINE_FIELDS
+                and field.name != 'change_version'
+            ]
+        kwargs['update_fields'] = {*update_fields, 'change_version'}
+        self.change_version = F('change_version') + 1
+        super().save(*args, **kwargs)
+        
+        # A new budget moves the percentage: re-check alerts with fresh totals
+        budget_changed = self.planned_budget != getattr(self, '_committed_budget', self.planned_budget)
+        if budget_changed:
+            self.refresh_from_db(fields=['change_version', 'total_spent', 'alert_level'])
+            self._committed_budget = self.planned_budget
+            self._evaluate_budget_alert(self, self.user.alert_percentage)
+        else:
+            self.refresh_from_db(fields=['change_version'])
+        self._bump_user_version(pk=self.user_id)
+        publish_change(self.pk)
+        # Unknown (deferred) committed values count as changed
+        search_state = self._search_state()
+        if search_state is None or search_state != getattr(self, '_committed_search', None):
+            self._committed_search = search_state
+            schedule_search_index(self.pk)
+    
+    def delete(self, *args, **kwargs):
+        user_id = self.user_id
+        result = super().delete(*args, **kwargs)
+        self._bump_user_version(pk=user_id)
+        return result
+    
+    @staticmethod
+    def _bump_user_version(**user_filters):
+        from apps.accounts.models import User
+        User.bump_version('lists_version', **user_filters)
+    
+    @classmethod
+    def apply_delta(cls, list_id, total=Decimal('0'), items=0, checked=0, reindex=False):
+        """
+        Atomically shift the stored counters of a list and bump its
+        change version. Runs a single UPDATE ... SET x = x + delta, so
+        concurrent writers never lose each other's changes.
+        Call inside a transaction; returns the list as written (budget,
+        counters, new change version and alert state only), read back in
+        one query. Total changes are checked against the budget alerts.
+        reindex: the write changed item names or notes (add, remove,
+        rename), so the search document is refreshed after commit.
+        """
+        updates = {
+            'change_version': F('change_version') + 1,
+            'updated_at': timezone.now(),
+        }
+        if total:
+            updates['total_spent'] = F('total_spent') + total
+        if items:
+            updates['items_count'] = F('items_count') + items
+        if checked:
+            updates['checked_count'] = F('checked_count') + checked
+        queryset = cls.objects.filter(pk=list_id)
+        queryset.update(**updates)
+        if total or items:
+            # Summaries (total, item count) changed: invalidate user ETags
+            cls._bump_user_version(shopping_lists__id=list_id)
+        totals = queryset.select_related('user').only(
+            *cls.TOTALS_FIELDS, *cls.ALERT_FIELDS
+        ).get()
+        if total:
+            cls._evaluate_budget_alert(totals, totals.user.alert_percentage)
+        if reindex:
+            schedule_search_index(list_id)
+        return totals
+    
+    @staticmethod
+    def _evaluate_budget_alert(shopping_list, alert_percentage):
+        from apps.notifications.alerts import evaluate_budget_alert
+        evaluate_budget_alert(shopping_list, alert_percentage)
+    
+    def complete(self, payment_method=None):
+        """
+        Finish the shopping session, optionally paying with a payment method.
+        The items are recorded into the product catalog after commit.
+        """
+        from apps.products.purchases import schedule_completed_list
+        
+        with transaction.atomic():
+            if payment_method is not None:
+                self.payment_methods.add(payment_method)
+                
+                # Deduct from balance (atomically, only if it covers the total)
+                payment_method.deduct(self.total_spent)
+            
+            self.status = 'completed'
+            self.completed_at = timezone.now()
+            self.save()
+            schedule_completed_list(self.pk)
+    
+    def cancel(self):
+        """Cancel the shopping session"""
+        self.status = 'cancelled'
+        self.save()
+    
+    def compute_counters(self):
+        """Compute counters from the items table (source of truth)"""
+        if self.archived_at is not None:
+            rows = [
+                (item.unit_price, item.quantity, item.is_checked)
+                for item in self.archive.unpack_items()
+            ]
+        else:
+            rows = self.items.values_list('unit_price', 'quantity', 'is_checked')
+        
+        total = Decimal('0')
+        items = checked = 0
+        for unit_price, quantity, is_checked in rows:
+            total += ShoppingItem.line_total_for(unit_price, quantity)
+            items += 1
+            checked += int(is_checked)
+        return {
+            'total_spent': total,
+            'items_count': items,
+            'checked_count': checked,
+        }
+    
+    def counters_drift(self):
+        """
+        Compare stored counters with the items table.
+        Returns {field: (stored, expected)} for every field that drifted.
+        """
+        stored = ShoppingList.objects.filter(pk=self.pk).values(
+            *self.COUNTER_FIELDS
+        ).get()
+        expected = self.compute_counters()
+        return {
+            field: (stored[field], expected[field])
+            for field in self.COUNTER_FIELDS
+            if stored[field] != expected[field]
+        }
+    
+    @classmethod
+    def create_with_items(cls, items, **list_data):
+        """
+        Create a list and all its items with two INSERTs.
+        `items` are dicts of ShoppingItem fields; the counters are computed
+        up front because bulk_create bypasses ShoppingItem.save().
+        """
+        new_items = [ShoppingItem(**data) for data in items]
+        list_data.update(
+            total_spent=sum((item.line_total for item in new_items), Decimal('0')),
+            items_count=len(new_items),
+            checked_count=sum(int(item.is_checked) for item in new_items),
         )
-        self.total_spent = total
-        self.save(update_fields=['total_spent', 'updated_at'])
+        with transaction.atomic():
+            shopping_list = cls.objects.create(**list_data)
+            for item in new_items:
+                item.shopping_list = shopping_list
+            ShoppingItem.link_products(shopping_list.user_id, new_items)
+            ShoppingItem.objects.bulk_create(new_items)
+        return shopping_list
+    
+    def update_total(self):
+        """Recalculate total and counters from items (reconciliation path)"""
+        counters = self.compute_counters()
+        for field, value in counters.items():
+            setattr(self, field, value)
+        self.save(update_fields=[*self.COUNTER_FIELDS, 'updated_at'])
 
 
 class ShoppingItem(models.Model):
@@ -129,6 +375,17 @@ class ShoppingItem(models.Model):
         max_length=200,
     )
     
+    # Catalog entry this free-text name resolves to (see
+    # apps.products.matching); set on insert and on completion
+    product = models.ForeignKey(
+        'products.Product',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='shopping_items',
+        verbose_name='Produto',
+    )
+    
     unit_price = models.DecimalField(
         'Preço unitário',
         max_digits=10,
@@ -161,6 +418,12 @@ class ShoppingItem(models.Model):
         help_text='Indica se o item foi colocado no carrinho',
     )
     
+    change_version = models.PositiveBigIntegerField(
+        'Versão de alterações',
+        default=0,
+        help_text='Versão da lista na última alteração deste item',
+    )
+    
     created_at = models.DateTimeField('Criado em', auto_now_add=True)
     updated_at = models.DateTimeField('Atualizado em', auto_now=True)
     
@@ -168,6 +431,12 @@ class ShoppingItem(models.Model):
         verbose_name = 'Item da Lista'
         verbose_name_plural = 'Itens da Lista'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(
+                fields=['shopping_list', 'change_version'],
+                name='shopping_item_list_version',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.quantity}x R$ {self.unit_price}"
@@ -177,13 +446,450 @@ class ShoppingItem(models.Model):
         """Calculate subtotal for this item"""
         return Decimal(str(self.unit_price)) * Decimal(str(self.quantity))
     
+    @staticmethod
+    def line_total_for(unit_price, quantity):
+        """Subtotal rounded to cents, as it is added to the list total"""
+        subtotal = Decimal(str(unit_price)) * Decimal(str(quantity))
+        return subtotal.quantize(CENTS, rounding=ROUND_HALF_UP)
+    
+    @property
+    def line_total(self):
+        return self.line_total_for(self.unit_price, self.quantity)
+    
+    # Fields that feed the list counters; save() and delete() re-read them
+    # under a row lock and push deltas instead of recomputing the whole
+    # list. The snapshot taken on load serves batch writes that locked
+    # their rows when reading them.
+    TRACKED_FIELDS = ('shopping_list_id', 'unit_price', 'quantity', 'is_checked')
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_committed_state()
+        return instance
+    
+    def _remember_committed_state(self):
+        if all(name in self.__dict__ for name in self.TRACKED_FIELDS):
+            self._committed_state = self._counter_state()
+        else:
+            # Deferred fields: no snapshot to take
+            self._committed_state = None
+        # Searchable text; None (deferred) counts as changed on save
+        self._committed_text = self._text_state()
+    
+    def _text_state(self):
+        if 'name' not in self.__dict__ or 'notes' not in self.__dict__:
+            return None
+        return (self.name, self.notes)
+    
+    def _counter_state(self):
+        return (
+            self.shopping_list_id,
+            self.line_total,
+            1,
+            int(bool(self.is_checked)),
+        )
+    
+    def _load_committed_state(self):
+        # Locked: a concurrent edit of the same item waits for this one, so
+        # both never push a delta against the same previous row
+        row = ShoppingItem.objects.select_for_update().filter(pk=self.pk).values_list(
+            *self.TRACKED_FIELDS
+        ).first()
+        if row is None:
+            return None
+        list_id, unit_price, quantity, is_checked = row
+        return (list_id, self.line_total_for(unit_price, quantity), 1, int(is_checked))
+    
+    @staticmethod
+    def link_products(user_id, items):
+        """Point unlinked items at their matching catalog products (one query)"""
+        from apps.products.matching import resolve
+        
+        unlinked = [item for item in items if item.product_id is None and item.name]
+        if not unlinked:
+            return
+        matches = resolve(user_id, [item.name for item in unlinked])
+        for item in unlinked:
+            item.product_id = matches.get(item.name, (None,))[0]
+    
+    @staticmethod
+    def _push_delta(state, sign):
+        list_id, total, items, checked = state
+        return ShoppingList.apply_delta(
+            list_id,
+            total=total * sign,
+            items=items * sign,
+            checked=checked * sign,
+            reindex=True,
+        )
+    
+    def _record_removal(self, state, item_id):
+        self.list_totals = self._push_delta(state, -1)
+        ShoppingItemTombstone.objects.create(
+            shopping_list_id=state[0],
+            item_id=item_id,
+            change_version=self.list_totals.change_version,
+        )
+        publish_change(state[0], deleted=[item_id])
+    
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        # Update shopping list total
-        self.shopping_list.update_total()
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding:
+                previous = self._load_committed_state()
+            current = self._counter_state()
+            
+            if previous is not None and previous[0] != current[0]:
+                # Moved to another list: it disappears from the old one
+                self._record_removal(previous, self.pk)
+                previous = None
+            
+            # The list row is touched once: counter deltas (only when a
+            # counter actually changes) plus the change version bump.
+            # list_totals keeps the list's budget as this write left it
+            if previous is None:
+                self.list_totals = self._push_delta(current, 1)
+            else:
+                text = self._text_state()
+                self.list_totals = ShoppingList.apply_delta(
+                    current[0],
+                    total=current[1] - previous[1],
+                    checked=current[3] - previous[3],
+                    reindex=text is None or text != getattr(self, '_committed_text', None),
+                )
+            self.change_version = self.list_totals.change_version
+            if self._state.adding:
+                self.link_products(self.list_totals.user_id, [self])
+            if self.list_totals.archived_at is not None:
+                # First write to an archived list: bring its items back
+                self.list_totals.archive.restore()
+                self.list_totals.archived_at = None
+            
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'change_version'}
+            super().save(*args, **kwargs)
+            publish_change(current[0], upserted=[self])
+        self._committed_state = current
+        self._committed_text = self._text_state()
     
     def delete(self, *args, **kwargs):
-        shopping_list = self.shopping_list
-        super().delete(*args, **kwargs)
-        # Update shopping list total after deletion
-        shopping_list.update_total()
+        with transaction.atomic():
+            previous = self._load_committed_state()
+            item_id = self.pk
+            result = super().delete(*args, **kwargs)
+            if previous is not None:
+                self._record_removal(previous, item_id)
+        self._committed_state = None
+        return result
+
+
+class ShoppingItemTombstone(models.Model):
+    """
+    Marker left behind when an item leaves a list
+    Lets clients syncing through /changes/ drop items they still hold
+    """
+    
+    shopping_list = models.ForeignKey(
+        ShoppingList,
+        on_delete=models.CASCADE,
+        related_name='tombstones',
+        verbose_name='Lista de compras',
+    )
+    
+    item_id = models.BigIntegerField('Item removido')
+    
+    change_version = models.PositiveBigIntegerField('Versão de alterações')
+    
+    deleted_at = models.DateTimeField('Removido em', auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Item removido'
+        verbose_name_plural = 'Itens removidos'
+        indexes = [
+            models.Index(
+                fields=['shopping_list', 'change_version'],
+                name='shopping_tombstone_version',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"Item #{self.item_id} removido (v{self.change_version})"
+
+
+class ShoppingListArchive(models.Model):
+    """
+    Cold storage for the items of an old completed or cancelled list
+    The items leave the hot table and are kept here as one
+    zlib-compressed JSON blob per list (a field header plus one row per
+    item), next to the list totals at archive time
+    """
+    
+    # Item columns kept in the blob, in row order
+    ITEM_FIELDS = (
+        'id', 'name', 'product', 'unit_price', 'quantity', 'image', 'notes',
+        'is_checked', 'change_version', 'created_at', 'updated_at',
+    )
+    
+    shopping_list = models.OneToOneField(
+        ShoppingList,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='archive',
+        verbose_name='Lista de compras',
+    )
+    
+    items_blob = models.BinaryField('Itens (JSON compactado)')
+    
+    total_spent = models.DecimalField(
+        'Total gasto',
+        max_digits=10,
+        decimal_places=2,
+    )
+    
+    items_count = models.PositiveIntegerField('Quantidade de itens')
+    
+    checked_count = models.PositiveIntegerField('Itens marcados')
+    
+    archived_at = models.DateTimeField('Arquivada em', auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Lista arquivada'
+        verbose_name_plural = 'Listas arquivadas'
+    
+    def __str__(self):
+        return f"Arquivo da lista #{self.shopping_list_id}"
+    
+    @classmethod
+    def pack_items(cls, rows):
+        """Compress item rows (tuples in ITEM_FIELDS order)"""
+        payload = json.dumps(
+            {'fields': cls.ITEM_FIELDS, 'rows': rows},
+            default=_archive_json_default,
+            separators=(',', ':'),
+        )
+        return zlib.compress(payload.encode(), 9)
+    
+    def unpack_items(self):
+        """Unsaved ShoppingItem instances, as they were when archived"""
+        if not hasattr(self, '_items'):
+            payload = json.loads(zlib.decompress(bytes(self.items_blob)))
+            fields = [ShoppingItem._meta.get_field(name) for name in payload['fields']]
+            self._items = []
+            for row in payload['rows']:
+                item = ShoppingItem(
+                    shopping_list_id=self.shopping_list_id,
+                    **{field.attname: field.to_python(value) for field, value in zip(fields, row)}
+                )
+                item._state.adding = False
+                self._items.append(item)
+        return self._items
+    
+    def repack_items(self):
+        """Write the unpacked (and since edited) items back into the blob"""
+        fields = [ShoppingItem._meta.get_field(name) for name in self.ITEM_FIELDS]
+        self.items_blob = self.pack_items([
+            [field.get_prep_value(getattr(item, field.attname)) for field in fields]
+            for item in self.unpack_items()
+        ])
+    
+    def restore(self):
+        """Move the items back to the hot table (before they are edited)"""
+        with transaction.atomic():
+            items = self.unpack_items()
+            stamps = [(item.created_at, item.updated_at) for item in items]
+            for item in items:
+                item._state.adding = True
+            ShoppingItem.objects.bulk_create(items)
+            # bulk_create stamps auto_now(_add) fields: put the archived ones back
+            for item, (created_at, updated_at) in zip(items, stamps):
+                item.created_at, item.updated_at = created_at, updated_at
+            ShoppingItem.objects.bulk_update(items, ['created_at', 'updated_at'])
+            ShoppingList.objects.filter(pk=self.shopping_list_id).update(archived_at=None)
+            self.delete()
+    
+    @classmethod
+    def restore_lists(cls, **filters):
+        """Restore the archives matching `filters`; True if any was"""
+        archives = list(cls.objects.filter(**filters))
+        for archive in archives:
+            archive.restore()
+        return bool(archives)
+
+
+class LastPurchase(models.Model):
+    """
+    Per-user index of the last purchases of each product
+    Keyed by the normalized product name, so the "Última vez" hint is an
+    indexed point or prefix read instead of a scan over completed items.
+    Filled when a completed list is recorded (apps.products.purchases)
+    """
+    
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='last_purchases',
+        verbose_name='Usuário',
+    )
+    
+    normalized_name = models.CharField('Nome normalizado', max_length=200)
+    
+    name = models.CharField('Nome', max_length=200)
+    
+    # Newest first: [{"list_id", "list_name", "date", "price", "quantity"}]
+    entries = models.JSONField('Últimas compras', default=list)
+    
+    last_purchased_at = models.DateTimeField('Última compra')
+    
+    class Meta:
+        verbose_name = 'Última compra'
+        verbose_name_plural = 'Últimas compras'
+        unique_together = ['user', 'normalized_name']
+        indexes = [
+            # Prefix lookups (LIKE 'abc%'); opclasses only apply on PostgreSQL
+            models.Index(
+                fields=['user', 'normalized_name'],
+                name='last_purchase_name_prefix',
+                opclasses=['', 'varchar_pattern_ops'],
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} ({self.last_purchased_at:%d/%m/%Y})"
+    
+    @classmethod
+    def record(cls, user_id, purchases):
+        """
+        Merge purchases into the user's index.
+        purchases: dicts with name, list_id, list_name, date, price and
+        quantity. Three queries whatever the number of products; rows are
+        locked, so concurrent completions do not lose entries. Recording
+        the same list twice is a no-op.
+        """
+        from .utils import normalize_name
+        
+        size = settings.LAST_PURCHASE_HISTORY_SIZE
+        by_key = {}
+        for purchase in purchases:
+            key = normalize_name(purchase['name'])[:200]
+            if key:
+                by_key.setdefault(key, []).append(purchase)
+        if not by_key:
+            return 0
+        
+        with transaction.atomic():
+            cls.objects.bulk_create(
+                [
+                    cls(
+                        user_id=user_id,
+                        normalized_name=key,
+                        name=rows[-1]['name'],
+                        last_purchased_at=rows[-1]['date'],
+                    )
+                    for key, rows in by_key.items()
+                ],
+                ignore_conflicts=True,
+            )
+            indexed = list(
+                cls.objects.select_for_update().filter(
+                    user_id=user_id,
+                    normalized_name__in=by_key,
+                )
+            )
+            for entry in indexed:
+                seen = {old['list_id'] for old in entry.entries}
+                merged = entry.entries + [
+                    _purchase_entry(purchase)
+                    for purchase in by_key[entry.normalized_name]
+                    if purchase['list_id'] not in seen
+                ]
+                merged.sort(
+                    key=lambda item: (datetime.fromisoformat(item['date']), item['list_id']),
+                    reverse=True,
+                )
+                entry.entries = merged[:size]
+                newest = datetime.fromisoformat(entry.entries[0]['date'])
+                if newest >= entry.last_purchased_at:
+                    entry.name = by_key[entry.normalized_name][-1]['name']
+                entry.last_purchased_at = newest
+            cls.objects.bulk_update(indexed, ['name', 'entries', 'last_purchased_at'])
+        return len(indexed)
+    
+    @classmethod
+    def lookup(cls, user, query, limit=5):
+        """Newest purchases of products whose normalized name starts with query"""
+        from .utils import normalize_name
+        
+        # Each row holds its newest entries first, so the `limit` most
+        # recent rows always contain the `limit` most recent purchases
+        rows = cls.objects.filter(
+            user=user,
+            normalized_name__startswith=normalize_name(query),
+        ).order_by('-last_purchased_at').values_list('entries', flat=True)[:limit]
+        entries = [entry for row in rows for entry in row]
+        entries.sort(key=lambda entry: datetime.fromisoformat(entry['date']), reverse=True)
+        return entries[:limit]
+
+
+class ShoppingListSearch(models.Model):
+    """
+    Full-text search document of a shopping list
+    One row per list with the folded (normalize_name) text of its name,
+    notes and item names and notes, plus the columns search filters on.
+    The text index on top is backend specific (see apps.shopping.search);
+    rows are refreshed after commit whenever the list's change_version
+    moves, and survive archival.
+    """
+    
+    shopping_list = models.OneToOneField(
+        ShoppingList,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='search_document',
+        verbose_name='Lista de compras',
+    )
+    
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Usuário',
+    )
+    
+    status = models.CharField('Status', max_length=20)
+    
+    # completed_at, or created_at while the list is open
+    date = models.DateTimeField('Data')
+    
+    document = models.TextField('Texto indexado')
+    
+    indexed_version = models.PositiveBigIntegerField('Versão indexada')
+    
+    class Meta:
+        verbose_name = 'Índice de busca'
+        verbose_name_plural = 'Índices de busca'
+        indexes = [
+            models.Index(fields=['user', '-date'], name='list_search_user_date'),
+        ]
+    
+    def __str__(self):
+        return f"Índice da lista #{self.shopping_list_id} (v{self.indexed_version})"
+
+
+def _purchase_entry(purchase):
+    return {
+        'list_id': purchase['list_id'],
+        'list_name': purchase['list_name'],
+        'date': purchase['date'].isoformat(),
+        'price': str(purchase['price']),
+        'quantity': str(purchase['quantity']),
+    }
+
+
+def _archive_json_default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f'Unsupported archive value: {value!r}')
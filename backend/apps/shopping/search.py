@@ -0,0 +1,172 @@
+"""
+SmartCart Purchase Search
+Ranked full-text search over shopping lists and their items
+
+Every list has one ShoppingListSearch document: the folded
+(normalize_name) text of its name, notes and item names and notes. The
+text index on top of it depends on the database:
+- PostgreSQL: GIN index on to_tsvector('portuguese', document), ranked
+  with ts_rank (Portuguese stemming: "azeites" finds "azeite")
+- SQLite: FTS5 external-content table kept in step by triggers, ranked
+  with bm25
+- anything else: unindexed substring matching, unranked
+Accents and case are folded before indexing and querying, so every
+backend matches "Feijão" and "feijao" alike. Typed words match as word
+prefixes and must all be present.
+"""
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.db.models.expressions import RawSQL
+
+from .utils import name_tokens, normalize_name
+
+
+FTS_TABLE = 'shopping_listsearch_fts'
+SEARCH_CONFIG = 'portuguese'
+
+
+def schedule_search_index(list_id):
+    """Refresh the list's search document once the transaction commits"""
+    transaction.on_commit(lambda: refresh_search_documents([list_id]), robust=True)
+
+
+def refresh_search_documents(list_ids):
+    """
+    Rebuild the documents of these lists unless already indexed at their
+    current change_version. Several writes in one transaction schedule
+    several refreshes; all but the first find the document current.
+    A refresh never overwrites a document indexed at a newer version.
+    Returns the number of lists refreshed.
+    """
+    from .models import ShoppingItem, ShoppingList, ShoppingListArchive, ShoppingListSearch
+
+    lists = [
+        shopping_list
+        for shopping_list in ShoppingList.objects.filter(pk__in=list_ids).annotate(
+            indexed_version=F('search_document__indexed_version'),
+        ).only(
+            'id', 'user_id', 'name', 'notes', 'status', 'created_at',
+            'completed_at', 'change_version', 'archived_at',
+        )
+        if shopping_list.indexed_version != shopping_list.change_version
+    ]
+    if not lists:
+        return 0
+
+    texts = {shopping_list.pk: [shopping_list.name, shopping_list.notes] for shopping_list in lists}
+    archived = [shopping_list.pk for shopping_list in lists if shopping_list.archived_at is not None]
+    for list_id, name, notes in ShoppingItem.objects.filter(
+        shopping_list_id__in=[list_id for list_id in texts if list_id not in archived],
+    ).values_list('shopping_list_id', 'name', 'notes'):
+        texts[list_id] += [name, notes]
+    for archive in ShoppingListArchive.objects.filter(shopping_list_id__in=archived):
+        for item in archive.unpack_items():
+            texts[archive.shopping_list_id] += [item.name, item.notes]
+
+    documents = {
+        shopping_list.pk: ShoppingListSearch(
+            shopping_list_id=shopping_list.pk,
+            user_id=shopping_list.user_id,
+            status=shopping_list.status,
+            date=shopping_list.completed_at or shopping_list.created_at,
+            document='\n'.join(
+                folded for folded in map(normalize_name, texts[shopping_list.pk]) if folded
+            ),
+            indexed_version=shopping_list.change_version,
+        )
+        for shopping_list in lists
+    }
+
+    with transaction.atomic():
+        for shopping_list in lists:
+            if shopping_list.indexed_version is None:
+                continue
+            document = documents.pop(shopping_list.pk)
+            ShoppingListSearch.objects.filter(
+                pk=shopping_list.pk,
+                indexed_version__lt=document.indexed_version,
+            ).update(
+                status=document.status,
+                date=document.date,
+                document=document.document,
+                indexed_version=document.indexed_version,
+            )
+        ShoppingListSearch.objects.bulk_create(documents.values(), ignore_conflicts=True)
+    return len(lists)
+
+
+def search_lists(user, query, status=None, date_from=None, date_to=None):
+    """
+    ShoppingListSearch rows of `user` matching `query`, best first, with
+    a `rank` annotation (higher is better); slice it to paginate.
+    Empty when the query has no words.
+    """
+    from .models import ShoppingListSearch
+
+    documents = ShoppingListSearch.objects.filter(user=user)
+    terms = name_tokens(query)
+    if not terms:
+        return documents.none()
+    if status:
+        documents = documents.filter(status=status)
+    if date_from:
+        documents = documents.filter(date__date__gte=date_from)
+    if date_to:
+        documents = documents.filter(date__date__lte=date_to)
+
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+        # Same expression as the GIN index (migration 0010)
+        vector = SearchVector('document', config=SEARCH_CONFIG)
+        search_query = SearchQuery(
+            ' & '.join(f'{term}:*' for term in terms),
+            config=SEARCH_CONFIG,
+            search_type='raw',
+        )
+        documents = documents.annotate(
+            vector=vector,
+            rank=SearchRank(vector, search_query),
+        ).filter(vector=search_query)
+    elif connection.vendor == 'sqlite':
+        match = ' '.join(f'"{term}"*' for term in terms)
+        table = ShoppingListSearch._meta.db_table
+        documents = documents.filter(
+            pk__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match]),
+        ).annotate(
+            # bm25 is lower for better matches
+            rank=RawSQL(
+                f'SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s AND rowid = {table}.shopping_list_id',
+                [match],
+            ),
+        )
+    else:
+        for term in terms:
+            documents = documents.filter(document__contains=term)
+        documents = documents.annotate(rank=RawSQL('0', []))
+    return documents.order_by('-rank', '-date')
+
+
+def matching_items(shopping_lists, query):
+    """
+    {list_id: [items]}: the items of these lists whose name or notes
+    contain a word starting with one of the query words
+    """
+    from .models import ShoppingItem, ShoppingListArchive
+
+    terms = name_tokens(query)
+    hot = [shopping_list.pk for shopping_list in shopping_lists if shopping_list.archived_at is None]
+    items = list(ShoppingItem.objects.filter(shopping_list_id__in=hot))
+    for archive in ShoppingListArchive.objects.filter(
+        shopping_list_id__in=[shopping_list.pk for shopping_list in shopping_lists if shopping_list.pk not in hot],
+    ):
+        items.extend(archive.unpack_items())
+
+    matches = {shopping_list.pk: [] for shopping_list in shopping_lists}
+    for item in items:
+        words = name_tokens(f'{item.name} {item.notes}')
+        if any(word.startswith(term) for term in terms for word in words):
+            matches[item.shopping_list_id].append(item)
+    return matches
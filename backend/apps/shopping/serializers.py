@@ -3,11 +3,13 @@ SmartCart Shopping Serializers
 """
 
 from rest_framework import serializers
+
+from config.fieldsets import SparseFieldsetMixin
 from .models import ShoppingList, ShoppingItem
 from apps.payments.serializers import PaymentMethodSerializer
 
 
-class ShoppingItemSerializer(serializers.ModelSerializer):
+class ShoppingItemSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for ShoppingItem model"""
     
     subtotal = serializers.DecimalField(
@@ -21,16 +23,18 @@ class ShoppingItemSerializer(serializers.ModelSerializer):
         fields = [
             'id',
             'name',
+            'product',
             'unit_price',
             'quantity',
             'subtotal',
             'image',
             'notes',
             'is_checked',
+            'change_version',
             'created_at',
             'updated_at',
         ]
-        read_only_fields = ['id', 'subtotal', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'product', 'subtotal', 'change_version', 'created_at', 'updated_at']
     
     def validate_unit_price(self, value):
         if value <= 0:
@@ -47,7 +51,7 @@ class ShoppingItemSerializer(serializers.ModelSerializer):
         return value
 
 
-class ShoppingListSerializer(serializers.ModelSerializer):
+class ShoppingListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for ShoppingList model"""
     
     items = ShoppingItemSerializer(many=True, read_only=True)
@@ -83,22 +87,38 @@ class ShoppingListSerializer(serializers.ModelSerializer):
             'payment_methods_ids',
             'items',
             'items_count',
+            'checked_count',
+            'change_version',
             'notes',
             'created_at',
             'updated_at',
             'completed_at',
         ]
+        expandable_fields = ['items', 'payment_methods']
         read_only_fields = [
             'id',
             'total_spent',
             'remaining_budget',
             'budget_percentage',
             'items_count',
+            'checked_count',
+            'change_version',
             'created_at',
             'updated_at',
             'completed_at',
         ]
     
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if instance.archived_at is not None and 'items' in data:
+            # Archived list: the items live in its compressed blob
+            data['items'] = ShoppingItemSerializer(
+                instance.archive.unpack_items(),
+                many=True,
+                context=self.context,
+            ).data
+        return data
+    
     def validate_planned_budget(self, value):
         if value < 0:
             raise serializers.ValidationError(
@@ -124,7 +144,7 @@ class ShoppingListSerializer(serializers.ModelSerializer):
         return shopping_list
 
 
-class ShoppingListSummarySerializer(serializers.ModelSerializer):
+class ShoppingListSummarySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Simplified serializer for list views"""
     
     items_count = serializers.IntegerField(read_only=True)
@@ -147,3 +167,167 @@ class ShoppingListSummarySerializer(serializers.ModelSerializer):
             'items_count',
             'created_at',
         ]
+
+
+class ShoppingListTotalsSerializer(serializers.ModelSerializer):
+    """List header and totals, without nested items (used by delta sync)"""
+    
+    remaining_budget = serializers.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        read_only=True,
+    )
+    budget_percentage = serializers.FloatField(read_only=True)
+    
+    class Meta:
+        model = ShoppingList
+        fields = [
+            'id',
+            'name',
+            'status',
+            'planned_budget',
+            'total_spent',
+            'remaining_budget',
+            'budget_percentage',
+            'items_count',
+            'checked_count',
+            'change_version',
+        ]
+        read_only_fields = fields
+
+
+class ShoppingListMergeSerializer(serializers.Serializer):
+    """Validates a request to merge several lists into a new one"""
+    
+    list_ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        min_length=2,
+        max_length=20,
+    )
+    name = serializers.CharField(max_length=100, required=False, allow_blank=True)
+    planned_budget = serializers.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        min_value=0,
+        required=False,
+    )
+    
+    def validate_list_ids(self, value):
+        value = list(dict.fromkeys(value))
+        if len(value) < 2:
+            raise serializers.ValidationError(
+                'Informe pelo menos duas listas diferentes.'
+            )
+        return value
+
+
+class ShoppingItemBulkSerializer(serializers.Serializer):
+    """
+    Validates a batch of item operations for one shopping list:
+    creates, partial updates, deletes and check toggles.
+    """
+    
+    MAX_OPERATIONS = 500
+    
+    create = ShoppingItemSerializer(many=True, required=False)
+    update = serializers.ListField(
+        child=serializers.DictField(),
+        required=False,
+    )
+    delete = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False,
+    )
+    toggle = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False,
+    )
+    
+    def validate_update(self, value):
+        updates = []
+        errors = {}
+        for index, entry in enumerate(value):
+            item_id = entry.get('id')
+            if not isinstance(item_id, int):
+                errors[index] = {'id': ['Informe o id do item.']}
+                continue
+            serializer = ShoppingItemSerializer(data=entry, partial=True)
+            if not serializer.is_valid():
+                errors[index] = serializer.errors
+                continue
+            updates.append({'id': item_id, **serializer.validated_data})
+        if errors:
+            raise serializers.ValidationError(errors)
+        return updates
+    
+    def validate(self, attrs):
+        total = sum(len(attrs.get(key, [])) for key in ('create', 'update', 'delete', 'toggle'))
+        if total == 0:
+            raise serializers.ValidationError('Nenhuma operação informada.')
+        if total > self.MAX_OPERATIONS:
+            raise serializers.ValidationError(
+                f'Máximo de {self.MAX_OPERATIONS} operações por requisição.'
+            )
+        
+        for key in ('update', 'delete', 'toggle'):
+            ids = [
+                entry['id'] if key == 'update' else entry
+                for entry in attrs.get(key, [])
+            ]
+            if len(ids) != len(set(ids)):
+                raise serializers.ValidationError(
+                    {key: 'Um item não pode aparecer mais de uma vez.'}
+                )
+        
+        deleted = set(attrs.get('delete', []))
+        touched = [entry['id'] for entry in attrs.get('update', [])] + attrs.get('toggle', [])
+        if deleted.intersection(touched):
+            raise serializers.ValidationError(
+                'Um item não pode ser removido e alterado na mesma requisição.'
+            )
+        return attrs
+
+
+class ShoppingListBudgetSerializer(serializers.ModelSerializer):
+    """
+    Post-write budget summary embedded in item responses (?summary=true)
+    Built from ShoppingItem.list_totals; should_alert uses the request user
+    """
+    
+    remaining_budget = serializers.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        read_only=True,
+    )
+    budget_percentage = serializers.FloatField(read_only=True)
+    should_alert = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = ShoppingList
+        fields = [
+            'id',
+            'planned_budget',
+            'total_spent',
+            'remaining_budget',
+            'budget_percentage',
+            'should_alert',
+            'items_count',
+            'checked_count',
+            'change_version',
+        ]
+        read_only_fields = fields
+    
+    def get_should_alert(self, obj):
+        user = self.context['request'].user
+        return obj.budget_percentage >= user.alert_percentage
+
+
+class ShoppingListSearchQuerySerializer(serializers.Serializer):
+    """Query string of the purchase history search"""
+    
+    q = serializers.CharField(max_length=200)
+    status = serializers.ChoiceField(choices=ShoppingList.STATUS_CHOICES, required=False)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=20)
+    offset = serializers.IntegerField(min_value=0, default=0)
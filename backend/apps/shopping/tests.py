@@ -2,13 +2,36 @@
 SmartCart Shopping Tests
 """
 
-from django.test import TestCase
+import asyncio
+import json
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from rest_framework.test import APITestCase
 from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
 from decimal import Decimal
+from datetime import timedelta
+from io import StringIO
 
-from .models import ShoppingList, ShoppingItem
+from apps.payments.models import PaymentMethod
+from . import live
+from .archive import archive_lists, purge_cancelled_lists
+from .models import (
+    LastPurchase,
+    ShoppingList,
+    ShoppingItem,
+    ShoppingItemTombstone,
+    ShoppingListArchive,
+    ShoppingListSearch,
+)
 
 User = get_user_model()
 
@@ -83,6 +106,102 @@ class ShoppingItemModelTests(TestCase):
         self.assertEqual(self.shopping_list.total_spent, Decimal('7.50'))
 
 
+class ShoppingListCountersTests(TestCase):
+    """Tests for incremental list counters"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='counters',
+            email='counters@example.com',
+            password='testpass123'
+        )
+        self.shopping_list = ShoppingList.objects.create(
+            user=self.user,
+            planned_budget=100.00,
+        )
+        self.item = ShoppingItem.objects.create(
+            shopping_list=self.shopping_list,
+            name='Arroz',
+            unit_price=Decimal('5.99'),
+            quantity=2,
+        )
+    
+    def test_update_applies_delta(self):
+        """Test that editing the price shifts the total by the difference"""
+        item = ShoppingItem.objects.get(pk=self.item.pk)
+        item.unit_price = Decimal('6.50')
+        item.save()
+        
+        self.shopping_list.refresh_from_db()
+        self.assertEqual(self.shopping_list.total_spent, Decimal('13.00'))
+        self.assertEqual(self.shopping_list.items_count, 1)
+    
+    def test_toggle_check_only_moves_checked_count(self):
+        """Test that checking an item does not touch the total"""
+        item = ShoppingItem.objects.get(pk=self.item.pk)
+        item.is_checked = True
+        item.save(update_fields=['is_checked', 'updated_at'])
+        
+        self.shopping_list.refresh_from_db()
+        self.assertEqual(self.shopping_list.total_spent, Decimal('11.98'))
+        self.assertEqual(self.shopping_list.checked_count, 1)
+    
+    def test_delete_decrements_counters(self):
+        """Test that deleting an item subtracts it from the list"""
+        ShoppingItem.objects.get(pk=self.item.pk).delete()
+        
+        self.shopping_list.refresh_from_db()
+        self.assertEqual(self.shopping_list.total_spent, Decimal('0'))
+        self.assertEqual(self.shopping_list.items_count, 0)
+    
+    def test_concurrent_item_writes_apply_once(self):
+        """Test that two writers holding the same item snapshot count it once"""
+        first = ShoppingItem.objects.get(pk=self.item.pk)
+        second = ShoppingItem.objects.get(pk=self.item.pk)
+        for item in (first, second):
+            item.is_checked = True
+            item.unit_price = Decimal('6.50')
+            item.save()
+        
+        self.shopping_list.refresh_from_db()
+        self.assertEqual(self.shopping_list.checked_count, 1)
+        self.assertEqual(self.shopping_list.total_spent, Decimal('13.00'))
+        
+        first.delete()
+        second.delete()
+        self.shopping_list.refresh_from_db()
+        self.assertEqual(self.shopping_list.items_count, 0)
+        self.assertEqual(self.shopping_list.checked_count, 0)
+        self.assertEqual(self.shopping_list.total_spent, Decimal('0'))
+    
+    def test_stale_list_save_keeps_counters(self):
+        """Test that saving a stale list instance does not clobber totals"""
+        stale = ShoppingList.objects.get(pk=self.shopping_list.pk)
+        ShoppingItem.objects.create(
+            shopping_list=self.shopping_list,
+            name='Feijão',
+            unit_price=Decimal('7.50'),
+            quantity=1,
+        )
+        stale.name = 'Renomeada'
+        stale.save()
+        
+        self.shopping_list.refresh_from_db()
+        self.assertEqual(self.shopping_list.total_spent, Decimal('19.48'))
+        self.assertEqual(self.shopping_list.items_count, 2)
+    
+    def test_counters_drift_and_reconcile(self):
+        """Test drift detection and the reconciliation path"""
+        ShoppingList.objects.filter(pk=self.shopping_list.pk).update(
+            total_spent=Decimal('99.00'),
+        )
+        drift = self.shopping_list.counters_drift()
+        self.assertEqual(drift, {'total_spent': (Decimal('99.00'), Decimal('11.98'))})
+        
+        self.shopping_list.update_total()
+        self.assertEqual(self.shopping_list.counters_drift(), {})
+
+
 class ShoppingAPITests(APITestCase):
     """Tests for Shopping API"""
     
@@ -112,3 +231,1018 @@ class ShoppingAPITests(APITestCase):
         
         response = self.client.get('/api/shopping/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class ShoppingItemBulkAPITests(APITestCase):
+    """Tests for the bulk item endpoint"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='bulk',
+            email='bulk@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.shopping_list = ShoppingList.objects.create(
+            user=self.user,
+            planned_budget=100.00,
+        )
+        self.arroz = ShoppingItem.objects.create(
+            shopping_list=self.shopping_list,
+            name='Arroz',
+            unit_price=Decimal('25.90'),
+        )
+        self.feijao = ShoppingItem.objects.create(
+            shopping_list=self.shopping_list,
+            name='Feijão',
+            unit_price=Decimal('8.50'),
+            quantity=2,
+        )
+        self.url = f'/api/shopping/{self.shopping_list.id}/items/bulk/'
+    
+    def test_bulk_operations(self):
+        """Test create, update, delete and toggle in a single request"""
+        data = {
+            'create': [
+                {'name': 'Leite', 'unit_price': '4.99', 'quantity': '3'},
+                {'name': 'Café', 'unit_price': '18.00'},
+            ],
+            'update': [{'id': self.feijao.id, 'quantity': '1'}],
+            'delete': [self.arroz.id],
+            'toggle': [self.feijao.id],
+        }
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['created']), 2)
+        self.assertEqual(response.data['deleted'], [self.arroz.id])
+        
+        self.shopping_list.refresh_from_db()
+        self.assertEqual(self.shopping_list.total_spent, Decimal('41.47'))
+        self.assertEqual(self.shopping_list.items_count, 3)
+        self.assertEqual(self.shopping_list.checked_count, 1)
+        self.assertEqual(self.shopping_list.counters_drift(), {})
+    
+    def test_bulk_unknown_item_rolls_back(self):
+        """Test that an unknown id aborts the whole batch"""
+        data = {
+            'create': [{'name': 'Leite', 'unit_price': '4.99'}],
+            'delete': [999999],
+        }
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.shopping_list.items.count(), 2)
+    
+    def test_bulk_rejects_conflicting_operations(self):
+        """Test that deleting and updating the same item is rejected"""
+        data = {
+            'update': [{'id': self.arroz.id, 'quantity': '2'}],
+            'delete': [self.arroz.id],
+        }
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_bulk_rejects_repeated_ids(self):
+        """Test a repeated id is rejected instead of counted twice"""
+        for data in (
+            {'delete': [self.arroz.id, self.arroz.id]},
+            {'toggle': [self.feijao.id, self.feijao.id]},
+            {'update': [{'id': self.feijao.id, 'quantity': '1'}, {'id': self.feijao.id, 'quantity': '3'}]},
+        ):
+            response = self.client.post(self.url, data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        self.shopping_list.refresh_from_db()
+        self.assertEqual(self.shopping_list.total_spent, Decimal('42.90'))
+        self.assertEqual(self.shopping_list.items_count, 2)
+        self.assertEqual(self.shopping_list.counters_drift(), {})
+        self.assertFalse(ShoppingItemTombstone.objects.exists())
+
+
+class ShoppingListCloneAPITests(APITestCase):
+    """Tests for list duplication and merge"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='clone',
+            email='clone@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.weekly = ShoppingList.objects.create(
+            user=self.user,
+            name='Semanal',
+            planned_budget=100.00,
+        )
+        self.monthly = ShoppingList.objects.create(
+            user=self.user,
+            name='Mensal',
+            planned_budget=300.00,
+        )
+        for shopping_list, name, price, quantity in [
+            (self.weekly, 'Feijão', '8.50', 2),
+            (self.weekly, 'Leite', '4.99', 6),
+            (self.monthly, '  feijao ', '9.00', 1),
+            (self.monthly, 'Arroz', '25.90', 1),
+        ]:
+            ShoppingItem.objects.create(
+                shopping_list=shopping_list,
+                name=name,
+                unit_price=Decimal(price),
+                quantity=quantity,
+            )
+    
+    def test_duplicate_copies_items_and_totals(self):
+        """Test that duplicate bulk-copies items with consistent counters"""
+        response = self.client.post(f'/api/shopping/{self.weekly.id}/duplicate/')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['name'], 'Cópia de Semanal')
+        self.assertEqual(len(response.data['items']), 2)
+        
+        new_list = ShoppingList.objects.get(pk=response.data['id'])
+        self.assertEqual(new_list.total_spent, Decimal('46.94'))
+        self.assertEqual(new_list.counters_drift(), {})
+    
+    def test_merge_deduplicates_by_normalized_name(self):
+        """Test that merge combines lines with the same normalized name"""
+        data = {'list_ids': [self.weekly.id, self.monthly.id], 'name': 'Mês'}
+        response = self.client.post('/api/shopping/merge/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data['items']), 3)
+        
+        new_list = ShoppingList.objects.get(pk=response.data['id'])
+        feijao = new_list.items.get(name='Feijão')
+        self.assertEqual(feijao.quantity, Decimal('3'))
+        self.assertEqual(feijao.unit_price, Decimal('9.00'))
+        self.assertEqual(new_list.planned_budget, Decimal('400.00'))
+        self.assertEqual(new_list.counters_drift(), {})
+    
+    def test_merge_rejects_foreign_lists(self):
+        """Test that lists of another user cannot be merged"""
+        other = User.objects.create_user(
+            username='other',
+            email='other@example.com',
+            password='testpass123'
+        )
+        foreign = ShoppingList.objects.create(user=other, planned_budget=10)
+        data = {'list_ids': [self.weekly.id, foreign.id]}
+        response = self.client.post('/api/shopping/merge/', data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ShoppingListQueryCountTests(APITestCase):
+    """Tests that list endpoints run a constant number of queries"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='queries',
+            email='queries@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        for index in range(5):
+            ShoppingList.create_with_items(
+                [
+                    {'name': f'Item {n}', 'unit_price': Decimal('1.50'), 'quantity': 1}
+                    for n in range(4)
+                ],
+                user=self.user,
+                name=f'Lista {index}',
+                planned_budget=100,
+                status='completed' if index else 'active',
+            )
+    
+    def test_list_queries(self):
+        """Test that listing does not run one query per list"""
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/shopping/')
+        self.assertEqual(len(response.data['results']), 5)
+    
+    def test_history_queries(self):
+        """Test that history does not run one query per list"""
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/shopping/history/')
+        self.assertEqual(len(response.data['results']), 4)
+    
+    def test_detail_queries(self):
+        """Test that nested items and payment methods are prefetched"""
+        shopping_list = ShoppingList.objects.filter(user=self.user).first()
+        # ETag version lookup + list + items + payment methods
+        with self.assertNumQueries(4):
+            response = self.client.get(f'/api/shopping/{shopping_list.id}/')
+        self.assertEqual(len(response.json()['items']), 4)
+        
+        with self.assertNumQueries(4):
+            self.client.get('/api/shopping/active/')
+    
+    def test_sparse_fieldset_skips_nested_queries(self):
+        """Test ?fields= trims the output and the prefetches behind it"""
+        shopping_list = ShoppingList.objects.filter(user=self.user).first()
+        url = f'/api/shopping/{shopping_list.id}/'
+        
+        # ETag version lookup + list
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'fields': 'id,name,total_spent'})
+        self.assertEqual(set(response.json()), {'id', 'name', 'total_spent'})
+        
+        # ... + items
+        with self.assertNumQueries(3):
+            response = self.client.get(url, {'fields': 'id', 'expand': 'items'})
+        self.assertEqual(set(response.json()), {'id', 'items'})
+        self.assertEqual(len(response.json()['items'][0]), 12)
+        
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {'expand': ''})
+        self.assertNotIn('items', response.json())
+        self.assertIn('planned_budget', response.json())
+    
+    def test_sparse_fieldset_on_list(self):
+        """Test ?fields= applies to every row of a list endpoint"""
+        response = self.client.get('/api/shopping/history/', {'fields': 'id,name'})
+        self.assertEqual(
+            {key for row in response.data['results'] for key in row},
+            {'id', 'name'},
+        )
+
+
+class ShoppingHistoryPaginationTests(APITestCase):
+    """Tests for keyset pagination of the history"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='history',
+            email='history@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        completed_at = timezone.now()
+        for index in range(5):
+            shopping_list = ShoppingList.objects.create(
+                user=self.user,
+                name=f'Lista {index}',
+                status='completed',
+            )
+            # Two lists share a timestamp to exercise the id tie-breaker
+            ShoppingList.objects.filter(pk=shopping_list.pk).update(
+                completed_at=completed_at - timedelta(days=index // 2),
+            )
+    
+    def test_history_pages_cover_every_list_once(self):
+        """Test walking the history cursor returns each list exactly once"""
+        seen = []
+        url = '/api/shopping/history/?page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data['results']), 2)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        
+        expected = list(
+            ShoppingList.objects.filter(user=self.user)
+            .order_by('-completed_at', '-id')
+            .values_list('id', flat=True)
+        )
+        self.assertEqual(seen, expected)
+    
+    def test_invalid_cursor(self):
+        """Test that a malformed cursor is rejected"""
+        response = self.client.get('/api/shopping/history/?cursor=bogus')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ShoppingListChangesAPITests(APITestCase):
+    """Tests for delta sync of a shopping list"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='sync',
+            email='sync@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.shopping_list = ShoppingList.objects.create(
+            user=self.user,
+            planned_budget=100.00,
+        )
+        self.arroz = ShoppingItem.objects.create(
+            shopping_list=self.shopping_list,
+            name='Arroz',
+            unit_price=Decimal('25.90'),
+        )
+        self.feijao = ShoppingItem.objects.create(
+            shopping_list=self.shopping_list,
+            name='Feijão',
+            unit_price=Decimal('8.50'),
+        )
+        self.url = f'/api/shopping/{self.shopping_list.id}/changes/'
+    
+    def test_changes_since_version(self):
+        """Test that only items changed after `since` are returned"""
+        self.shopping_list.refresh_from_db()
+        since = self.shopping_list.change_version
+        
+        self.client.post(
+            f'/api/shopping/{self.shopping_list.id}/items/{self.arroz.id}/toggle_check/'
+        )
+        self.client.delete(f'/api/shopping/{self.shopping_list.id}/items/{self.feijao.id}/')
+        
+        response = self.client.get(self.url, {'since': since})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in response.data['upserted']], [self.arroz.id])
+        self.assertEqual(response.data['deleted'], [self.feijao.id])
+        self.assertEqual(response.data['version'], since + 2)
+        self.assertEqual(response.data['shopping_list']['total_spent'], '25.90')
+    
+    def test_no_changes(self):
+        """Test that an up-to-date client gets an empty delta"""
+        self.shopping_list.refresh_from_db()
+        response = self.client.get(self.url, {'since': self.shopping_list.change_version})
+        self.assertEqual(response.data['upserted'], [])
+        self.assertEqual(response.data['deleted'], [])
+    
+    def test_invalid_since(self):
+        """Test that a missing or future version is rejected"""
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(self.url, {'since': 10 ** 6})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ShoppingConditionalGetTests(APITestCase):
+    """Tests for ETag / If-None-Match on shopping read endpoints"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='etag',
+            email='etag@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.shopping_list = ShoppingList.objects.create(
+            user=self.user,
+            planned_budget=100.00,
+        )
+        self.item = ShoppingItem.objects.create(
+            shopping_list=self.shopping_list,
+            name='Arroz',
+            unit_price=Decimal('25.90'),
+        )
+        self.url = f'/api/shopping/{self.shopping_list.id}/'
+    
+    def test_retrieve_not_modified(self):
+        """Test that a matching ETag short-circuits to 304 with one query"""
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+    
+    def test_item_change_invalidates_etag(self):
+        """Test that an item write produces a new ETag"""
+        etag = self.client.get(self.url)['ETag']
+        self.client.post(f'{self.url}items/{self.item.id}/toggle_check/')
+        
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+    
+    def test_new_active_list_with_same_version(self):
+        """Test that a new active list never matches the old list's ETag"""
+        response = self.client.get('/api/shopping/active/')
+        etag = response['ETag']
+        version = ShoppingList.objects.get(pk=self.shopping_list.pk).change_version
+        
+        self.shopping_list.complete()
+        new_list = ShoppingList.objects.create(user=self.user, planned_budget=50.00)
+        ShoppingList.objects.filter(pk=new_list.pk).update(change_version=version)
+        
+        response = self.client.get('/api/shopping/active/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['id'], new_list.id)
+    
+    def test_history_uses_user_version(self):
+        """Test that history revalidates against the user's lists version"""
+        self.user.refresh_from_db()
+        etag = self.client.get('/api/shopping/history/')['ETag']
+        
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/shopping/history/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        
+        self.shopping_list.name = 'Renomeada'
+        self.shopping_list.save()
+        self.user.refresh_from_db()
+        response = self.client.get('/api/shopping/history/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class ShoppingFinishedListCacheTests(APITestCase):
+    """Tests for the rendered-response cache of completed lists"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='cache',
+            email='cache@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.shopping_list = ShoppingList.create_with_items(
+            [{'name': 'Arroz', 'unit_price': Decimal('25.90')}],
+            user=self.user,
+            planned_budget=Decimal('100.00'),
+        )
+        self.shopping_list.complete()
+        self.url = f'/api/shopping/{self.shopping_list.id}/'
+    
+    def test_completed_list_served_from_cache(self):
+        """Test a completed list is rendered once, then read with one query"""
+        first = self.client.get(self.url)
+        self.assertEqual(first['Cache-Control'], 'private, max-age=86400')
+        
+        with self.assertNumQueries(1):
+            second = self.client.get(self.url)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second.json()['items'][0]['name'], 'Arroz')
+    
+    def test_cache_keeps_fieldsets_apart(self):
+        """Test a sparse rendering is not served for the full one"""
+        self.client.get(self.url, {'fields': 'id'})
+        response = self.client.get(self.url)
+        self.assertEqual(response.json()['items'][0]['name'], 'Arroz')
+    
+    def test_edit_invalidates_cache(self):
+        """Test an edit to a completed list is visible immediately"""
+        self.client.get(self.url)
+        self.client.patch(self.url, {'notes': 'Mercado do bairro'})
+        
+        response = self.client.get(self.url)
+        self.assertEqual(response.json()['notes'], 'Mercado do bairro')
+    
+    def test_payment_method_writes_invalidate_cache(self):
+        """Test payment method writes re-render the lists they are part of"""
+        payment_method = PaymentMethod.objects.create(
+            user=self.user,
+            payment_type='pix',
+            available_amount=Decimal('50.00'),
+        )
+        paid = ShoppingList.create_with_items(
+            [{'name': 'Leite', 'unit_price': Decimal('5.00')}],
+            user=self.user,
+        )
+        paid.complete(payment_method=payment_method)
+        url = f'/api/shopping/{paid.id}/'
+        self.user.refresh_from_db()
+        self.assertEqual(self.client.get(url).json()['payment_methods'], [payment_method.id])
+        
+        self.client.patch(f'/api/payments/{payment_method.id}/', {'name': 'PIX Nubank'})
+        self.user.refresh_from_db()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertGreater(len(queries), 1)
+        
+        payment_method.delete()
+        self.user.refresh_from_db()
+        self.assertEqual(self.client.get(url).json()['payment_methods'], [])
+    
+    def test_active_list_not_cached(self):
+        """Test active lists are always rendered fresh"""
+        active = ShoppingList.objects.create(user=self.user, planned_budget=50)
+        response = self.client.get(f'/api/shopping/{active.id}/')
+        self.assertNotIn('Cache-Control', response)
+
+
+class ShoppingOptimisticConcurrencyTests(APITestCase):
+    """Tests for If-Match preconditions on list and item writes"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='ifmatch',
+            email='ifmatch@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.shopping_list = ShoppingList.objects.create(
+            user=self.user,
+            planned_budget=100.00,
+        )
+        self.item = ShoppingItem.objects.create(
+            shopping_list=self.shopping_list,
+            name='Arroz',
+            unit_price=Decimal('25.90'),
+        )
+        self.url = f'/api/shopping/{self.shopping_list.id}/'
+        self.item_url = f'{self.url}items/{self.item.id}/'
+    
+    def test_list_if_match_with_etag(self):
+        """Test the detail ETag works as If-Match until the list changes"""
+        etag = self.client.get(self.url)['ETag']
+        self.client.post(f'{self.item_url}toggle_check/')
+        
+        response = self.client.patch(self.url, {'name': 'Feira'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.shopping_list.refresh_from_db()
+        self.assertEqual(self.shopping_list.name, '')
+        
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.patch(self.url, {'name': 'Feira'}, HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_item_if_match_with_version(self):
+        """Test item writes compare against the item's own version"""
+        version = self.item.change_version
+        response = self.client.patch(
+            self.item_url, {'quantity': '2'}, HTTP_IF_MATCH=f'"{version}"'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        # Second phone still holds the old version
+        response = self.client.delete(self.item_url, HTTP_IF_MATCH=f'"{version}"')
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertTrue(ShoppingItem.objects.filter(pk=self.item.pk).exists())
+    
+    def test_without_if_match_last_write_wins(self):
+        """Test requests without If-Match are unconditional"""
+        response = self.client.patch(self.item_url, {'quantity': '3'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class ShoppingItemSummaryTests(APITestCase):
+    """Tests for the list budget embedded in item responses"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='summary',
+            email='summary@example.com',
+            password='testpass123',
+            alert_percentage=80,
+        )
+        self.client.force_authenticate(user=self.user)
+        self.shopping_list = ShoppingList.objects.create(
+            user=self.user,
+            planned_budget=Decimal('50.00'),
+        )
+        self.items_url = f'/api/shopping/{self.shopping_list.id}/items/'
+    
+    def test_create_embeds_summary_without_extra_queries(self):
+        """Test ?summary=true costs no query over a plain create"""
+        # Stays under the alert threshold (crossing it queues a notification)
+        ShoppingList.objects.filter(pk=self.shopping_list.pk).update(planned_budget=Decimal('80.00'))
+        data = {'name': 'Arroz', 'unit_price': '25.90'}
+        with self.assertNumQueries(8):
+            self.client.post(self.items_url, data)
+        with self.assertNumQueries(8):
+            response = self.client.post(f'{self.items_url}?summary=true', data)
+        
+        summary = response.data['shopping_list']
+        self.assertEqual(summary['total_spent'], '51.80')
+        self.assertEqual(summary['remaining_budget'], '28.20')
+        self.assertEqual(summary['items_count'], 2)
+        self.assertFalse(summary['should_alert'])
+    
+    def test_toggle_and_delete_embed_summary(self):
+        """Test toggle and delete report the list as they left it"""
+        item = ShoppingItem.objects.create(
+            shopping_list=self.shopping_list,
+            name='Feijão',
+            unit_price=Decimal('8.50'),
+        )
+        response = self.client.post(f'{self.items_url}{item.id}/toggle_check/?summary=true')
+        self.assertEqual(response.data['shopping_list']['checked_count'], 1)
+        self.assertFalse(response.data['shopping_list']['should_alert'])
+        
+        response = self.client.delete(f'{self.items_url}{item.id}/?summary=true')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['shopping_list']['total_spent'], '0.00')
+        self.assertEqual(response.data['shopping_list']['items_count'], 0)
+    
+    def test_summary_is_opt_in(self):
+        """Test plain item responses keep their shape"""
+        response = self.client.post(self.items_url, {'name': 'Leite', 'unit_price': '5.49'})
+        self.assertNotIn('shopping_list', response.data)
+
+
+class ShoppingLiveUpdatesTests(APITestCase):
+    """Tests for live list updates (Server-Sent Events)"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='live',
+            email='live@example.com',
+            password='testpass123'
+        )
+        self.shopping_list = ShoppingList.objects.create(
+            user=self.user,
+            planned_budget=100.00,
+        )
+    
+    def test_in_process_backend_fan_out(self):
+        """Test that a message reaches every subscriber of the channel"""
+        backend = live.InProcessBackend()
+        
+        async def receive():
+            async with backend.subscribe('a') as first, backend.subscribe('a') as second:
+                self.assertTrue(backend.has_listeners('a'))
+                self.assertFalse(backend.has_listeners('b'))
+                backend.publish('a', 'hello')
+                backend.publish('b', 'ignored')
+                return await first.get(), await second.get()
+        
+        self.assertEqual(asyncio.run(receive()), ('hello', 'hello'))
+        self.assertFalse(backend.has_listeners('a'))
+    
+    def test_item_write_publishes_delta_on_commit(self):
+        """Test that an item write publishes the new totals after commit"""
+        backend = mock.Mock()
+        backend.has_listeners.return_value = True
+        
+        with mock.patch.object(live, 'get_backend', return_value=backend):
+            with self.captureOnCommitCallbacks(execute=True):
+                item = ShoppingItem.objects.create(
+                    shopping_list=self.shopping_list,
+                    name='Arroz',
+                    unit_price=Decimal('25.90'),
+                )
+                backend.publish.assert_not_called()
+        
+        channel, message = backend.publish.call_args.args
+        message = json.loads(message)
+        self.assertEqual(channel, live.channel_name(self.shopping_list.id))
+        self.assertEqual([i['id'] for i in message['upserted']], [item.id])
+        self.assertEqual(message['shopping_list']['total_spent'], '25.90')
+        self.assertEqual(message['version'], item.change_version)
+    
+    def test_no_publish_without_listeners(self):
+        """Test that nothing is serialized when nobody is subscribed"""
+        backend = mock.Mock()
+        backend.has_listeners.return_value = False
+        
+        # The search index refresh is the only other commit hook
+        with mock.patch.object(live, 'get_backend', return_value=backend), \
+                mock.patch('apps.shopping.models.schedule_search_index'):
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                ShoppingItem.objects.create(
+                    shopping_list=self.shopping_list,
+                    name='Arroz',
+                    unit_price=Decimal('25.90'),
+                )
+        self.assertEqual(callbacks, [])
+        backend.publish.assert_not_called()
+    
+    def test_events_requires_authentication(self):
+        """Test that the event stream rejects anonymous clients"""
+        response = self.client.get(f'/api/shopping/{self.shopping_list.id}/events/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+    
+    def test_events_need_asgi(self):
+        """Test that the event stream refuses to hold a WSGI worker"""
+        token = f'Bearer {RefreshToken.for_user(self.user).access_token}'
+        response = self.client.get(
+            f'/api/shopping/{self.shopping_list.id}/events/',
+            HTTP_AUTHORIZATION=token,
+        )
+        self.assertEqual(response.status_code, status.HTTP_501_NOT_IMPLEMENTED)
+        
+        # Served through ASGI the request gets past the check (unknown list)
+        response = async_to_sync(AsyncClient().get)(
+            '/api/shopping/999999/events/',
+            headers={'Authorization': token},
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ShoppingListArchiveTests(APITestCase):
+    """Tests for archiving old finished lists"""
+    
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='archive',
+            email='archive@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.shopping_list = ShoppingList.create_with_items(
+            [
+                {'name': 'Arroz', 'unit_price': Decimal('25.90'), 'is_checked': True},
+                {'name': 'Feijão', 'unit_price': Decimal('8.50'), 'quantity': 2},
+            ],
+            user=self.user,
+            name='Antiga',
+            planned_budget=Decimal('100.00'),
+        )
+        self.shopping_list.complete()
+        self.url = f'/api/shopping/{self.shopping_list.id}/'
+        self.before = self.client.get(self.url).json()
+        cache.clear()
+    
+    def archive(self):
+        return archive_lists(timezone.now() + timedelta(seconds=1))
+    
+    def test_archive_moves_items_to_blob(self):
+        """Test archived lists keep their row and read the same"""
+        self.assertEqual(self.archive(), 1)
+        
+        self.assertFalse(ShoppingItem.objects.filter(shopping_list=self.shopping_list).exists())
+        archive = ShoppingListArchive.objects.get(shopping_list=self.shopping_list)
+        self.assertEqual(archive.items_count, 2)
+        self.assertEqual(self.client.get(self.url).json(), self.before)
+        
+        items = self.client.get(f'{self.url}items/').json()['results']
+        self.assertEqual([item['name'] for item in items], ['Feijão', 'Arroz'])
+        self.assertEqual(self.archive(), 0)
+    
+    def test_recent_and_active_lists_not_archived(self):
+        """Test only finished lists older than the cutoff are archived"""
+        ShoppingList.objects.create(user=self.user, planned_budget=10)
+        self.assertEqual(archive_lists(timezone.now() - timedelta(days=1)), 0)
+        self.assertEqual(self.archive(), 1)
+    
+    def test_counters_reconcile_from_archive(self):
+        """Test compute_counters reads archived items"""
+        self.archive()
+        shopping_list = ShoppingList.objects.get(pk=self.shopping_list.pk)
+        self.assertEqual(
+            shopping_list.compute_counters(),
+            {'total_spent': Decimal('42.90'), 'items_count': 2, 'checked_count': 1},
+        )
+    
+    def test_item_read_leaves_list_archived(self):
+        """Test retrieving an item of an archived list reads the blob"""
+        self.archive()
+        item = self.before['items'][0]
+        
+        response = self.client.get(f'{self.url}items/{item["id"]}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), item)
+        self.assertEqual(self.client.get(f'{self.url}items/999999/').status_code, status.HTTP_404_NOT_FOUND)
+        
+        self.shopping_list.refresh_from_db()
+        self.assertIsNotNone(self.shopping_list.archived_at)
+        self.assertTrue(ShoppingListArchive.objects.exists())
+        self.assertFalse(self.shopping_list.items.exists())
+    
+    def test_item_write_restores_list(self):
+        """Test editing an item of an archived list restores its items"""
+        self.archive()
+        item_id = self.before['items'][0]['id']
+        
+        response = self.client.patch(f'{self.url}items/{item_id}/', {'notes': 'Tipo 1'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        self.shopping_list.refresh_from_db()
+        self.assertIsNone(self.shopping_list.archived_at)
+        self.assertFalse(ShoppingListArchive.objects.exists())
+        self.assertEqual(self.shopping_list.items.count(), 2)
+        self.assertEqual(self.shopping_list.items_count, 2)
+    
+    def test_restore_keeps_item_timestamps(self):
+        """Test restored items keep their archived created_at/updated_at"""
+        old = timezone.now() - timedelta(days=400)
+        ShoppingItem.objects.filter(shopping_list=self.shopping_list).update(
+            created_at=old, updated_at=old,
+        )
+        self.archive()
+        
+        ShoppingListArchive.restore_lists(shopping_list=self.shopping_list)
+        for item in ShoppingItem.objects.filter(shopping_list=self.shopping_list):
+            self.assertEqual(item.created_at, old)
+            self.assertEqual(item.updated_at, old)
+    
+    def test_item_create_restores_list(self):
+        """Test adding an item to an archived list restores it first"""
+        self.archive()
+        response = self.client.post(f'{self.url}items/', {'name': 'Sal', 'unit_price': '2.00'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        
+        self.shopping_list.refresh_from_db()
+        self.assertEqual(self.shopping_list.items.count(), 3)
+        self.assertEqual(self.shopping_list.items_count, 3)
+        self.assertEqual(self.shopping_list.total_spent, Decimal('44.90'))
+    
+    def test_duplicate_archived_list(self):
+        """Test an archived list can be duplicated"""
+        self.archive()
+        response = self.client.post(f'{self.url}duplicate/')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data['items']), 2)
+    
+    def test_purge_cancelled_lists(self):
+        """Test old cancelled lists are deleted"""
+        cancelled = ShoppingList.objects.create(user=self.user, planned_budget=10)
+        cancelled.cancel()
+        
+        deleted = purge_cancelled_lists(timezone.now() + timedelta(seconds=1))
+        self.assertEqual(deleted, 1)
+        self.assertFalse(ShoppingList.objects.filter(pk=cancelled.pk).exists())
+        self.assertTrue(ShoppingList.objects.filter(pk=self.shopping_list.pk).exists())
+
+
+@override_settings(CATALOG_PIPELINE_MODE='sync', LAST_PURCHASE_HISTORY_SIZE=3)
+class ProductHistoryIndexTests(APITestCase):
+    """Tests for the last-purchase index behind product_history"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='history',
+            email='history@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = '/api/shopping/product_history/'
+    
+    def complete(self, name, *items):
+        shopping_list = ShoppingList.create_with_items(
+            [
+                {'name': item_name, 'unit_price': Decimal(price), 'quantity': quantity}
+                for item_name, price, quantity in items
+            ],
+            user=self.user,
+            name=name,
+            planned_budget=Decimal('100.00'),
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            shopping_list.complete()
+        return shopping_list
+    
+    def test_history_from_index(self):
+        """Test completed purchases are found by accent/case-folded prefix"""
+        self.complete('Semana 1', ('Feijão  Preto', '8.50', 2), ('Arroz', '25.90', 1))
+        self.complete('Semana 2', ('feijao preto', '9.10', 1))
+        
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'name': 'FEIJAO'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(entry['list_name'], entry['price'], entry['quantity']) for entry in response.data],
+            [('Semana 2', Decimal('9.10'), Decimal('1.000')), ('Semana 1', Decimal('8.50'), Decimal('2.000'))],
+        )
+        self.assertEqual(
+            sorted(LastPurchase.objects.values_list('normalized_name', flat=True)),
+            ['arroz', 'feijao preto'],
+        )
+    
+    def test_history_keeps_last_entries(self):
+        """Test the index keeps only the newest LAST_PURCHASE_HISTORY_SIZE purchases"""
+        for week in range(5):
+            self.complete(f'Semana {week}', ('Leite', f'4.{week}0', 1))
+        
+        entry = LastPurchase.objects.get(user=self.user)
+        self.assertEqual(
+            [purchase['list_name'] for purchase in entry.entries],
+            ['Semana 4', 'Semana 3', 'Semana 2'],
+        )
+    
+    def test_active_lists_and_other_users_ignored(self):
+        """Test only the user's completed lists are indexed"""
+        ShoppingList.create_with_items(
+            [{'name': 'Café', 'unit_price': Decimal('15.00')}],
+            user=self.user,
+            planned_budget=Decimal('50.00'),
+        )
+        other = User.objects.create_user(
+            username='other', email='other@example.com', password='testpass123'
+        )
+        LastPurchase.record(other.id, [{
+            'name': 'Café', 'list_id': 0, 'list_name': 'Outra',
+            'date': timezone.now(), 'price': Decimal('1.00'), 'quantity': Decimal('1'),
+        }])
+        
+        response = self.client.get(self.url, {'name': 'caf'})
+        self.assertEqual(response.data, [])
+    
+    def test_rebuild_command_is_idempotent(self):
+        """Test rebuild_last_purchases backfills lists completed earlier"""
+        self.complete('Semana 1', ('Arroz', '25.90', 1))
+        LastPurchase.objects.all().delete()
+        
+        call_command('rebuild_last_purchases', stdout=StringIO())
+        call_command('rebuild_last_purchases', stdout=StringIO())
+        
+        entry = LastPurchase.objects.get(user=self.user, normalized_name='arroz')
+        self.assertEqual(len(entry.entries), 1)
+        self.assertEqual(entry.entries[0]['price'], '25.90')
+
+
+class ShoppingSearchTests(APITestCase):
+    """Tests for the full-text purchase history search"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='search',
+            email='search@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.old = ShoppingList.create_with_items(
+                [
+                    {'name': 'Azeite Extra Virgem', 'unit_price': Decimal('39.90')},
+                    {'name': 'Pão', 'unit_price': Decimal('8.00'), 'notes': 'integral'},
+                ],
+                user=self.user,
+                name='Feira de janeiro',
+            )
+            self.old.complete()
+            self.new = ShoppingList.create_with_items(
+                [{'name': 'Feijão Preto', 'unit_price': Decimal('8.50'), 'notes': 'azeitonas também'}],
+                user=self.user,
+                name='Mercado',
+            )
+        self.url = '/api/shopping/search/'
+    
+    def search(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+    
+    def test_ranked_search_with_folding(self):
+        """Test word prefixes match names and notes ignoring accents"""
+        data = self.search(q='AZEIT')
+        rows = {row['shopping_list']['id']: row for row in data['results']}
+        self.assertEqual(set(rows), {self.old.id, self.new.id})
+        self.assertEqual(
+            [item['name'] for item in rows[self.old.id]['items']],
+            ['Azeite Extra Virgem'],
+        )
+        self.assertEqual([item['name'] for item in rows[self.new.id]['items']], ['Feijão Preto'])
+        self.assertIsNone(data['next_offset'])
+        
+        data = self.search(q='feijao preto')
+        self.assertEqual([row['shopping_list']['id'] for row in data['results']], [self.new.id])
+        data = self.search(q='pao integral')
+        self.assertEqual([row['shopping_list']['id'] for row in data['results']], [self.old.id])
+        self.assertEqual(self.search(q='chocolate')['results'], [])
+    
+    def test_filters_and_pagination(self):
+        """Test status and date range filters and offset pages"""
+        data = self.search(q='azeit', status='active')
+        self.assertEqual([row['shopping_list']['id'] for row in data['results']], [self.new.id])
+        
+        tomorrow = (timezone.now() + timedelta(days=1)).date().isoformat()
+        self.assertEqual(self.search(q='azeit', date_from=tomorrow)['results'], [])
+        
+        first = self.search(q='azeit', limit=1)
+        self.assertEqual(first['next_offset'], 1)
+        second = self.search(q='azeit', limit=1, offset=1)
+        self.assertNotEqual(
+            first['results'][0]['shopping_list']['id'],
+            second['results'][0]['shopping_list']['id'],
+        )
+        
+        response = self.client.get(self.url, {'q': 'azeite', 'date_from': 'ontem'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_index_follows_writes(self):
+        """Test item and list writes refresh the document after commit"""
+        item = self.new.items.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(
+                f'/api/shopping/{self.new.id}/items/{item.id}/', {'name': 'Lentilha', 'notes': ''}
+            )
+        self.assertEqual(self.search(q='feijao')['results'], [])
+        self.assertEqual(len(self.search(q='lentilha')['results']), 1)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/shopping/{self.new.id}/', {'notes': 'churrasco'})
+        self.assertEqual(len(self.search(q='churras')['results']), 1)
+    
+    def test_toggle_and_price_edits_skip_the_index(self):
+        """Test writes that leave the indexed text alone never refresh it"""
+        item = self.new.items.get()
+        url = f'/api/shopping/{self.new.id}/items/{item.id}/'
+        for method, path, data in (
+            ('post', f'{url}toggle_check/', {}),
+            ('patch', url, {'unit_price': '9.90', 'quantity': '2'}),
+        ):
+            with CaptureQueriesContext(connection) as queries:
+                with self.captureOnCommitCallbacks(execute=True):
+                    response = getattr(self.client, method)(path, data)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertFalse([
+                query['sql'] for query in queries.captured_queries
+                if 'shopping_listsearch' in query['sql']
+            ])
+        
+        # item, locked counter re-read, list version bump/read and item
+        # update (plus a savepoint pair); nothing after commit
+        with self.assertNumQueries(7):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(f'{url}toggle_check/')
+    
+    def test_archived_lists_stay_searchable(self):
+        """Test archived items are still found and listed"""
+        archive_lists(timezone.now() + timedelta(seconds=1))
+        data = self.search(q='virgem')
+        self.assertEqual(
+            [item['name'] for item in data['results'][0]['items']],
+            ['Azeite Extra Virgem'],
+        )
+    
+    def test_rebuild_command(self):
+        """Test rebuild_search_index indexes lists written without it"""
+        ShoppingListSearch.objects.all().delete()
+        self.assertEqual(self.search(q='azeite')['results'], [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(self.search(q='azeit')['results']), 2)
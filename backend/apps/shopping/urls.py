@@ -5,7 +5,7 @@ SmartCart Shopping URLs
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_nested import routers
-from .views import ShoppingListViewSet, ShoppingItemViewSet
+from .views import ShoppingListViewSet, ShoppingItemViewSet, list_events
 
 app_name = 'shopping'
 
@@ -18,6 +18,7 @@ shopping_router = routers.NestedDefaultRouter(router, '', lookup='shopping_list'
 shopping_router.register('items', ShoppingItemViewSet, basename='shopping-items')
 
 urlpatterns = [
+    path('<int:pk>/events/', list_events, name='shopping-events'),
     path('', include(router.urls)),
     path('', include(shopping_router.urls)),
 ]
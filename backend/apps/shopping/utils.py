@@ -0,0 +1,25 @@
+"""
+SmartCart Shopping Utilities
+"""
+
+import re
+import unicodedata
+
+
+def normalize_name(name):
+    """
+    Normalize a product name for matching:
+    lowercase, accents removed and whitespace collapsed
+    ("  Feijão  Preto" -> "feijao preto")
+    """
+    decomposed = unicodedata.normalize('NFKD', name or '')
+    folded = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return re.sub(r'\s+', ' ', folded).strip().lower()
+
+
+def name_tokens(name):
+    """
+    Distinct words of a normalized name, in order
+    ("Feijão Preto 1kg" -> ["feijao", "preto", "1kg"])
+    """
+    return list(dict.fromkeys(re.findall(r'[a-z0-9]+', normalize_name(name))))
@@ -2,32 +2,142 @@
 SmartCart Shopping Views
 """
 
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from decimal import Decimal
+from operator import itemgetter
 
-from .models import ShoppingList, ShoppingItem
+from config.conditional import (
+    OptimisticConcurrencyMixin,
+    conditional_view,
+    versioned_etag,
+)
+from config.fieldsets import fieldset_cache_key
+from config.pagination import KeysetPagination
+from apps.sync.idempotency import IdempotencyMixin
+from .live import channel_name, get_backend, publish_change
+from .models import (
+    LastPurchase,
+    ShoppingList,
+    ShoppingItem,
+    ShoppingItemTombstone,
+    ShoppingListArchive,
+)
 from .serializers import (
     ShoppingListSerializer,
     ShoppingListSummarySerializer,
     ShoppingItemSerializer,
+    ShoppingItemBulkSerializer,
+    ShoppingListMergeSerializer,
+    ShoppingListTotalsSerializer,
+    ShoppingListBudgetSerializer,
+    ShoppingListSearchQuerySerializer,
 )
+from .search import matching_items, search_lists
+from .utils import normalize_name
+
 
+def _list_version(request, **filters):
+    try:
+        return ShoppingList.objects.filter(user=request.user, **filters).values_list(
+            'change_version', flat=True
+        ).first()
+    except ValueError:
+        return None
 
-class ShoppingListViewSet(viewsets.ModelViewSet):
+
+def _list_state(request, pk):
+    """
+    (change_version, status, updated_at) of one of the user's lists.
+    Read once per request: shared by the ETag and the response cache.
+    """
+    if not hasattr(request, '_shopping_list_state'):
+        try:
+            state = ShoppingList.objects.filter(user=request.user, pk=pk).values_list(
+                'change_version', 'status', 'updated_at'
+            ).first()
+        except ValueError:
+            state = None
+        request._shopping_list_state = state
+    return request._shopping_list_state
+
+
+def _list_etag(request, pk=None, **kwargs):
+    state = _list_state(request, pk)
+    return None if state is None else versioned_etag(request, state[0])
+
+
+def _active_list_etag(request, *args, **kwargs):
+    # Keyed on the list too: a new active list can reach the old one's version
+    active = ShoppingList.objects.filter(user=request.user, status='active').values_list(
+        'pk', 'change_version'
+    ).first()
+    if active is None:
+        return None
+    pk, version = active
+    return versioned_etag(request, version, pk)
+
+
+def _budget_status_etag(request, pk=None, **kwargs):
+    version = _list_version(request, pk=pk)
+    if version is None:
+        return None
+    # should_alert depends on the user's alert setting too
+    return versioned_etag(request, version, request.user.alert_percentage)
+
+
+def _history_etag(request, *args, **kwargs):
+    return versioned_etag(request, request.user.lists_version)
+
+
+class ShoppingListViewSet(IdempotencyMixin, OptimisticConcurrencyMixin, viewsets.ModelViewSet):
     """
     ViewSet for ShoppingList CRUD operations
+    If-Match is checked against change_version (bumped by item writes too);
+    every POST accepts Idempotency-Key
     """
     
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    precondition_actions = {'update', 'partial_update', 'destroy', 'complete', 'cancel'}
+    
+    # Actions rendered with the nested ShoppingListSerializer
+    DETAIL_ACTIONS = {'retrieve', 'update', 'partial_update', 'active', 'complete', 'cancel'}
+    
+    # Completed and cancelled lists practically never change: their rendered
+    # detail is cached until an edit moves updated_at
+    FINISHED_STATUSES = ('completed', 'cancelled')
+    FINISHED_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+    FINISHED_MAX_AGE = 60 * 60 * 24
+    
+    # Item fields carried over by duplicate/merge (images are not copied)
+    CLONED_ITEM_FIELDS = ('name', 'product_id', 'unit_price', 'quantity', 'notes')
     
     def get_serializer_class(self):
         if self.action == 'list':
             return ShoppingListSummarySerializer
         return ShoppingListSerializer
     
+    def get_keyset_ordering(self):
+        if self.action == 'history':
+            return ('-completed_at', '-id')
+        return ('-created_at', '-id')
+    
     def get_queryset(self):
         """Return only user's shopping lists"""
         queryset = ShoppingList.objects.filter(user=self.request.user)
@@ -37,9 +147,46 @@ class ShoppingListViewSet(viewsets.ModelViewSet):
         if status_filter:
             queryset = queryset.filter(status=status_filter)
         
+        # Nested items and payment methods load in one query each, unless
+        # ?fields=/?expand= leave them out (archived lists bring their item
+        # blob along in the same row)
+        if self.action in self.DETAIL_ACTIONS:
+            if ShoppingListSerializer.includes(self.request, 'items'):
+                queryset = queryset.select_related('archive').prefetch_related('items')
+            if ShoppingListSerializer.includes(self.request, 'payment_methods'):
+                queryset = queryset.prefetch_related('payment_methods')
+        
         return queryset
     
+    @conditional_view(_list_etag)
+    def retrieve(self, request, pk=None, *args, **kwargs):
+        state = _list_state(request, pk)
+        if (
+            state is None
+            or state[1] not in self.FINISHED_STATUSES
+            or request.accepted_renderer.format != 'json'
+        ):
+            return super().retrieve(request, pk=pk, *args, **kwargs)
+        
+        # Nested payment methods change apart from the list: their writes
+        # bump the user's payments_version
+        payments = (
+            request.user.payments_version
+            if ShoppingListSerializer.includes(request, 'payment_methods') else '-'
+        )
+        key = f'shopping:list:{pk}:{state[2].timestamp()}:{payments}:{fieldset_cache_key(request)}'
+        content = cache.get(key)
+        if content is None:
+            data = super().retrieve(request, pk=pk, *args, **kwargs).data
+            content = request.accepted_renderer.render(data, request.accepted_media_type)
+            cache.set(key, content, self.FINISHED_CACHE_TIMEOUT)
+        
+        response = HttpResponse(content, content_type=request.accepted_renderer.media_type)
+        response['Cache-Control'] = f'private, max-age={self.FINISHED_MAX_AGE}'
+        return response
+    
     @action(detail=False, methods=['get'])
+    @conditional_view(_active_list_etag)
     def active(self, request):
         """
         GET /api/shopping/active/
@@ -53,18 +200,20 @@ class ShoppingListViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        serializer = ShoppingListSerializer(active_list)
+        serializer = self.get_serializer(active_list)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @conditional_view(_history_etag)
     def history(self, request):
         """
-        GET /api/shopping/history/
-        Get completed shopping lists
+        GET /api/shopping/history/?cursor=<next>
+        Get completed shopping lists, newest first, one page at a time
         """
         completed = self.get_queryset().filter(status='completed')
-        serializer = ShoppingListSummarySerializer(completed, many=True)
-        return Response(serializer.data)
+        page = self.paginate_queryset(completed)
+        serializer = ShoppingListSummarySerializer(page, many=True, context={'request': request})
+        return self.get_paginated_response(serializer.data)
     
     @action(detail=True, methods=['post'])
     def complete(self, request, pk=None):
@@ -75,23 +224,13 @@ class ShoppingListViewSet(viewsets.ModelViewSet):
         shopping_list = self.get_object()
         
         # Link payment method if provided
+        pm = None
         payment_method_id = request.data.get('payment_method_id')
         if payment_method_id:
             from apps.payments.models import PaymentMethod
-            try:
-                pm = PaymentMethod.objects.get(id=payment_method_id, user=request.user)
-                shopping_list.payment_methods.add(pm)
-                
-                # Deduct from balance
-                if pm.available_amount >= shopping_list.total_spent:
-                    pm.available_amount -= shopping_list.total_spent
-                    pm.save()
-            except PaymentMethod.DoesNotExist:
-                pass
-
-        shopping_list.status = 'completed'
-        shopping_list.completed_at = timezone.now()
-        shopping_list.save()
+            pm = PaymentMethod.objects.filter(id=payment_method_id, user=request.user).first()
+        
+        shopping_list.complete(payment_method=pm)
         
         return Response(ShoppingListSerializer(shopping_list).data)
     
@@ -102,8 +241,7 @@ class ShoppingListViewSet(viewsets.ModelViewSet):
         Cancel shopping list
         """
         shopping_list = self.get_object()
-        shopping_list.status = 'cancelled'
-        shopping_list.save()
+        shopping_list.cancel()
         
         return Response(ShoppingListSerializer(shopping_list).data)
     
@@ -120,22 +258,82 @@ class ShoppingListViewSet(viewsets.ModelViewSet):
         if not new_name.startswith("Cópia de"):
             new_name = f"Cópia de {new_name}"
         
-        new_list = ShoppingList.objects.create(
+        # Copy items (without images) with a single bulk insert
+        if original.archived_at is not None:
+            items = [
+                {field: getattr(item, field) for field in self.CLONED_ITEM_FIELDS}
+                for item in reversed(original.archive.unpack_items())
+            ]
+        else:
+            items = original.items.order_by('created_at', 'id').values(*self.CLONED_ITEM_FIELDS)
+        new_list = ShoppingList.create_with_items(
+            list(items),
             user=request.user,
             name=new_name,
             planned_budget=original.planned_budget,
             status='active',
         )
         
-        # Copy items (without images)
-        for item in original.items.all():
-            ShoppingItem.objects.create(
-                shopping_list=new_list,
-                name=item.name,
-                unit_price=item.unit_price,
-                quantity=item.quantity,
-                notes=item.notes,
+        return Response(
+            ShoppingListSerializer(new_list).data,
+            status=status.HTTP_201_CREATED
+        )
+    
+    @action(detail=False, methods=['post'])
+    def merge(self, request):
+        """
+        POST /api/shopping/merge/
+        Create a new list merging the items of several lists
+        Items with the same normalized name are combined and their quantities summed
+        Body: {"list_ids": [1, 2], "name": "Mês", "planned_budget": 800}
+        """
+        serializer = ShoppingListMergeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        list_ids = serializer.validated_data['list_ids']
+        
+        sources = ShoppingList.objects.filter(user=request.user, id__in=list_ids)
+        budgets = dict(sources.values_list('id', 'planned_budget'))
+        missing = set(list_ids) - set(budgets)
+        if missing:
+            return Response(
+                {'message': 'Listas não encontradas.', 'ids': sorted(missing)},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        # One read for every source item (plus archived ones); newest
+        # price wins on duplicates
+        rows = list(ShoppingItem.objects.filter(
+            shopping_list_id__in=list_ids
+        ).order_by('created_at', 'id').values(*self.CLONED_ITEM_FIELDS, 'created_at', 'id'))
+        for archive in ShoppingListArchive.objects.filter(shopping_list_id__in=list_ids):
+            rows.extend(
+                {field: getattr(item, field) for field in (*self.CLONED_ITEM_FIELDS, 'created_at', 'id')}
+                for item in archive.unpack_items()
             )
+        rows.sort(key=itemgetter('created_at', 'id'))
+        
+        merged = {}
+        for row in rows:
+            key = normalize_name(row['name'])
+            if key not in merged:
+                merged[key] = {field: row[field] for field in self.CLONED_ITEM_FIELDS}
+                continue
+            line = merged[key]
+            line['quantity'] += row['quantity']
+            line['unit_price'] = row['unit_price']
+            line['notes'] = line['notes'] or row['notes']
+        
+        planned_budget = serializer.validated_data.get('planned_budget')
+        if planned_budget is None:
+            planned_budget = sum(budgets.values())
+        
+        new_list = ShoppingList.create_with_items(
+            list(merged.values()),
+            user=request.user,
+            name=serializer.validated_data.get('name') or 'Lista combinada',
+            planned_budget=planned_budget,
+            status='active',
+        )
         
         return Response(
             ShoppingListSerializer(new_list).data,
@@ -143,6 +341,40 @@ class ShoppingListViewSet(viewsets.ModelViewSet):
         )
     
     @action(detail=True, methods=['get'])
+    def changes(self, request, pk=None):
+        """
+        GET /api/shopping/{id}/changes/?since=<change_version>
+        Items upserted or deleted since a change version, plus the list totals
+        """
+        shopping_list = self.get_object()
+        
+        try:
+            since = int(request.query_params.get('since', ''))
+            if since < 0 or since > shopping_list.change_version:
+                raise ValueError()
+        except ValueError:
+            return Response(
+                {'error': 'Versão inválida.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        upserted = []
+        deleted = []
+        if since < shopping_list.change_version:
+            upserted = shopping_list.items.filter(change_version__gt=since)
+            deleted = shopping_list.tombstones.filter(
+                change_version__gt=since
+            ).values_list('item_id', flat=True)
+        
+        return Response({
+            'version': shopping_list.change_version,
+            'shopping_list': ShoppingListTotalsSerializer(shopping_list).data,
+            'upserted': ShoppingItemSerializer(upserted, many=True).data,
+            'deleted': list(deleted),
+        })
+    
+    @action(detail=True, methods=['get'])
+    @conditional_view(_budget_status_etag)
     def budget_status(self, request, pk=None):
         """
         GET /api/shopping/{id}/budget_status/
@@ -167,38 +399,73 @@ class ShoppingListViewSet(viewsets.ModelViewSet):
     def product_history(self, request):
         """
         GET /api/shopping/product_history/?name=Arroz
-        Find history of specific product
+        Last purchases of products whose name starts with `name`
         """
         query = request.query_params.get('name', '').strip()
-        if len(query) < 2:
+        if len(normalize_name(query)) < 2:
             return Response([])
-
-        # Find completed items matching name
-        items = ShoppingItem.objects.filter(
-            shopping_list__user=request.user,
-            shopping_list__status='completed',
-            name__icontains=query
-        ).select_related('shopping_list').order_by('-shopping_list__completed_at')[:5]
-
-        history_data = []
-        for item in items:
-            history_data.append({
-                'date': item.shopping_list.completed_at,
-                'price': item.unit_price,
-                'list_name': item.shopping_list.name,
-                'quantity': item.quantity
-            })
-            
+        
+        # Prefix read on the last-purchase index (accents and case ignored)
+        history_data = [
+            {
+                'date': parse_datetime(entry['date']),
+                'price': Decimal(entry['price']),
+                'list_name': entry['list_name'],
+                'quantity': Decimal(entry['quantity']),
+            }
+            for entry in LastPurchase.lookup(request.user, query)
+        ]
         return Response(history_data)
+    
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        GET /api/shopping/search/?q=azeite&status=completed&date_from=2024-01-01
+        Ranked full-text search over list and item names and notes
+        """
+        params = ShoppingListSearchQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        query = params.validated_data['q']
+        limit = params.validated_data['limit']
+        offset = params.validated_data['offset']
+        
+        documents = list(search_lists(
+            request.user,
+            query,
+            status=params.validated_data.get('status'),
+            date_from=params.validated_data.get('date_from'),
+            date_to=params.validated_data.get('date_to'),
+        ).values_list('shopping_list_id', 'rank')[offset:offset + limit + 1])
+        has_more = len(documents) > limit
+        ranks = dict(documents[:limit])
+        
+        lists = ShoppingList.objects.in_bulk(list(ranks))
+        ordered = [lists[list_id] for list_id in ranks if list_id in lists]
+        items = matching_items(ordered, query)
+        return Response({
+            'results': [
+                {
+                    'shopping_list': ShoppingListSummarySerializer(shopping_list).data,
+                    'date': shopping_list.completed_at or shopping_list.created_at,
+                    'rank': ranks[shopping_list.pk],
+                    'items': ShoppingItemSerializer(items[shopping_list.pk], many=True).data,
+                }
+                for shopping_list in ordered
+            ],
+            'next_offset': offset + limit if has_more else None,
+        })
 
 
-class ShoppingItemViewSet(viewsets.ModelViewSet):
+class ShoppingItemViewSet(IdempotencyMixin, OptimisticConcurrencyMixin, viewsets.ModelViewSet):
     """
     ViewSet for ShoppingItem CRUD operations
+    If-Match is checked against the item's change_version;
+    every POST accepts Idempotency-Key
     """
     
     serializer_class = ShoppingItemSerializer
     permission_classes = [IsAuthenticated]
+    precondition_actions = {'update', 'partial_update', 'destroy', 'toggle_check'}
     
     def get_queryset(self):
         """Return only items from user's shopping lists"""
@@ -208,13 +475,90 @@ class ShoppingItemViewSet(viewsets.ModelViewSet):
             shopping_list__user=self.request.user,
         )
     
+    def get_object(self):
+        # Items of an archived list go back to the hot table before a
+        # write; reads are served from the blob and leave it archived
+        try:
+            return super().get_object()
+        except Http404:
+            archives = {
+                'shopping_list_id': self.kwargs.get('shopping_list_pk'),
+                'shopping_list__user': self.request.user,
+            }
+            if self.action in self.precondition_actions:
+                if not ShoppingListArchive.restore_lists(**archives):
+                    raise
+                return super().get_object()
+            archive = ShoppingListArchive.objects.filter(**archives).first()
+            item = next(
+                (item for item in archive.unpack_items() if str(item.pk) == str(self.kwargs.get('pk'))),
+                None,
+            ) if archive is not None else None
+            if item is None:
+                raise
+            self.check_object_permissions(self.request, item)
+            return item
+    
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if response.data.get('count') if isinstance(response.data, dict) else response.data:
+            return response
+        # Archived lists are read straight from their blob
+        archive = ShoppingListArchive.objects.filter(
+            shopping_list_id=self.kwargs.get('shopping_list_pk'),
+            shopping_list__user=request.user,
+        ).first()
+        if archive is None:
+            return response
+        items = archive.unpack_items()
+        page = self.paginate_queryset(items)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(items, many=True).data)
+    
     def perform_create(self, serializer):
         shopping_list_id = self.kwargs.get('shopping_list_pk')
         shopping_list = ShoppingList.objects.get(
             id=shopping_list_id,
             user=self.request.user,
         )
-        serializer.save(shopping_list=shopping_list)
+        self.written_item = serializer.save(shopping_list=shopping_list)
+    
+    def perform_update(self, serializer):
+        self.written_item = serializer.save()
+    
+    def perform_destroy(self, instance):
+        instance.delete()
+        self.written_item = instance
+    
+    # ?summary=true: responses also carry the list's budget as the write
+    # left it, read back in the same round trip as the counter update
+    
+    def create(self, request, *args, **kwargs):
+        return self.with_list_summary(super().create(request, *args, **kwargs))
+    
+    def update(self, request, *args, **kwargs):
+        return self.with_list_summary(super().update(request, *args, **kwargs))
+    
+    def destroy(self, request, *args, **kwargs):
+        return self.with_list_summary(super().destroy(request, *args, **kwargs))
+    
+    def with_list_summary(self, response):
+        item = getattr(self, 'written_item', None)
+        if (
+            self.request.query_params.get('summary') != 'true'
+            or getattr(item, 'list_totals', None) is None
+        ):
+            return response
+        
+        summary = ShoppingListBudgetSerializer(
+            item.list_totals,
+            context={'request': self.request},
+        ).data
+        if response.status_code == status.HTTP_204_NO_CONTENT:
+            return Response({'shopping_list': summary})
+        response.data['shopping_list'] = summary
+        return response
     
     @action(detail=True, methods=['post'])
     def toggle_check(self, request, shopping_list_pk=None, pk=None):
@@ -224,6 +568,206 @@ class ShoppingItemViewSet(viewsets.ModelViewSet):
         """
         item = self.get_object()
         item.is_checked = not item.is_checked
-        item.save()
+        # Only the checked counter moves; the list total is left alone
+        item.save(update_fields=['is_checked', 'updated_at'])
+        self.written_item = item
         
-        return Response(ShoppingItemSerializer(item).data)
+        return self.with_list_summary(Response(ShoppingItemSerializer(item).data))
+    
+    @action(detail=False, methods=['post'])
+    def bulk(self, request, shopping_list_pk=None):
+        """
+        POST /api/shopping/{list_id}/items/bulk/
+        Apply many item operations in one transaction
+        Body: {"create": [...], "update": [{"id": 1, ...}], "delete": [ids], "toggle": [ids]}
+        """
+        shopping_list = ShoppingList.objects.filter(
+            id=shopping_list_pk,
+            user=request.user,
+        ).first()
+        if not shopping_list:
+            return Response(
+                {'message': 'Lista não encontrada.'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        serializer = ShoppingItemBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        operations = serializer.validated_data
+        
+        updates = {entry.pop('id'): entry for entry in operations.get('update', [])}
+        toggles = operations.get('toggle', [])
+        deletes = operations.get('delete', [])
+        
+        with transaction.atomic():
+            if shopping_list.archived_at is not None:
+                shopping_list.archive.restore()
+            # Locked, so the snapshots the deltas are taken from stay current
+            existing = shopping_list.items.select_for_update().in_bulk(
+                set(updates) | set(toggles) | set(deletes)
+            )
+            missing = (set(updates) | set(toggles) | set(deletes)) - set(existing)
+            if missing:
+                transaction.set_rollback(True)
+                return Response(
+                    {'message': 'Itens não encontrados.', 'ids': sorted(missing)},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            
+            # Counter deltas are accumulated and applied once, which also
+            # hands out the change version shared by the whole batch
+            total_delta = Decimal('0')
+            items_delta = 0
+            checked_delta = 0
+            
+            for item_id in deletes:
+                item = existing[item_id]
+                total_delta -= item.line_total
+                items_delta -= 1
+                checked_delta -= int(item.is_checked)
+            
+            changed = {}
+            changed_fields = {'updated_at', 'change_version'}
+            for item_id, data in updates.items():
+                item = existing[item_id]
+                for field, value in data.items():
+                    setattr(item, field, value)
+                    changed_fields.add(field)
+                changed[item_id] = item
+            for item_id in toggles:
+                item = existing[item_id]
+                item.is_checked = not item.is_checked
+                changed_fields.add('is_checked')
+                changed[item_id] = item
+            for item in changed.values():
+                _, old_total, _, old_checked = item._committed_state
+                total_delta += item.line_total - old_total
+                checked_delta += int(item.is_checked) - old_checked
+            
+            created = [
+                ShoppingItem(shopping_list=shopping_list, **data)
+                for data in operations.get('create', [])
+            ]
+            for item in created:
+                total_delta += item.line_total
+                items_delta += 1
+                checked_delta += int(item.is_checked)
+            
+            version = ShoppingList.apply_delta(
+                shopping_list.id,
+                total=total_delta,
+                items=items_delta,
+                checked=checked_delta,
+                reindex=bool(created or deletes) or any(
+                    'name' in data or 'notes' in data for data in updates.values()
+                ),
+            ).change_version
+            
+            if deletes:
+                shopping_list.items.filter(id__in=deletes).delete()
+                ShoppingItemTombstone.objects.bulk_create([
+                    ShoppingItemTombstone(
+                        shopping_list=shopping_list,
+                        item_id=item_id,
+                        change_version=version,
+                    )
+                    for item_id in deletes
+                ])
+            
+            now = timezone.now()
+            for item in changed.values():
+                item.updated_at = now
+                item.change_version = version
+            if changed:
+                ShoppingItem.objects.bulk_update(changed.values(), sorted(changed_fields))
+            
+            for item in created:
+                item.change_version = version
+            ShoppingItem.link_products(request.user.id, created)
+            ShoppingItem.objects.bulk_create(created)
+            
+            publish_change(
+                shopping_list.id,
+                upserted=[*changed.values(), *created],
+                deleted=deletes,
+            )
+        
+        shopping_list.refresh_from_db()
+        return Response({
+            'created': ShoppingItemSerializer(created, many=True).data,
+            'updated': ShoppingItemSerializer(changed.values(), many=True).data,
+            'deleted': deletes,
+            'shopping_list': ShoppingListSummarySerializer(shopping_list).data,
+        })
+
+
+# Live updates (Server-Sent Events); served through ASGI
+
+EVENTS_KEEPALIVE_SECONDS = 15
+
+
+def _authenticate(request):
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+    return result[0] if result else None
+
+
+async def list_events(request, pk):
+    """
+    GET /api/shopping/{id}/events/
+    Stream list deltas as Server-Sent Events
+    Sends "ready" with the current change_version, then one "change"
+    event per committed write (same shape as /changes/)
+    """
+    user = await sync_to_async(_authenticate)(request)
+    if user is None:
+        return JsonResponse(
+            {'detail': 'As credenciais de autenticação não foram fornecidas.'},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+    if not isinstance(request, ASGIRequest):
+        # Under WSGI the stream would hold a sync worker for as long as it is open
+        return JsonResponse(
+            {'message': 'Atualizações ao vivo exigem o servidor ASGI.'},
+            status=status.HTTP_501_NOT_IMPLEMENTED
+        )
+    
+    # Subscribe before reading the version so no change slips in between
+    subscription = get_backend().subscribe(channel_name(pk))
+    await subscription.open()
+    version = await ShoppingList.objects.filter(pk=pk, user=user).values_list(
+        'change_version', flat=True
+    ).afirst()
+    if version is None:
+        await subscription.close()
+        return JsonResponse(
+            {'message': 'Lista não encontrada.'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    response = StreamingHttpResponse(
+        _event_stream(subscription, version),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+async def _event_stream(subscription, version):
+    try:
+        yield f'event: ready\nid: {version}\ndata: {json.dumps({"version": version})}\n\n'
+        while True:
+            try:
+                message = await asyncio.wait_for(
+                    subscription.get(), EVENTS_KEEPALIVE_SECONDS
+                )
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            version = json.loads(message)['version']
+            yield f'event: change\nid: {version}\ndata: {message}\n\n'
+    finally:
+        await subscription.close()
@@ -0,0 +1,40 @@
+"""
+SmartCart Sync Admin
+"""
+
+from django.contrib import admin
+from .models import AppliedOperation, IdempotencyKey
+
+
+@admin.register(AppliedOperation)
+class AppliedOperationAdmin(admin.ModelAdmin):
+    """Admin for AppliedOperation model"""
+    
+    list_display = [
+        'op_id',
+        'op_type',
+        'user',
+        'created_at',
+    ]
+    list_filter = ['op_type', 'created_at']
+    search_fields = ['op_id', 'user__email']
+    ordering = ['-created_at']
+    
+    readonly_fields = ['created_at']
+
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    """Admin for IdempotencyKey model"""
+    
+    list_display = [
+        'key',
+        'status_code',
+        'user',
+        'created_at',
+    ]
+    list_filter = ['status_code', 'created_at']
+    search_fields = ['key', 'user__email']
+    ordering = ['-created_at']
+    
+    readonly_fields = ['created_at']
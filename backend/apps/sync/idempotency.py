@@ -0,0 +1,122 @@
+"""
+SmartCart Idempotency Keys
+Safe retries for POST endpoints
+"""
+
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+
+def idempotency_ttl():
+    return timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL', 60 * 60 * 24))
+
+
+def request_fingerprint(request):
+    """MD5 of method, path and parsed body (uploads count by name and size)"""
+    data = request.data
+    if hasattr(data, 'lists'):
+        data = dict(data.lists())
+    payload = json.dumps(data, sort_keys=True, default=_describe_value)
+    key = '|'.join([request.method, request.path, payload])
+    return hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()
+
+
+def _describe_value(value):
+    if hasattr(value, 'size'):
+        return f'{value.name}:{value.size}'
+    return str(value)
+
+
+class IdempotencyMixin:
+    """
+    Idempotency-Key support for the POST actions of a ViewSet.
+
+    The first request with a key runs normally and its response is stored;
+    a retry with the same key gets the stored response back (with
+    Idempotent-Replayed: true) and nothing runs twice. The key row is
+    written before the handler, so a concurrent retry waits on the unique
+    index and then replays instead of doing the work again.
+    A key reused for a different request returns 422.
+    """
+    
+    # POST actions accepting the header; None means all of them
+    idempotent_actions = None
+    
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        key = request.META.get('HTTP_IDEMPOTENCY_KEY')
+        if (
+            key
+            and request.method == 'POST'
+            and (self.idempotent_actions is None or self.action in self.idempotent_actions)
+        ):
+            # dispatch() looks the handler up after initial()
+            self.post = self._idempotent(self.post, key)
+    
+    def _idempotent(self, handler, key):
+        @wraps(handler)
+        def wrapper(request, *args, **kwargs):
+            if len(key) > IdempotencyKey._meta.get_field('key').max_length:
+                return Response(
+                    {'detail': 'Idempotency-Key muito longa (máximo 64 caracteres).'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            fingerprint = request_fingerprint(request)
+            replay = self._replay(request.user, key, fingerprint)
+            if replay is not None:
+                return replay
+            
+            try:
+                with transaction.atomic():
+                    record = IdempotencyKey.objects.create(
+                        user=request.user,
+                        key=key,
+                        fingerprint=fingerprint,
+                    )
+                    response = handler(request, *args, **kwargs)
+                    record.status_code = response.status_code
+                    record.response = getattr(response, 'data', None)
+                    record.save(update_fields=['status_code', 'response'])
+            except IntegrityError:
+                # A concurrent request with the same key committed first
+                replay = self._replay(request.user, key, fingerprint)
+                if replay is None:
+                    raise
+                return replay
+            return response
+        return wrapper
+    
+    @staticmethod
+    def _replay(user, key, fingerprint):
+        record = IdempotencyKey.objects.filter(user=user, key=key).first()
+        if record is None:
+            return None
+        if record.created_at < timezone.now() - idempotency_ttl():
+            # Expired but not purged yet: the key is free again
+            record.delete()
+            return None
+        if record.fingerprint != fingerprint:
+            return Response(
+                {'detail': 'Idempotency-Key já usada em outra requisição.'},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY
+            )
+        if record.status_code is None:
+            return Response(
+                {'detail': 'Requisição original ainda em andamento.'},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response(
+            record.response,
+            status=record.status_code,
+            headers={'Idempotent-Replayed': 'true'},
+        )
@@ -0,0 +1,28 @@
+"""
+Management command to expire old entries of the replay dedup log.
+Run: python manage.py purge_applied_operations [--days 30]
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.sync.models import AppliedOperation
+
+
+class Command(BaseCommand):
+    help = 'Delete applied sync operations older than N days'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=30,
+            help='Keep operations applied in the last N days (default: 30)'
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        deleted, _ = AppliedOperation.objects.filter(created_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} applied operations.'))
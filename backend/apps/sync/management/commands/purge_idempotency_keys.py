@@ -0,0 +1,20 @@
+"""
+Management command to expire stored Idempotency-Key responses.
+Run: python manage.py purge_idempotency_keys
+"""
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.sync.idempotency import idempotency_ttl
+from apps.sync.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = 'Delete idempotency keys older than IDEMPOTENCY_KEY_TTL'
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - idempotency_ttl()
+        # Single DELETE on the created_at index (no cascades or signals)
+        deleted, _ = IdempotencyKey.objects.filter(created_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} idempotency keys.'))
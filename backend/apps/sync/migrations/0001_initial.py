@@ -0,0 +1,35 @@
+# Generated by Django 5.2.9 on 2026-10-18 19:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AppliedOperation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('op_id', models.CharField(max_length=64, verbose_name='ID da operação')),
+                ('op_type', models.CharField(max_length=30, verbose_name='Tipo')),
+                ('result', models.JSONField(default=dict, verbose_name='Resultado')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Aplicada em')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='applied_operations', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Operação sincronizada',
+                'verbose_name_plural': 'Operações sincronizadas',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['created_at'], name='sync_applied_created')],
+                'unique_together': {('user', 'op_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.9 on 2026-10-18 19:46
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sync', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, verbose_name='Chave')),
+                ('fingerprint', models.CharField(help_text='MD5 de método, caminho e corpo', max_length=32, verbose_name='Assinatura da requisição')),
+                ('status_code', models.PositiveSmallIntegerField(help_text='Vazio enquanto a requisição original está em andamento', null=True, verbose_name='Status HTTP')),
+                ('response', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, null=True, verbose_name='Resposta')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criada em')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='idempotency_keys', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Chave de idempotência',
+                'verbose_name_plural': 'Chaves de idempotência',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['created_at'], name='sync_idempotency_created')],
+                'unique_together': {('user', 'key')},
+            },
+        ),
+    ]
@@ -0,0 +1,104 @@
+"""
+SmartCart Sync Models
+Offline mutation log replay and idempotent retries
+"""
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.conf import settings
+
+
+class AppliedOperation(models.Model):
+    """
+    Client operation already applied by /api/sync/replay/
+    Replaying the same op id returns the stored result instead of
+    applying it twice
+    """
+    
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='applied_operations',
+        verbose_name='Usuário',
+    )
+    
+    op_id = models.CharField(
+        'ID da operação',
+        max_length=64,
+    )
+    
+    op_type = models.CharField(
+        'Tipo',
+        max_length=30,
+    )
+    
+    result = models.JSONField(
+        'Resultado',
+        default=dict,
+    )
+    
+    created_at = models.DateTimeField('Aplicada em', auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Operação sincronizada'
+        verbose_name_plural = 'Operações sincronizadas'
+        ordering = ['-created_at']
+        unique_together = ['user', 'op_id']
+        indexes = [
+            models.Index(fields=['created_at'], name='sync_applied_created'),
+        ]
+    
+    def __str__(self):
+        return f"{self.op_type} {self.op_id}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Response stored for an Idempotency-Key header
+    A retried POST with the same key gets this response back instead of
+    running again. Rows are short-lived and purged in bulk by created_at.
+    """
+    
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='idempotency_keys',
+        verbose_name='Usuário',
+    )
+    
+    key = models.CharField(
+        'Chave',
+        max_length=64,
+    )
+    
+    fingerprint = models.CharField(
+        'Assinatura da requisição',
+        max_length=32,
+        help_text='MD5 de método, caminho e corpo',
+    )
+    
+    status_code = models.PositiveSmallIntegerField(
+        'Status HTTP',
+        null=True,
+        help_text='Vazio enquanto a requisição original está em andamento',
+    )
+    
+    response = models.JSONField(
+        'Resposta',
+        null=True,
+        encoder=DjangoJSONEncoder,
+    )
+    
+    created_at = models.DateTimeField('Criada em', auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Chave de idempotência'
+        verbose_name_plural = 'Chaves de idempotência'
+        ordering = ['-created_at']
+        unique_together = ['user', 'key']
+        indexes = [
+            models.Index(fields=['created_at'], name='sync_idempotency_created'),
+        ]
+    
+    def __str__(self):
+        return f"{self.key} ({self.status_code})"
@@ -0,0 +1,49 @@
+"""
+SmartCart Sync Serializers
+"""
+
+from rest_framework import serializers
+
+
+OPERATION_TYPES = [
+    'list.create',
+    'list.update',
+    'list.complete',
+    'list.cancel',
+    'item.create',
+    'item.update',
+    'item.delete',
+    'item.toggle',
+    'payment.add_funds',
+]
+
+
+class OperationSerializer(serializers.Serializer):
+    """A single client-side mutation"""
+    
+    op_id = serializers.CharField(max_length=64)
+    type = serializers.ChoiceField(choices=OPERATION_TYPES)
+    # Target object: a server id, or "@<op_id>" of an earlier create
+    id = serializers.CharField(required=False)
+    list = serializers.CharField(required=False)
+    data = serializers.DictField(required=False, default=dict)
+
+
+class ReplaySerializer(serializers.Serializer):
+    """An ordered log of offline mutations"""
+    
+    MAX_OPERATIONS = 500
+    
+    operations = OperationSerializer(many=True)
+    
+    def validate_operations(self, value):
+        if not value:
+            raise serializers.ValidationError('Nenhuma operação informada.')
+        if len(value) > self.MAX_OPERATIONS:
+            raise serializers.ValidationError(
+                f'Máximo de {self.MAX_OPERATIONS} operações por requisição.'
+            )
+        op_ids = [op['op_id'] for op in value]
+        if len(op_ids) != len(set(op_ids)):
+            raise serializers.ValidationError('IDs de operação repetidos.')
+        return value
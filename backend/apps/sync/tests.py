@@ -0,0 +1,165 @@
+"""
+SmartCart Sync Tests
+"""
+
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework import status
+from decimal import Decimal
+
+from apps.payments.models import PaymentMethod
+from apps.shopping.models import ShoppingList, ShoppingItem
+from .models import AppliedOperation, IdempotencyKey
+
+User = get_user_model()
+
+
+class ReplayAPITests(APITestCase):
+    """Tests for the offline mutation replay endpoint"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='offline',
+            email='offline@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.pm = PaymentMethod.objects.create(
+            user=self.user,
+            payment_type='cash',
+            available_amount=100.00,
+        )
+        self.operations = [
+            {'op_id': 'a1', 'type': 'list.create', 'data': {'name': 'Feira', 'planned_budget': '80.00'}},
+            {'op_id': 'a2', 'type': 'item.create', 'list': '@a1',
+             'data': {'name': 'Banana', 'unit_price': '6.00', 'quantity': '2'}},
+            {'op_id': 'a3', 'type': 'item.create', 'list': '@a1',
+             'data': {'name': 'Maçã', 'unit_price': '9.90'}},
+            {'op_id': 'a4', 'type': 'item.toggle', 'id': '@a2'},
+            {'op_id': 'a5', 'type': 'item.delete', 'id': '@a3'},
+            {'op_id': 'a6', 'type': 'list.complete', 'id': '@a1',
+             'data': {'payment_method_id': self.pm.id}},
+        ]
+    
+    def test_replay_applies_log_in_order(self):
+        """Test a whole offline session replayed in one request"""
+        response = self.client.post(
+            '/api/sync/replay/', {'operations': self.operations}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [result['status'] for result in response.data['results']],
+            ['applied'] * 6,
+        )
+        
+        shopping_list = ShoppingList.objects.get(user=self.user)
+        self.assertEqual(shopping_list.status, 'completed')
+        self.assertEqual(shopping_list.total_spent, Decimal('12.00'))
+        self.assertEqual(shopping_list.checked_count, 1)
+        self.assertEqual(response.data['state']['shopping_lists'][0]['total_spent'], '12.00')
+        self.assertEqual(response.data['state']['payment_methods'][0]['available_amount'], '88.00')
+    
+    def test_replay_is_deduplicated(self):
+        """Test that replaying the same log does not apply it twice"""
+        self.client.post('/api/sync/replay/', {'operations': self.operations}, format='json')
+        response = self.client.post(
+            '/api/sync/replay/', {'operations': self.operations}, format='json'
+        )
+        self.assertEqual(
+            {result['status'] for result in response.data['results']},
+            {'duplicate'},
+        )
+        self.assertEqual(ShoppingList.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(ShoppingItem.objects.count(), 1)
+        self.pm.refresh_from_db()
+        self.assertEqual(self.pm.available_amount, Decimal('88.00'))
+    
+    def test_failed_operation_does_not_abort_others(self):
+        """Test per-op results when one op is invalid"""
+        operations = [
+            {'op_id': 'b1', 'type': 'payment.add_funds', 'id': str(self.pm.id), 'data': {'amount': '-5'}},
+            {'op_id': 'b2', 'type': 'payment.add_funds', 'id': str(self.pm.id), 'data': {'amount': '5'}},
+        ]
+        response = self.client.post('/api/sync/replay/', {'operations': operations}, format='json')
+        statuses = [result['status'] for result in response.data['results']]
+        self.assertEqual(statuses, ['error', 'applied'])
+        self.assertFalse(AppliedOperation.objects.filter(op_id='b1').exists())
+        self.pm.refresh_from_db()
+        self.assertEqual(self.pm.available_amount, Decimal('105.00'))
+
+
+class IdempotencyKeyTests(APITestCase):
+    """Tests for Idempotency-Key on POST endpoints"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='retry',
+            email='retry@example.com',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.shopping_list = ShoppingList.objects.create(
+            user=self.user,
+            planned_budget=100.00,
+        )
+        self.pm = PaymentMethod.objects.create(
+            user=self.user,
+            payment_type='cash',
+            available_amount=Decimal('100.00'),
+        )
+        self.items_url = f'/api/shopping/{self.shopping_list.id}/items/'
+    
+    def test_retried_item_create_is_replayed(self):
+        """Test a retried POST returns the first response without a new row"""
+        data = {'name': 'Leite', 'unit_price': '5.49'}
+        first = self.client.post(self.items_url, data, HTTP_IDEMPOTENCY_KEY='k-1')
+        second = self.client.post(self.items_url, data, HTTP_IDEMPOTENCY_KEY='k-1')
+        
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(second.data['id'], first.data['id'])
+        self.assertEqual(ShoppingItem.objects.count(), 1)
+    
+    def test_add_funds_credited_once(self):
+        """Test a retried add_funds does not credit twice"""
+        url = f'/api/payments/{self.pm.id}/add_funds/'
+        for _ in range(2):
+            response = self.client.post(url, {'amount': '50.00'}, HTTP_IDEMPOTENCY_KEY='k-2')
+        self.assertEqual(response.data['available_amount'], '150.00')
+        self.pm.refresh_from_db()
+        self.assertEqual(self.pm.available_amount, Decimal('150.00'))
+    
+    def test_key_reused_for_other_request(self):
+        """Test a key sent with a different body is rejected"""
+        self.client.post(
+            self.items_url, {'name': 'Leite', 'unit_price': '5.49'}, HTTP_IDEMPOTENCY_KEY='k-3'
+        )
+        response = self.client.post(
+            self.items_url, {'name': 'Pão', 'unit_price': '7.90'}, HTTP_IDEMPOTENCY_KEY='k-3'
+        )
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+    
+    def test_failed_request_is_not_stored(self):
+        """Test an error leaves the key free for a corrected retry"""
+        response = self.client.post(
+            self.items_url, {'unit_price': '1'}, HTTP_IDEMPOTENCY_KEY='k-4'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(IdempotencyKey.objects.exists())
+    
+    def test_purge_expired_keys(self):
+        """Test expired keys are deleted in bulk"""
+        data = {'name': 'Leite', 'unit_price': '5.49'}
+        self.client.post(self.items_url, data, HTTP_IDEMPOTENCY_KEY='old')
+        self.client.post(self.items_url, data, HTTP_IDEMPOTENCY_KEY='new')
+        IdempotencyKey.objects.filter(key='old').update(
+            created_at=timezone.now() - timedelta(days=2)
+        )
+        
+        call_command('purge_idempotency_keys', stdout=StringIO())
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['new'])
@@ -0,0 +1,12 @@
+"""
+SmartCart Sync URLs
+"""
+
+from django.urls import path
+from .views import ReplayView
+
+app_name = 'sync'
+
+urlpatterns = [
+    path('replay/', ReplayView.as_view(), name='replay'),
+]
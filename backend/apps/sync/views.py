@@ -0,0 +1,219 @@
+"""
+SmartCart Sync Views
+"""
+
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from rest_framework import serializers
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from apps.payments.models import PaymentMethod
+from apps.shopping.models import ShoppingList, ShoppingItem
+from apps.shopping.serializers import (
+    ShoppingListSerializer,
+    ShoppingItemSerializer,
+    ShoppingListTotalsSerializer,
+)
+from .models import AppliedOperation
+from .serializers import ReplaySerializer
+
+
+class ReplayView(APIView):
+    """
+    POST /api/sync/replay/
+    Apply an ordered log of offline mutations in one transaction
+
+    Each operation runs in its own savepoint, so one failing op does not
+    undo the others. Ops whose op_id was already applied are not run again;
+    their stored result is returned with status "duplicate".
+    Objects created earlier in the log are referenced as "@<op_id>".
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = ReplaySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        operations = serializer.validated_data['operations']
+
+        self.created = {}
+        self.touched_lists = set()
+        self.touched_payments = set()
+
+        referenced = {
+            op[key][1:]
+            for op in operations
+            for key in ('id', 'list')
+            if op.get(key, '').startswith('@')
+        }
+        self.applied = {
+            applied.op_id: applied
+            for applied in AppliedOperation.objects.filter(
+                user=request.user,
+                op_id__in=referenced | {op['op_id'] for op in operations},
+            )
+        }
+
+        with transaction.atomic():
+            results = [self.apply(op) for op in operations]
+            state = self.post_state()
+
+        return Response({'results': results, 'state': state})
+
+    def apply(self, op):
+        stored = self.applied.get(op['op_id'])
+        if stored is not None:
+            return {**stored.result, 'status': 'duplicate'}
+
+        handler = getattr(self, 'op_' + op['type'].replace('.', '_'))
+        try:
+            with transaction.atomic():
+                result = {'op_id': op['op_id'], 'type': op['type'], **handler(op)}
+                self.applied[op['op_id']] = AppliedOperation.objects.create(
+                    user=self.request.user,
+                    op_id=op['op_id'],
+                    op_type=op['type'],
+                    result=result,
+                )
+        except serializers.ValidationError as exc:
+            return {'op_id': op['op_id'], 'status': 'error', 'errors': exc.detail}
+        except Http404:
+            return {'op_id': op['op_id'], 'status': 'error', 'errors': 'Não encontrado.'}
+
+        self.created[op['op_id']] = result.get('id')
+        return {**result, 'status': 'applied'}
+
+    def post_state(self):
+        """Compact state of every list and payment method touched by the log"""
+        lists = ShoppingList.objects.filter(
+            user=self.request.user,
+            id__in=self.touched_lists,
+        )
+        payments = PaymentMethod.objects.filter(
+            user=self.request.user,
+            id__in=self.touched_payments,
+        ).values('id', 'available_amount')
+        return {
+            'shopping_lists': ShoppingListTotalsSerializer(lists, many=True).data,
+            'payment_methods': [
+                {'id': pm['id'], 'available_amount': str(pm['available_amount'])}
+                for pm in payments
+            ],
+        }
+
+    # Reference resolution
+
+    def resolve(self, reference):
+        if reference is None:
+            raise serializers.ValidationError('Informe o objeto alvo.')
+        if reference.startswith('@'):
+            op_id = reference[1:]
+            if self.created.get(op_id) is not None:
+                return self.created[op_id]
+            if op_id in self.applied and self.applied[op_id].result.get('id') is not None:
+                return self.applied[op_id].result['id']
+            raise serializers.ValidationError(f'Referência desconhecida: {reference}')
+        try:
+            return int(reference)
+        except ValueError:
+            raise serializers.ValidationError(f'ID inválido: {reference}')
+
+    def get_list(self, reference):
+        shopping_list = get_object_or_404(
+            ShoppingList, id=self.resolve(reference), user=self.request.user
+        )
+        self.touched_lists.add(shopping_list.id)
+        return shopping_list
+
+    def get_item(self, reference):
+        item = get_object_or_404(
+            ShoppingItem,
+            id=self.resolve(reference),
+            shopping_list__user=self.request.user,
+        )
+        self.touched_lists.add(item.shopping_list_id)
+        return item
+
+    def get_payment_method(self, reference):
+        payment_method = get_object_or_404(
+            PaymentMethod, id=self.resolve(reference), user=self.request.user
+        )
+        self.touched_payments.add(payment_method.id)
+        return payment_method
+
+    # Operation handlers
+
+    def op_list_create(self, op):
+        serializer = ShoppingListSerializer(data=op['data'], context={'request': self.request})
+        serializer.is_valid(raise_exception=True)
+        shopping_list = serializer.save()
+        self.touched_lists.add(shopping_list.id)
+        return {'id': shopping_list.id}
+
+    def op_list_update(self, op):
+        shopping_list = self.get_list(op.get('id'))
+        serializer = ShoppingListSerializer(
+            shopping_list,
+            data=op['data'],
+            partial=True,
+            context={'request': self.request},
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return {'id': shopping_list.id}
+
+    def op_list_complete(self, op):
+        shopping_list = self.get_list(op.get('id'))
+        payment_method = None
+        payment_method_id = op['data'].get('payment_method_id')
+        if payment_method_id:
+            payment_method = self.get_payment_method(str(payment_method_id))
+        shopping_list.complete(payment_method=payment_method)
+        return {'id': shopping_list.id}
+
+    def op_list_cancel(self, op):
+        shopping_list = self.get_list(op.get('id'))
+        shopping_list.cancel()
+        return {'id': shopping_list.id}
+
+    def op_item_create(self, op):
+        shopping_list = self.get_list(op.get('list'))
+        serializer = ShoppingItemSerializer(data=op['data'])
+        serializer.is_valid(raise_exception=True)
+        item = serializer.save(shopping_list=shopping_list)
+        return {'id': item.id, 'list': shopping_list.id}
+
+    def op_item_update(self, op):
+        item = self.get_item(op.get('id'))
+        serializer = ShoppingItemSerializer(item, data=op['data'], partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return {'id': item.id, 'list': item.shopping_list_id}
+
+    def op_item_delete(self, op):
+        item = self.get_item(op.get('id'))
+        item_id, list_id = item.id, item.shopping_list_id
+        item.delete()
+        return {'id': item_id, 'list': list_id}
+
+    def op_item_toggle(self, op):
+        item = self.get_item(op.get('id'))
+        item.is_checked = not item.is_checked
+        item.save(update_fields=['is_checked', 'updated_at'])
+        return {'id': item.id, 'list': item.shopping_list_id}
+
+    def op_payment_add_funds(self, op):
+        payment_method = self.get_payment_method(op.get('id'))
+        try:
+            amount = Decimal(str(op['data'].get('amount')))
+            if not amount.is_finite() or amount <= 0:
+                raise ValueError()
+        except (ValueError, InvalidOperation):
+            raise serializers.ValidationError('Valor inválido. Informe um número positivo.')
+        payment_method.add_funds(amount)
+        return {'id': payment_method.id}
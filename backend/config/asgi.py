@@ -1,5 +1,9 @@
 """
 ASGI config for SmartCart project.
+
+Needed for the live list updates (/api/shopping/{id}/events/), which keep
+a connection open per subscriber. Production runs it with ASGI workers
+(start.sh): gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker
 """
 
 import os
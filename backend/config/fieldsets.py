@@ -0,0 +1,68 @@
+"""
+SmartCart Sparse Fieldsets
+?fields= and ?expand= on read endpoints
+
+- ?fields=id,name,total_spent  renders only these keys
+- ?expand=items                renders only these of the serializer's nested
+                               relations (Meta.expandable_fields);
+                               "?expand=" renders none of them
+
+Both can be combined (?fields=id,name&expand=items). Only the top-level
+serializer of a GET is trimmed. Fields left out are never evaluated, and
+views ask includes() before prefetching the relations behind them.
+"""
+
+from rest_framework.permissions import SAFE_METHODS
+
+
+def _param(request, name):
+    value = request.query_params.get(name)
+    if value is None:
+        return None
+    return {part.strip() for part in value.split(',') if part.strip()}
+
+
+def requested_fieldset(request):
+    """(fields, expand) sets from the query string, None when not given"""
+    if request is None or request.method not in SAFE_METHODS:
+        return None, None
+    if not hasattr(request, '_sparse_fieldset'):
+        request._sparse_fieldset = (_param(request, 'fields'), _param(request, 'expand'))
+    return request._sparse_fieldset
+
+
+def fieldset_cache_key(request):
+    """Suffix telling cached renderings of different fieldsets apart"""
+    fields, expand = requested_fieldset(request)
+    return ':'.join(
+        '*' if names is None else ','.join(sorted(names))
+        for names in (fields, expand)
+    )
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin honouring ?fields= and ?expand= (see module docstring).
+    Meta.expandable_fields names the nested relations.
+    """
+
+    @classmethod
+    def includes(cls, request, name):
+        """Whether field `name` is rendered for this request"""
+        fields, expand = requested_fieldset(request)
+        expandable = name in getattr(cls.Meta, 'expandable_fields', ())
+        if expandable and expand is not None and name in expand:
+            return True
+        if fields is not None:
+            return name in fields
+        return not (expandable and expand is not None)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        # Nested serializers render in full
+        if self.root is self or self.root is self.parent:
+            request = self.context.get('request')
+            for name in list(fields):
+                if not self.includes(request, name):
+                    del fields[name]
+        return fields
@@ -0,0 +1,148 @@
+"""
+SmartCart Pagination
+Keyset (cursor) pagination on stable, unique orderings
+"""
+
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only keyset pagination.
+
+    Pages are fetched with WHERE (a, b, id) < (last_a, last_b, last_id)
+    instead of OFFSET, and no COUNT(*) is issued, so every page costs the
+    same no matter how deep the client scrolls. The ordering must end with
+    a unique field (usually 'id'); nullable fields sort last.
+
+    Views may override the ordering per action with get_keyset_ordering().
+    """
+
+    ordering = ('-created_at', '-id')
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = 'Cursor inválido.'
+
+    def get_ordering(self, view):
+        get_keyset_ordering = getattr(view, 'get_keyset_ordering', None)
+        if get_keyset_ordering is not None:
+            return tuple(get_keyset_ordering())
+        return self.ordering
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        model = queryset.model
+        self.keys = [
+            (name.lstrip('-'), name.startswith('-'), model._meta.get_field(name.lstrip('-')))
+            for name in self.get_ordering(view)
+        ]
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self._after(self.decode_cursor(cursor)))
+
+        queryset = queryset.order_by(*[
+            self._order_expression(name, descending, field)
+            for name, descending, field in self.keys
+        ])
+
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        position = [getattr(last, field.attname) for _, _, field in self.keys]
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(position))
+
+    def encode_cursor(self, position):
+        # Full microsecond precision: a truncated timestamp would skip rows
+        raw = json.dumps(position, default=_json_default, separators=(',', ':'))
+        return urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            values = json.loads(urlsafe_b64decode(padded.encode()).decode())
+            if not isinstance(values, list) or len(values) != len(self.keys):
+                raise ValueError()
+            return [
+                None if value is None else field.to_python(value)
+                for (_, _, field), value in zip(self.keys, values)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def _order_expression(name, descending, field):
+        if not field.null:
+            return f'-{name}' if descending else name
+        expression = F(name)
+        return expression.desc(nulls_last=True) if descending else expression.asc(nulls_last=True)
+
+    def _after(self, position):
+        """Build the row-value comparison "rows strictly after position" """
+        condition = Q(pk__in=[])
+        equal_prefix = Q()
+        for (name, descending, field), value in zip(self.keys, position):
+            if value is None:
+                # Nulls sort last: only other nulls can follow at this level
+                equal = Q(**{f'{name}__isnull': True})
+            else:
+                lookup = 'lt' if descending else 'gt'
+                strictly_after = Q(**{f'{name}__{lookup}': value})
+                if field.null:
+                    strictly_after |= Q(**{f'{name}__isnull': True})
+                condition |= equal_prefix & strictly_after
+                equal = Q(**{name: value})
+            equal_prefix &= equal
+        return condition
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f'Unsupported cursor value: {value!r}')
@@ -7,6 +7,7 @@ from pathlib import Path
 from datetime import timedelta
 from decouple import config, Csv
 import dj_database_url
+from corsheaders.defaults import default_headers
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -45,6 +46,8 @@ INSTALLED_APPS = [
     'apps.shopping',
     'apps.products',
     'apps.analytics',
+    'apps.sync',
+    'apps.notifications',
     'storages',
 ]
 
@@ -169,6 +172,84 @@ else:
     }
 
 
+# Live updates (Server-Sent Events fan-out)
+# In-process by default; set REDIS_URL to fan out across workers
+REDIS_URL = config('REDIS_URL', default=None)
+
+if REDIS_URL:
+    LIVE_UPDATES = {
+        'BACKEND': 'apps.shopping.live.RedisBackend',
+        'OPTIONS': {'url': REDIS_URL},
+    }
+else:
+    LIVE_UPDATES = {
+        'BACKEND': 'apps.shopping.live.InProcessBackend',
+        'OPTIONS': {},
+    }
+
+
+# Cache (rendered completed lists); shared through Redis when configured
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+
+
+# Idempotency-Key: how long a stored response can be replayed (seconds);
+# expired keys are deleted by `manage.py purge_idempotency_keys`
+IDEMPOTENCY_KEY_TTL = config('IDEMPOTENCY_KEY_TTL', default=60 * 60 * 24, cast=int)
+
+
+# Archival: items of completed/cancelled lists untouched for this many
+# months move to compressed blobs; cancelled lists are deleted after
+# CANCELLED_LIST_RETENTION_DAYS (`manage.py archive_lists`, daily cron)
+ARCHIVE_AFTER_MONTHS = config('ARCHIVE_AFTER_MONTHS', default=6, cast=int)
+CANCELLED_LIST_RETENTION_DAYS = config('CANCELLED_LIST_RETENTION_DAYS', default=365, cast=int)
+
+
+# Catalog pipeline: how completed lists feed products and price history
+# 'thread' (background, default), 'sync' (right after commit) or
+# 'deferred' (only via `manage.py record_completed_lists`)
+CATALOG_PIPELINE_MODE = config('CATALOG_PIPELINE_MODE', default='thread')
+
+# Push notifications (budget alerts)
+# Transport: ExpoTransport (Expo push API) or LocMemTransport (in memory);
+# DELIVERY_MODE: 'thread' (background, default), 'sync' (right after
+# commit) or 'deferred' (only via `manage.py send_notifications`)
+NOTIFICATIONS = {
+    'TRANSPORT': config(
+        'NOTIFICATIONS_TRANSPORT',
+        default='apps.notifications.transports.ExpoTransport',
+    ),
+    'OPTIONS': {'access_token': config('EXPO_ACCESS_TOKEN', default='')},
+    'DELIVERY_MODE': config('NOTIFICATIONS_DELIVERY_MODE', default='thread'),
+    'BATCH_SIZE': 100,
+    'RATE_LIMIT': config('NOTIFICATIONS_RATE_LIMIT', default=100, cast=int),
+    'MAX_ATTEMPTS': 5,
+    'CLAIM_TIMEOUT': 300,  # seconds a claimed batch stays leased to its sender
+}
+
+# Price statistics (ratings 🟢 Ótimo / 📊 Média / 🔴 Caro)
+PRICE_EWMA_ALPHA = 0.3  # weight of the newest price in the moving average
+PRICE_STATS_WINDOW_DAYS = 90  # rolling median window
+PRICE_STATS_WINDOW_SIZE = 100  # prices kept in that window, newest first
+PRICE_RATING_MARGIN = 0.05  # distance from the median for Ótimo / Caro
+PRICE_SPARKLINE_POINTS = 30  # points of the precomputed chart series
+PRODUCT_PRICE_HISTORY_LIMIT = 10  # newest prices nested in product responses
+
+# Item -> product linking: minimum trigram similarity of the names
+PRODUCT_MATCH_THRESHOLD = config('PRODUCT_MATCH_THRESHOLD', default=0.6, cast=float)
+
+# Shared GTIN reference catalog for barcode lookups (import_gtin_catalog)
+GTIN_CATALOG_PATH = config('GTIN_CATALOG_PATH', default=str(BASE_DIR / 'data' / 'gtin_catalog.bin'))
+
+# Purchases kept per product in the last-purchase index (product_history)
+LAST_PURCHASE_HISTORY_SIZE = config('LAST_PURCHASE_HISTORY_SIZE', default=5, cast=int)
+
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -225,6 +306,7 @@ CORS_ALLOWED_ORIGINS = config(
     cast=Csv()
 )
 CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'if-match', 'idempotency-key')
 # Allow all origins in development (for mobile app)
 CORS_ALLOW_ALL_ORIGINS = DEBUG
 
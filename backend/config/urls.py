@@ -45,6 +45,8 @@ urlpatterns = [
     path('api/shopping/', include('apps.shopping.urls')),
     path('api/products/', include('apps.products.urls')),
     path('api/analytics/', include('apps.analytics.urls')),
+    path('api/sync/', include('apps.sync.urls')),
+    path('api/notifications/', include('apps.notifications.urls')),
 ]
 
 # Serve media files in development
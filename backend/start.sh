@@ -0,0 +1,7 @@
+#!/usr/bin/env bash
+# exit on error
+set -o errexit
+
+# ASGI workers: the live list updates (SSE) keep one connection open per
+# subscriber, which would pin a sync (WSGI) worker each
+exec gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker
@@ -49,11 +49,33 @@ export function ShoppingProvider({ children }) {
         }
     };
 
+    // Merge an item write (and the list totals it returned) into the
+    // active list, instead of fetching the whole list again
+    const applyItemWrite = async (listId, { item = null, removedId = null, summary }) => {
+        if (!activeList || activeList.id !== listId || !summary) {
+            await fetchActiveList();
+            return;
+        }
+        let items = activeList.items.filter((i) => i.id !== (removedId ?? item?.id));
+        if (item) {
+            const index = activeList.items.findIndex((i) => i.id === item.id);
+            items = index === -1
+                ? [...items, item]
+                : activeList.items.map((i) => (i.id === item.id ? item : i));
+        }
+        const { should_alert, ...totals } = summary;
+        const updated = { ...activeList, ...totals, items };
+        setActiveList(updated);
+        await storage.setActiveList(updated);
+    };
+
+    const splitSummary = ({ shopping_list: summary, ...item }) => ({ item, summary });
+
     // Add item to list
     const addItem = async (listId, itemData) => {
         try {
-            const response = await api.post(`/shopping/${listId}/items/`, itemData);
-            await fetchActiveList(); // Refresh list
+            const response = await api.post(`/shopping/${listId}/items/?summary=true`, itemData);
+            await applyItemWrite(listId, splitSummary(response.data));
             return { success: true, data: response.data };
         } catch (err) {
             return { success: false, error: 'Erro ao adicionar item' };
@@ -63,8 +85,8 @@ export function ShoppingProvider({ children }) {
     // Update item
     const updateItem = async (listId, itemId, data) => {
         try {
-            const response = await api.patch(`/shopping/${listId}/items/${itemId}/`, data);
-            await fetchActiveList();
+            const response = await api.patch(`/shopping/${listId}/items/${itemId}/?summary=true`, data);
+            await applyItemWrite(listId, splitSummary(response.data));
             return { success: true, data: response.data };
         } catch (err) {
             return { success: false, error: 'Erro ao atualizar item' };
@@ -74,8 +96,11 @@ export function ShoppingProvider({ children }) {
     // Remove item
     const removeItem = async (listId, itemId) => {
         try {
-            await api.delete(`/shopping/${listId}/items/${itemId}/`);
-            await fetchActiveList();
+            const response = await api.delete(`/shopping/${listId}/items/${itemId}/?summary=true`);
+            await applyItemWrite(listId, {
+                removedId: itemId,
+                summary: response.data?.shopping_list,
+            });
             return { success: true };
         } catch (err) {
             return { success: false, error: 'Erro ao remover item' };
@@ -85,14 +110,27 @@ export function ShoppingProvider({ children }) {
     // Toggle item checked
     const toggleItemCheck = async (listId, itemId) => {
         try {
-            const response = await api.post(`/shopping/${listId}/items/${itemId}/toggle_check/`);
-            await fetchActiveList();
+            const response = await api.post(
+                `/shopping/${listId}/items/${itemId}/toggle_check/?summary=true`
+            );
+            await applyItemWrite(listId, splitSummary(response.data));
             return { success: true, data: response.data };
         } catch (err) {
             return { success: false, error: 'Erro ao marcar item' };
         }
     };
 
+    // Apply many item operations in a single request
+    const bulkItems = async (listId, operations) => {
+        try {
+            const response = await api.post(`/shopping/${listId}/items/bulk/`, operations);
+            await fetchActiveList();
+            return { success: true, data: response.data };
+        } catch (err) {
+            return { success: false, error: 'Erro ao atualizar itens' };
+        }
+    };
+
     // Complete list
     const completeList = async (listId) => {
         try {
@@ -119,7 +157,7 @@ export function ShoppingProvider({ children }) {
     const getHistory = async () => {
         try {
             const response = await api.get('/shopping/history/');
-            return response.data;
+            return response.data.results;
         } catch (err) {
             return [];
         }
@@ -148,6 +186,7 @@ export function ShoppingProvider({ children }) {
                 updateItem,
                 removeItem,
                 toggleItemCheck,
+                bulkItems,
                 completeList,
                 getBudgetStatus,
                 getHistory,
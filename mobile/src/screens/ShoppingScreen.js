@@ -20,11 +20,7 @@ import { paymentAPI, shoppingAPI } from '../services/api';
 import { printReceipt } from '../services/receipt';
 import { useAuth } from '../context/AuthContext';
 import Button from '../components/common/Button';
-import {
-    sendBudgetWarningNotification,
-    sendOverBudgetNotification,
-    requestNotificationPermissions
-} from '../services/notifications';
+import { requestNotificationPermissions } from '../services/notifications';
 
 export default function ShoppingScreen({ navigation }) {
     const { user } = useAuth();
@@ -49,8 +45,8 @@ export default function ShoppingScreen({ navigation }) {
     const [selectedPayment, setSelectedPayment] = useState(null);
     const [showCheckoutModal, setShowCheckoutModal] = useState(false);
 
-    // Track if alerts have been sent this session
-    const warningAlertSent = useRef(false);
+    // Track if the over-budget dialog was shown this session
+    // (push notifications come from the server)
     const overBudgetAlertSent = useRef(false);
 
     // Load active list and budget on focus
@@ -58,7 +54,6 @@ export default function ShoppingScreen({ navigation }) {
         useCallback(() => {
             loadData();
             loadPaymentMethods(); // New Function
-            warningAlertSent.current = false;
             overBudgetAlertSent.current = false;
             requestNotificationPermissions();
         }, [])
@@ -174,14 +169,14 @@ export default function ShoppingScreen({ navigation }) {
             // Reload to ensure sync
             loadData();
 
-            // Check budget alerts (logic simplified, relying on loadData triggers if needed in future)
+            // Budget push notifications are sent by the server; here we
+            // only offer the shortcut to add funds
             const newTotal = total + (price * qty);
             const newPercentage = budget > 0 ? (newTotal / budget) * 100 : 0;
 
             if (newPercentage >= 100 && !overBudgetAlertSent.current) {
                 overBudgetAlertSent.current = true;
                 const exceededAmount = newTotal - budget;
-                sendOverBudgetNotification(exceededAmount);
                 Alert.alert(
                     '🚫 Orçamento Ultrapassado!',
                     `Você ultrapassou em R$ ${exceededAmount.toFixed(2)}.\n\n💡 Dica: Adicione fundos em Pagamentos.`,
@@ -190,9 +185,6 @@ export default function ShoppingScreen({ navigation }) {
                         { text: 'Ir para Pagamentos', onPress: () => navigation.navigate('Payments') }
                     ]
                 );
-            } else if (newPercentage >= alertThreshold && !warningAlertSent.current) {
-                warningAlertSent.current = true;
-                sendBudgetWarningNotification(newPercentage, alertThreshold);
             }
         } catch (error) {
             console.error('Error adding item:', error);
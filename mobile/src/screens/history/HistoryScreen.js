@@ -24,6 +24,7 @@ import colors from '../../styles/colors';
 export default function HistoryScreen({ navigation }) {
     const insets = useSafeAreaInsets();
     const [history, setHistory] = useState([]);
+    const [nextPage, setNextPage] = useState(null);
     const [loading, setLoading] = useState(true);
     const [refreshing, setRefreshing] = useState(false);
 
@@ -36,7 +37,8 @@ export default function HistoryScreen({ navigation }) {
     const loadHistory = async () => {
         try {
             const data = await shoppingAPI.getHistory();
-            setHistory(data);
+            setHistory(data.results);
+            setNextPage(data.next);
         } catch (error) {
             console.error('Error loading history:', error);
         } finally {
@@ -44,6 +46,17 @@ export default function HistoryScreen({ navigation }) {
         }
     };
 
+    const loadMore = async () => {
+        if (!nextPage) return;
+        try {
+            const data = await shoppingAPI.getHistory(nextPage);
+            setNextPage(data.next);
+            setHistory((current) => [...current, ...data.results]);
+        } catch (error) {
+            console.error('Error loading more history:', error);
+        }
+    };
+
     const onRefresh = async () => {
         setRefreshing(true);
         await loadHistory();
@@ -225,6 +238,8 @@ export default function HistoryScreen({ navigation }) {
             <FlatList
                 data={history}
                 keyExtractor={(item) => item.id.toString()}
+                onEndReached={loadMore}
+                onEndReachedThreshold={0.5}
                 renderItem={renderItem}
                 contentContainerStyle={styles.listContent}
                 ListEmptyComponent={
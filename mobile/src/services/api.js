@@ -12,6 +12,30 @@ const api = axios.create({
     },
 });
 
+// Unique per logical request; kept when the same request is retried
+const newIdempotencyKey = () =>
+    `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 12)}`;
+
+// POSTs the server deduplicates by Idempotency-Key (see docs/API.md) are
+// retried with their key after a network error or timeout, a 5xx, or a 409
+// (the first attempt is still running on the server)
+const IDEMPOTENT_POSTS = [
+    /^\/shopping\//,
+    /^\/payments\/\d+\/add_funds\/$/,
+    /^\/products\/\d+\/add_price\/$/,
+];
+const MAX_RETRIES = 3;
+const RETRY_DELAY_MS = 1000;
+
+const shouldRetry = (error) => {
+    const config = error.config;
+    if (!config?.headers?.['Idempotency-Key'] || axios.isCancel(error)) return false;
+    if (!IDEMPOTENT_POSTS.some((pattern) => pattern.test(config.url))) return false;
+    if ((config._retries || 0) >= MAX_RETRIES) return false;
+    const status = error.response?.status;
+    return status === undefined || status >= 500 || status === 409;
+};
+
 // Add token to requests
 api.interceptors.request.use(
     async (config) => {
@@ -19,6 +43,10 @@ api.interceptors.request.use(
         if (token) {
             config.headers.Authorization = `Bearer ${token}`;
         }
+        // Lets the server replay instead of repeating a retried POST
+        if (config.method === 'post' && !config.headers['Idempotency-Key']) {
+            config.headers['Idempotency-Key'] = newIdempotencyKey();
+        }
         return config;
     },
     (error) => Promise.reject(error)
@@ -53,6 +81,16 @@ api.interceptors.response.use(
                 return Promise.reject(refreshError);
             }
         }
+
+        // Same config, same Idempotency-Key: the server replays a write it
+        // already applied instead of applying it twice
+        if (shouldRetry(error)) {
+            originalRequest._retries = (originalRequest._retries || 0) + 1;
+            await new Promise((resolve) =>
+                setTimeout(resolve, RETRY_DELAY_MS * 2 ** (originalRequest._retries - 1))
+            );
+            return api(originalRequest);
+        }
         return Promise.reject(error);
     }
 );
@@ -129,8 +167,9 @@ export const shoppingAPI = {
         return response.data;
     },
 
-    getHistory: async () => {
-        const response = await api.get('/shopping/history/');
+    // Returns { results, next }; pass `next` back to load the following page
+    getHistory: async (nextUrl = null) => {
+        const response = await api.get(nextUrl || '/shopping/history/');
         return response.data;
     },
 
@@ -189,6 +228,19 @@ export const shoppingAPI = {
         return response.data;
     },
 
+    mergeLists: async (listIds, name = '', budget = null) => {
+        const data = { list_ids: listIds, name };
+        if (budget !== null) data.planned_budget = budget;
+        const response = await api.post('/shopping/merge/', data);
+        return response.data;
+    },
+
+    // Items upserted/deleted since a list change_version
+    getListChanges: async (listId, since) => {
+        const response = await api.get(`/shopping/${listId}/changes/`, { params: { since } });
+        return response.data;
+    },
+
     getBudgetStatus: async (listId) => {
         const response = await api.get(`/shopping/${listId}/budget_status/`);
         return response.data;
@@ -200,6 +252,30 @@ export const shoppingAPI = {
         return response.data;
     },
 
+    // Full-text search over lists and items (status, date_from, date_to, offset)
+    searchHistory: async (query, filters = {}) => {
+        const response = await api.get('/shopping/search/', { params: { q: query, ...filters } });
+        return response.data;
+    },
+
+    // Last price and rating of every item name at once
+    getPriceHints: async (names) => {
+        if (!names || names.length === 0) return [];
+        const response = await api.post('/products/prices/', { names });
+        return response.data.results;
+    },
+
+    // Scanned barcode: the user's product, else the GTIN catalog (null if unknown)
+    lookupBarcode: async (code) => {
+        try {
+            const response = await api.get('/products/barcode/', { params: { code } });
+            return response.data;
+        } catch (error) {
+            if (error.response?.status === 404) return null;
+            throw error;
+        }
+    },
+
     // Items
     getItems: async (listId) => {
         const response = await api.get(`/shopping/${listId}/items/`);
@@ -229,6 +305,12 @@ export const shoppingAPI = {
         const response = await api.post(`/shopping/${listId}/items/${itemId}/toggle_check/`);
         return response.data;
     },
+
+    // operations: { create: [], update: [{ id, ... }], delete: [ids], toggle: [ids] }
+    bulkItems: async (listId, operations) => {
+        const response = await api.post(`/shopping/${listId}/items/bulk/`, operations);
+        return response.data;
+    },
 };
 
 // Payment functions
@@ -269,6 +351,27 @@ export const paymentAPI = {
     },
 };
 
+// Sync functions
+export const syncAPI = {
+    // operations: [{ op_id, type, id?, list?, data? }] in the order they happened offline
+    replay: async (operations) => {
+        const response = await api.post('/sync/replay/', { operations });
+        return response.data;
+    },
+};
+
+// Push notifications (budget alerts are sent by the server)
+export const notificationsAPI = {
+    registerDevice: async (token, platform) => {
+        const response = await api.post('/notifications/devices/', { token, platform });
+        return response.data;
+    },
+
+    unregisterDevice: async (token) => {
+        await api.delete('/notifications/devices/', { data: { token } });
+    },
+};
+
 // Analytics functions
 export const analyticsAPI = {
     getSummary: async () => {
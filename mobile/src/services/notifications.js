@@ -1,11 +1,14 @@
 /**
  * Notifications Service
- * Local push notifications for budget alerts
+ * Push notifications for budget alerts
+ * Budget alerts are evaluated and pushed by the server; the device only
+ * registers its Expo push token
  */
 
 import * as Notifications from 'expo-notifications';
 import { Platform } from 'react-native';
 import AsyncStorage from '@react-native-async-storage/async-storage';
+import { notificationsAPI } from './api';
 
 // Configure notification behavior
 Notifications.setNotificationHandler({
@@ -48,6 +51,7 @@ export const requestNotificationPermissions = async () => {
             });
         }
 
+        await registerPushToken();
         return true;
     } catch (error) {
         console.error('Error requesting notification permissions:', error);
@@ -55,6 +59,21 @@ export const requestNotificationPermissions = async () => {
     }
 };
 
+/**
+ * Send this device's Expo push token to the server, which pushes the
+ * budget alerts as soon as a list crosses a threshold
+ */
+export const registerPushToken = async () => {
+    try {
+        const { data: token } = await Notifications.getExpoPushTokenAsync();
+        await notificationsAPI.registerDevice(token, Platform.OS);
+        return token;
+    } catch (error) {
+        console.error('Error registering push token:', error);
+        return null;
+    }
+};
+
 /**
  * Check if notifications are enabled in app settings
  * @returns {boolean}
@@ -149,6 +168,7 @@ export const sendTestNotification = async () => {
 
 export default {
     requestNotificationPermissions,
+    registerPushToken,
     areNotificationsEnabled,
     setNotificationsEnabled,
     sendBudgetWarningNotification,